@@ -8,9 +8,16 @@ __author__ = 'Richard Christie'
 __stepname__ = 'Mesh Generator'
 __location__ = ''
 
-# import class that derives itself from the step mountpoint.
-from mapclientplugins.meshgeneratorstep import step
+try:
+    import mapclient
+    import PySide
+except ImportError:
+    # running the headless batch, sweep and benchmark tools without the MAP Client
+    pass
+else:
+    # import class that derives itself from the step mountpoint.
+    from mapclientplugins.meshgeneratorstep import step
 
-# Import the resource file when the module is loaded,
-# this enables the framework to use the step icon.
-from . import resources_rc
\ No newline at end of file
+    # Import the resource file when the module is loaded,
+    # this enables the framework to use the step icon.
+    from . import resources_rc
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Headless batch generation of scaffolds from mesh generator step settings files,
+without PySide or a sceneviewer. Independent scaffolds are generated in parallel
+worker processes.
+
+Usage:
+    python -m mapclientplugins.meshgeneratorstep.batch [-o OUTPUT_DIR] [-j PROCESSES]
+        [-f FORMAT] [--highest-dimension-only] SETTINGS_FILE [...]
+
+Each IDENTIFIER-settings.json file written by the step produces IDENTIFIER.FORMAT e.g.
+IDENTIFIER.ex2 in the output directory, which defaults to the directory containing the
+settings file.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from mapclientplugins.meshgeneratorstep.model.outputformat import OUTPUT_FORMAT_EX2, OUTPUT_FORMATS, \
+    getOutputFileExtension
+
+SETTINGS_FILE_SUFFIX = '-settings.json'
+
+
+def readGeneratorSettings(settingsFileName):
+    """
+    :return: Mesh generator settings from step settings file, migrating old format files.
+    """
+    with open(settingsFileName, 'r') as f:
+        settings = json.loads(f.read())
+    if 'generator_settings' in settings:
+        return settings['generator_settings']
+    # old settings before named generator_settings
+    return settings
+
+
+def getOutputModelFilename(settingsFileName, outputDirectory=None, outputFormat=OUTPUT_FORMAT_EX2):
+    """
+    :return: Model file name for settings file name, following the step's naming convention.
+    """
+    directory, baseName = os.path.split(settingsFileName)
+    if baseName.endswith(SETTINGS_FILE_SUFFIX):
+        identifier = baseName[:-len(SETTINGS_FILE_SUFFIX)]
+    else:
+        identifier = os.path.splitext(baseName)[0]
+    if outputDirectory is not None:
+        directory = outputDirectory
+    return os.path.join(directory, identifier + '.' + getOutputFileExtension(outputFormat))
+
+
+def createGeneratorModel():
+    """
+    :return: MeshGeneratorModel in a new zinc context set up as for the interactive step.
+    """
+    from opencmiss.zinc.context import Context
+    from mapclientplugins.meshgeneratorstep.model.contextsetup import setupContext
+    from mapclientplugins.meshgeneratorstep.model.meshgeneratormodel import MeshGeneratorModel
+
+    context = Context('MeshGeneratorBatch')
+    setupContext(context)
+    return MeshGeneratorModel(context.getDefaultRegion(), context.getMaterialmodule())
+
+
+def generateScaffold(generatorSettings, outputFileName, outputFormat=OUTPUT_FORMAT_EX2, highestDimensionOnly=False):
+    """
+    Generate scaffold from mesh generator settings and write it to file.
+    :return: Generator model holding the generated scaffold.
+    """
+    model = createGeneratorModel()
+    model.setSettings(generatorSettings)
+    model.writeModel(outputFileName, outputFormat, highestDimensionOnly)
+    return model
+
+
+def _generateJob(job):
+    """
+    Process pool worker generating one scaffold.
+    :param job: (settingsFileName, outputFileName, outputFormat, highestDimensionOnly)
+    :return: (settingsFileName, outputFileName, elapsed seconds, error message or None)
+    """
+    settingsFileName, outputFileName, outputFormat, highestDimensionOnly = job
+    startTime = time.time()
+    try:
+        generateScaffold(readGeneratorSettings(settingsFileName), outputFileName, outputFormat, highestDimensionOnly)
+        error = None
+    except Exception as e:
+        error = str(e)
+    return settingsFileName, outputFileName, time.time() - startTime, error
+
+
+def runJobs(worker, jobs, processes=None):
+    """
+    Run worker on each job in a pool of processes, or in this process if only one.
+    :param processes: Number of worker processes, default number of CPUs.
+    :return: Iterator over results in order of completion.
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(jobs)))
+    if processes == 1:
+        for job in jobs:
+            yield worker(job)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap_unordered(worker, jobs):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate scaffolds from mesh generator step settings files.')
+    parser.add_argument('settings_files', nargs='+', help='IDENTIFIER-settings.json files saved by the step')
+    parser.add_argument('-o', '--output-dir', help='directory to write models to, default beside settings file')
+    parser.add_argument('-j', '--processes', type=int, help='number of worker processes, default number of CPUs')
+    parser.add_argument('-f', '--format', default=OUTPUT_FORMAT_EX2,
+                        choices=[outputFormat for outputFormat, description in OUTPUT_FORMATS],
+                        help='output model format, default ex2')
+    parser.add_argument('--highest-dimension-only', action='store_true',
+                        help='write only nodes and highest dimension elements, omitting faces and lines')
+    args = parser.parse_args(argv)
+    if args.output_dir and not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+    jobs = [(settingsFileName, getOutputModelFilename(settingsFileName, args.output_dir, args.format),
+             args.format, args.highest_dimension_only)
+            for settingsFileName in args.settings_files]
+    failureCount = 0
+    for settingsFileName, outputFileName, elapsed, error in runJobs(_generateJob, jobs, args.processes):
+        if error is None:
+            print('Wrote {0} in {1:.2f}s'.format(outputFileName, elapsed))
+        else:
+            failureCount += 1
+            print('Failed to generate {0}: {1}'.format(settingsFileName, error))
+    return 1 if failureCount else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
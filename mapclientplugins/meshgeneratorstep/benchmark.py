@@ -0,0 +1,183 @@
+"""
+Headless benchmarks of scaffold generation, element deletion, scaling, graphics creation and
+model output for every mesh type at several element counts, to detect performance regressions
+from scaffoldmaker or zinc upgrades.
+
+Usage:
+    python -m mapclientplugins.meshgeneratorstep.benchmark [-o RESULTS_FILE] [-b BASELINE_FILE]
+        [-m MESH_TYPE_NAME ...] [-s ELEMENT_SCALE ...] [-r REPEATS] [-t TOLERANCE]
+
+Element counts are varied by multiplying every 'Number of elements' option of a mesh type by
+each element scale. The fastest of the repeated timings of each stage is recorded. With a
+baseline results file, stages slower than the baseline by more than the tolerance are
+reported as regressions and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from mapclientplugins.meshgeneratorstep.batch import createGeneratorModel
+
+DEFAULT_ELEMENT_SCALES = [1, 2, 4]
+DEFAULT_REPEATS = 3
+DEFAULT_TOLERANCE = 0.2
+# ignore differences too small to measure reliably
+MINIMUM_REGRESSION_SECONDS = 0.05
+STAGE_NAMES = ('generateMesh', 'createGraphics', 'deleteElements', 'scale', 'writeModel')
+ELEMENT_COUNT_OPTION_PREFIX = 'Number of elements'
+# highest resolution clock available for timing
+clock = getattr(time, 'perf_counter', time.time)
+
+
+def _setElementScale(model, elementScale):
+    """
+    Multiply all integer element count options of current mesh type by elementScale, applying
+    them in option order as the interactive step does so dependent options are checked.
+    """
+    model.resetMeshTypeOptions()
+    for name in model.getMeshTypeOrderedOptionNames():
+        value = model.getMeshTypeOption(name)
+        if name.startswith(ELEMENT_COUNT_OPTION_PREFIX) and (type(value) is int):
+            model.setMeshTypeOption(name, value*elementScale)
+
+
+def _timeCall(function):
+    startTime = clock()
+    function()
+    return clock() - startTime
+
+
+def _getStageSeconds(profiler, stage):
+    return sum(record['seconds'] for record in profiler.getRecords() if record['stage'] == stage)
+
+
+def benchmarkMeshType(meshTypeName, elementScale, outputDirectory):
+    """
+    Time each stage once for mesh type at element scale, in a fresh model so no scaffold is
+    reused from the cache. Graphics are created within mesh generation, so their time is
+    excluded from generateMesh and recorded as createGraphics.
+    :return: Result dict with node and element counts and seconds for each stage.
+    """
+    model = createGeneratorModel()
+    model.registerUpdateRequestCallback(lambda: None)
+    profiler = model.getProfiler()
+    profiler.setEnabled(True)
+    model.setMeshTypeByName(meshTypeName)
+    _setElementScale(model, elementScale)
+    model.getScaffoldCache().clear()
+    profiler.clear()
+    model.updateMesh()
+    createGraphicsSeconds = _getStageSeconds(profiler, 'createGraphics')
+    seconds = {
+        'generateMesh': _getStageSeconds(profiler, 'generateMesh') - createGraphicsSeconds,
+        'createGraphics': createGraphicsSeconds
+    }
+    result = {
+        'meshTypeName': meshTypeName,
+        'elementScale': elementScale,
+        'meshTypeOptions': dict(model.getSettings()['meshTypeOptions']),
+        'nodeCount': model.getNodeCount(),
+        'elementCount': model.getElementCount(),
+        'seconds': seconds
+    }
+    # delete first tenth of elements then restore them
+    model.setDeleteElementsRangesText('1-{0}'.format(max(1, result['elementCount']//10)))
+    seconds['deleteElements'] = _timeCall(model.updateMesh)
+    model.setDeleteElementsRangesText('')
+    model.updateMesh()
+    model.setScaleText('2*1.5*0.5')
+    seconds['scale'] = _timeCall(model.updateMesh)
+    seconds['writeModel'] = _timeCall(lambda: model.writeModel(os.path.join(outputDirectory, 'benchmark.ex2')))
+    return result
+
+
+def runBenchmarks(meshTypeNames, elementScales, repeats=DEFAULT_REPEATS):
+    """
+    :return: List of result dicts for each mesh type and element scale, with the fastest
+    seconds of repeats for each stage, or an error message if it could not be generated.
+    """
+    results = []
+    outputDirectory = tempfile.mkdtemp(prefix='meshgenerator-benchmark')
+    try:
+        for meshTypeName in meshTypeNames:
+            for elementScale in elementScales:
+                result = None
+                try:
+                    for repeat in range(repeats):
+                        repeatResult = benchmarkMeshType(meshTypeName, elementScale, outputDirectory)
+                        if result is None:
+                            result = repeatResult
+                        else:
+                            for stage in STAGE_NAMES:
+                                result['seconds'][stage] = min(result['seconds'][stage], repeatResult['seconds'][stage])
+                except Exception as e:
+                    result = {'meshTypeName': meshTypeName, 'elementScale': elementScale, 'error': str(e)}
+                    print('Failed to benchmark {0} x{1}: {2}'.format(meshTypeName, elementScale, e))
+                else:
+                    print('{0} x{1}: {2} nodes, {3} elements, {4}'.format(
+                        meshTypeName, elementScale, result['nodeCount'], result['elementCount'],
+                        ', '.join('{0} {1:.3f}s'.format(stage, result['seconds'][stage]) for stage in STAGE_NAMES)))
+                results.append(result)
+    finally:
+        shutil.rmtree(outputDirectory, ignore_errors=True)
+    return results
+
+
+def compareResults(results, baselineResults, tolerance=DEFAULT_TOLERANCE):
+    """
+    :return: List of (meshTypeName, elementScale, stage, baselineSeconds, seconds) for stages
+    slower than baseline by more than tolerance fraction and MINIMUM_REGRESSION_SECONDS.
+    """
+    baseline = {}
+    for result in baselineResults:
+        if 'seconds' in result:
+            baseline[(result['meshTypeName'], result['elementScale'])] = result['seconds']
+    regressions = []
+    for result in results:
+        baselineSeconds = baseline.get((result['meshTypeName'], result['elementScale']))
+        if (baselineSeconds is None) or ('seconds' not in result):
+            continue
+        for stage in STAGE_NAMES:
+            if stage not in baselineSeconds:
+                continue
+            seconds = result['seconds'][stage]
+            if (seconds > baselineSeconds[stage]*(1.0 + tolerance)) and \
+                    ((seconds - baselineSeconds[stage]) > MINIMUM_REGRESSION_SECONDS):
+                regressions.append((result['meshTypeName'], result['elementScale'], stage,
+                                    baselineSeconds[stage], seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark scaffold generation for all mesh types.')
+    parser.add_argument('-o', '--output', default='benchmark-results.json', help='results file to write')
+    parser.add_argument('-b', '--baseline', help='results file to compare against')
+    parser.add_argument('-m', '--mesh-types', nargs='+', help='mesh type names to benchmark, default all')
+    parser.add_argument('-s', '--element-scales', nargs='+', type=int, default=DEFAULT_ELEMENT_SCALES,
+                        help='multipliers of element count options')
+    parser.add_argument('-r', '--repeats', type=int, default=DEFAULT_REPEATS, help='runs per configuration')
+    parser.add_argument('-t', '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='fraction slower than baseline reported as a regression')
+    args = parser.parse_args(argv)
+    meshTypeNames = args.mesh_types or createGeneratorModel().getAllMeshTypeNames()
+    results = runBenchmarks(meshTypeNames, args.element_scales, max(1, args.repeats))
+    with open(args.output, 'w') as f:
+        f.write(json.dumps(results, sort_keys=True, indent=4))
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baselineResults = json.loads(f.read())
+        regressions = compareResults(results, baselineResults, args.tolerance)
+        for meshTypeName, elementScale, stage, baselineSeconds, seconds in regressions:
+            print('Regression: {0} x{1} {2} {3:.3f}s -> {4:.3f}s'.format(
+                meshTypeName, elementScale, stage, baselineSeconds, seconds))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,8 @@
 
 
 from PySide import QtGui
+from mapclientplugins.meshgeneratorstep.model.outputformat import OUTPUT_FORMAT_EX2, OUTPUT_FORMATS, \
+    isOutputFormatAvailable
 from mapclientplugins.meshgeneratorstep.ui_configuredialog import Ui_ConfigureDialog
 
 INVALID_STYLE_SHEET = 'background-color: rgba(239, 0, 0, 50)'
@@ -26,6 +28,10 @@ class ConfigureDialog(QtGui.QDialog):
         # We will use this method to decide whether the identifier is unique.
         self.identifierOccursCount = None
 
+        for outputFormat, description in OUTPUT_FORMATS:
+            if isOutputFormatAvailable(outputFormat):
+                self._ui.outputFormatComboBox.addItem(description, outputFormat)
+
         self._makeConnections()
 
     def _makeConnections(self):
@@ -72,6 +78,8 @@ class ConfigureDialog(QtGui.QDialog):
         config = {}
         config['identifier'] = self._ui.lineEdit0.text()
         config['AutoDone'] = self._ui.autoDoneCheckBox.isChecked()
+        config['OutputFormat'] = self._ui.outputFormatComboBox.itemData(self._ui.outputFormatComboBox.currentIndex())
+        config['HighestDimensionOnly'] = self._ui.highestDimensionCheckBox.isChecked()
         return config
 
     def setConfig(self, config):
@@ -83,4 +91,7 @@ class ConfigureDialog(QtGui.QDialog):
         self._previousIdentifier = config['identifier']
         self._ui.lineEdit0.setText(config['identifier'])
         self._ui.autoDoneCheckBox.setChecked(config['AutoDone'])
+        index = self._ui.outputFormatComboBox.findData(config.get('OutputFormat', OUTPUT_FORMAT_EX2))
+        self._ui.outputFormatComboBox.setCurrentIndex(max(0, index))
+        self._ui.highestDimensionCheckBox.setChecked(config.get('HighestDimensionOnly', False))
 
@@ -0,0 +1,53 @@
+"""
+Writing of serialised output files on a worker thread.
+"""
+import threading
+
+from PySide import QtCore
+
+
+class BackgroundWriter(QtCore.QObject):
+    """
+    Runs file writing functions on a worker thread so the GUI stays responsive while large
+    models are written, notifying completion on the thread owning this object.
+    Anything read from zinc must be serialised before writing, on the thread using it.
+    """
+
+    _writeFinished = QtCore.Signal(object, object)
+
+    def __init__(self, parent=None):
+        super(BackgroundWriter, self).__init__(parent)
+        self._writingCount = 0
+        self._writeFinished.connect(self._writeFinishedReceived)
+
+    def isWriting(self):
+        return self._writingCount > 0
+
+    def write(self, writeFunctions, finishedCallback=None):
+        """
+        :param writeFunctions: List of functions without arguments, called in order on a worker thread.
+        :param finishedCallback: Called after all functions complete with None, or an error message
+        if any failed, in which case later functions are not called.
+        """
+        self._writingCount += 1
+        thread = threading.Thread(target=self._write, args=(writeFunctions, finishedCallback))
+        # not a daemon so output is completed if the application exits while writing
+        thread.start()
+
+    def _write(self, writeFunctions, finishedCallback):
+        """
+        Runs on worker thread. Result is delivered to _writeFinishedReceived on the owning thread.
+        """
+        error = None
+        try:
+            for writeFunction in writeFunctions:
+                writeFunction()
+        except Exception as e:
+            error = str(e)
+            print('BackgroundWriter: Failed to write output:', e)
+        self._writeFinished.emit(finishedCallback, error)
+
+    def _writeFinishedReceived(self, finishedCallback, error):
+        self._writingCount -= 1
+        if finishedCallback is not None:
+            finishedCallback(error)
@@ -0,0 +1,40 @@
+"""
+Set up of zinc context shared by the interactive step and headless generation.
+"""
+from opencmiss.zinc.material import Material
+
+from mapclientplugins.meshgeneratorstep.model.tessellationlod import defineTessellations
+
+
+def setupContext(context):
+    """
+    Set default tessellation, define tessellations for mesh surfaces and lines, and
+    define standard materials and glyphs plus the custom materials the mesh generator
+    graphics use.
+    """
+    tessellationmodule = context.getTessellationmodule()
+    tess = tessellationmodule.getDefaultTessellation()
+    tess.setRefinementFactors(12)
+    defineTessellations(tessellationmodule)
+    # set up standard materials and glyphs so we can use them elsewhere
+    materialmodule = context.getMaterialmodule()
+    materialmodule.defineStandardMaterials()
+    solid_blue = materialmodule.createMaterial()
+    solid_blue.setName('solid_blue')
+    solid_blue.setManaged(True)
+    solid_blue.setAttributeReal3(Material.ATTRIBUTE_AMBIENT, [ 0.0, 0.2, 0.6 ])
+    solid_blue.setAttributeReal3(Material.ATTRIBUTE_DIFFUSE, [ 0.0, 0.7, 1.0 ])
+    solid_blue.setAttributeReal3(Material.ATTRIBUTE_EMISSION, [ 0.0, 0.0, 0.0 ])
+    solid_blue.setAttributeReal3(Material.ATTRIBUTE_SPECULAR, [ 0.1, 0.1, 0.1 ])
+    solid_blue.setAttributeReal(Material.ATTRIBUTE_SHININESS , 0.2)
+    trans_blue = materialmodule.createMaterial()
+    trans_blue.setName('trans_blue')
+    trans_blue.setManaged(True)
+    trans_blue.setAttributeReal3(Material.ATTRIBUTE_AMBIENT, [ 0.0, 0.2, 0.6 ])
+    trans_blue.setAttributeReal3(Material.ATTRIBUTE_DIFFUSE, [ 0.0, 0.7, 1.0 ])
+    trans_blue.setAttributeReal3(Material.ATTRIBUTE_EMISSION, [ 0.0, 0.0, 0.0 ])
+    trans_blue.setAttributeReal3(Material.ATTRIBUTE_SPECULAR, [ 0.1, 0.1, 0.1 ])
+    trans_blue.setAttributeReal(Material.ATTRIBUTE_ALPHA , 0.3)
+    trans_blue.setAttributeReal(Material.ATTRIBUTE_SHININESS , 0.2)
+    glyphmodule = context.getGlyphmodule()
+    glyphmodule.defineStandardGlyphs()
@@ -0,0 +1,50 @@
+"""
+Parsing and merging of inclusive ranges of element identifiers, e.g. those to delete.
+"""
+import string
+
+
+def _stripTrailingNonDigits(text):
+    """
+    Remove trailing non-numeric characters, workaround for select 's' key ending up there.
+    """
+    size = len(text)
+    while (size > 0) and (text[size - 1] not in string.digits):
+        size -= 1
+    return text[:size]
+
+
+def parseRangesText(rangesTextIn):
+    """
+    Parse comma separated identifiers and ranges e.g. '1,3-5', ignoring invalid entries.
+    :return: (ranges, rangesText) with ranges a list of [start, stop] with start <= stop sorted
+    by start, and rangesText their canonical text.
+    """
+    ranges = []
+    for rangeText in rangesTextIn.split(','):
+        rangeEnds = [_stripTrailingNonDigits(rangeEnd) for rangeEnd in rangeText.split('-')]
+        try:
+            start = int(rangeEnds[0])
+            stop = int(rangeEnds[1]) if (len(rangeEnds) > 1) else start
+        except ValueError:
+            continue
+        ranges.append([min(start, stop), max(start, stop)])
+    ranges.sort()
+    rangesText = ','.join(str(start) if (stop == start) else (str(start) + '-' + str(stop))
+                          for start, stop in ranges)
+    return ranges, rangesText
+
+
+def mergeRanges(ranges):
+    """
+    :param ranges: List of [start, stop] inclusive integer ranges with start <= stop, in any order.
+    :return: Sorted list of disjoint ranges covering the same integers, with adjacent ranges joined.
+    """
+    mergedRanges = []
+    for start, stop in sorted(ranges):
+        if mergedRanges and (start <= (mergedRanges[-1][1] + 1)):
+            if stop > mergedRanges[-1][1]:
+                mergedRanges[-1][1] = stop
+        else:
+            mergedRanges.append([start, stop])
+    return mergedRanges
@@ -0,0 +1,112 @@
+"""
+Disk cache of decoded image stacks as raw pixel files, which are read straight back into
+zinc image fields without decoding the original compressed images again.
+"""
+import hashlib
+import json
+import logging
+import os
+
+from mapclientplugins.meshgeneratorstep.model.framedecoder import FRAME_PIXEL_FORMATS
+from mapclientplugins.meshgeneratorstep.model.outputformat import writeBufferToFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISK_BUDGET = 4*1024*1024*1024
+
+
+def getFrameStackKey(fileEntries, level=0):
+    """
+    :param fileEntries: List of (fileName, mtime, size) for each frame in order.
+    :param level: Resolution level the stack is decoded at.
+    :return: Hex digest identifying the image stack, which changes if any frame file changes.
+    """
+    normalizedText = json.dumps(fileEntries if level == 0 else [fileEntries, level])
+    return hashlib.sha1(normalizedText.encode('utf-8')).hexdigest()
+
+
+def _isLayoutOfBuffer(layout, buffer):
+    """
+    :return: True if layout describes buffer, so entries written by earlier versions are not used.
+    """
+    if layout['pixelFormat'] not in FRAME_PIXEL_FORMATS:
+        return False
+    width, height, depth = layout['sizeInPixels']
+    # one byte per letter of the pixel format
+    return width*height*depth*len(layout['pixelFormat']) == len(buffer)
+
+
+class FrameCache(object):
+    """
+    Cache of decoded image stacks in a directory. Each is stored as a raw file of pixel data
+    with a JSON header describing its layout. Least recently used stacks are evicted once
+    their total size exceeds the disk budget.
+    Only stacks decoded by framedecoder, which requires Pillow, are cached.
+    """
+
+    def __init__(self, directory, diskBudget=DEFAULT_DISK_BUDGET):
+        self._directory = directory
+        self._diskBudget = diskBudget
+
+    def _getFileNames(self, key):
+        stem = os.path.join(self._directory, key)
+        return stem + '.raw', stem + '.json'
+
+    def readBuffer(self, key):
+        """
+        Read cached pixels for key. Does not use zinc, so is safe to call from a worker thread.
+        :return: (layout, buffer) of cached pixels for key, or None if not cached.
+        """
+        rawFileName, headerFileName = self._getFileNames(key)
+        if not (os.path.isfile(rawFileName) and os.path.isfile(headerFileName)):
+            return None
+        try:
+            with open(headerFileName, 'r') as f:
+                layout = json.loads(f.read())
+            # zinc's setBuffer only accepts bytes, so the file is read rather than memory mapped
+            with open(rawFileName, 'rb') as f:
+                buffer = f.read()
+            if not _isLayoutOfBuffer(layout, buffer):
+                raise ValueError('pixels do not match header')
+            os.utime(rawFileName, None)
+        except (IOError, OSError, KeyError, TypeError, ValueError) as e:
+            logger.warning('Failed to read cached frames %s: %s', key, e)
+            return None
+        return layout, buffer
+
+    def writeBuffer(self, key, layout, buffer):
+        """
+        Write decoded pixels to cache for key, then evict least recently used stacks to fit in
+        budget. Files are replaced atomically, the header last, so partial stacks are never read.
+        Does not use zinc, so is safe to call from a worker thread.
+        :param layout: Dict of sizeInPixels and pixelFormat as returned by framedecoder.joinFrameBuffers.
+        """
+        rawFileName, headerFileName = self._getFileNames(key)
+        try:
+            if not os.path.isdir(self._directory):
+                os.makedirs(self._directory)
+            writeBufferToFile(buffer, rawFileName)
+            writeBufferToFile(json.dumps(layout, sort_keys=True).encode('utf-8'), headerFileName)
+        except (IOError, OSError, TypeError) as e:
+            logger.warning('Failed to cache frames %s: %s', key, e)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        totalSize = 0
+        for name in os.listdir(self._directory):
+            if name.endswith('.raw'):
+                fileName = os.path.join(self._directory, name)
+                fileStat = os.stat(fileName)
+                entries.append((fileStat.st_mtime, fileStat.st_size, fileName))
+                totalSize += fileStat.st_size
+        entries.sort()
+        for mtime, size, fileName in entries:
+            if totalSize <= self._diskBudget:
+                break
+            os.remove(fileName)
+            headerFileName = fileName[:-len('.raw')] + '.json'
+            if os.path.exists(headerFileName):
+                os.remove(headerFileName)
+            totalSize -= size
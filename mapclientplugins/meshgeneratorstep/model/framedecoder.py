@@ -0,0 +1,177 @@
+"""
+Decoding of image frame files to raw pixels at downsampled resolution levels, in parallel threads.
+
+Frames are decoded with Pillow, which releases the global interpreter lock while decoding and
+resampling, so frames decode in parallel and the GUI thread keeps running meanwhile. Zinc is not
+used here: its Python bindings hold the global interpreter lock throughout every call so cannot
+decode in parallel, and FieldImage getBuffer truncates pixels at the first zero byte so cannot hand
+decoded pixels on. Pixels are only copied into zinc image fields, with setBuffer, on the GUI thread.
+Pillow is optional; without it image stacks are decoded by zinc on the GUI thread.
+"""
+import logging
+import multiprocessing
+import threading
+from multiprocessing.pool import ThreadPool
+
+logger = logging.getLogger(__name__)
+
+MAX_DECODE_THREADS = 8
+# seconds between checks for the decoder being closed while waiting for frames
+DECODE_POLL_INTERVAL = 0.1
+
+# Pillow modes of decoded pixels, all 8 bits per component
+FRAME_PIXEL_FORMATS = ('L', 'LA', 'RGB', 'RGBA')
+
+
+def isFrameDecodingAvailable():
+    """
+    :return: True if Pillow is installed so frames can be decoded by decodeFrameFile.
+    """
+    try:
+        import PIL.Image
+    except ImportError:
+        return False
+    return True
+
+
+def _convertToFramePixelFormat(image):
+    """
+    :return: Image converted to one of FRAME_PIXEL_FORMATS.
+    """
+    if image.mode in FRAME_PIXEL_FORMATS:
+        return image
+    if image.mode in ('I', 'I;16', 'I;16B', 'I;16L', 'F'):
+        # scale 16 bit greyscale to 8 bits rather than clipping it
+        return image.convert('I').point(lambda value: value*(1.0/256.0)).convert('L')
+    if image.mode == '1':
+        return image.convert('L')
+    if (image.mode == 'PA') or ((image.mode == 'P') and ('transparency' in image.info)):
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def decodeFrameFile(fileName, levels=(0,)):
+    """
+    Read and decode one frame with Pillow. Safe to call from any thread.
+    Rows are stored bottom to top, as zinc stores rows of image files.
+    :param levels: Resolution levels to get the frame at, 0 for full resolution, 1 for half etc.
+    :return: List of (layout, buffer) of decoded pixels for each level, or None if the frame could
+    not be read or decoded. Layout is a dict of sizeInPixels and pixelFormat, one of FRAME_PIXEL_FORMATS.
+    """
+    from PIL import Image
+    try:
+        image = Image.open(fileName)
+        width, height = image.size
+        # JPEG decodes straight to the smallest power of 2 reduction at least as big as the finest level
+        finestLevel = min(levels)
+        if finestLevel > 0:
+            image.draft(image.mode, (max(1, width >> finestLevel), max(1, height >> finestLevel)))
+        image = _convertToFramePixelFormat(image)
+        decodedLevels = []
+        for level in levels:
+            levelSize = (max(1, width >> level), max(1, height >> level))
+            levelImage = image if (image.size == levelSize) else image.resize(levelSize, Image.BILINEAR)
+            levelImage = levelImage.transpose(Image.FLIP_TOP_BOTTOM)
+            layout = {
+                'sizeInPixels': [levelSize[0], levelSize[1], 1],
+                'pixelFormat': levelImage.mode
+            }
+            decodedLevels.append((layout, levelImage.tobytes()))
+        return decodedLevels
+    except Exception as e:
+        logger.warning('Failed to decode image %s: %s', fileName, e)
+        return None
+
+
+def joinFrameBuffers(decodedFrames):
+    """
+    Stack decoded frames of the same size into one buffer, substituting black for frames
+    which failed to decode.
+    :param decodedFrames: List of (layout, buffer) for each frame, or None for failed frames.
+    :return: (layout, buffer) of all frames, or (None, None) if no frame decoded.
+    """
+    frameLayout = frameSize = None
+    for decodedFrame in decodedFrames:
+        if decodedFrame is not None:
+            frameLayout = decodedFrame[0]
+            frameSize = len(decodedFrame[1])
+            break
+    if frameLayout is None:
+        return None, None
+    layout = dict(frameLayout)
+    layout['sizeInPixels'] = frameLayout['sizeInPixels'][:2] + [len(decodedFrames)]
+    blankBuffer = b'\0'*frameSize
+    return layout, b''.join(blankBuffer if (decodedFrame is None) else decodedFrame[1]
+                            for decodedFrame in decodedFrames)
+
+
+class FrameDecoder(object):
+    """
+    Decodes frame files with decodeFrameFile in a pool of threads, started on first use.
+    May be used from several threads at once.
+    """
+
+    def __init__(self, threads=None, decodeFrame=decodeFrameFile):
+        """
+        :param threads: Number of decoding threads, default number of CPUs up to MAX_DECODE_THREADS.
+        :param decodeFrame: Function taking (fileName, levels) returning decoded levels as decodeFrameFile.
+        """
+        if threads is None:
+            threads = min(multiprocessing.cpu_count(), MAX_DECODE_THREADS)
+        self._threads = max(1, threads)
+        self._decodeFrame = decodeFrame
+        self._pool = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _getPool(self):
+        """
+        :return: Thread pool, or None if closed.
+        """
+        with self._lock:
+            if (self._pool is None) and (not self._closed):
+                self._pool = ThreadPool(self._threads)
+            return self._pool
+
+    def decodeFrames(self, fileNames, levels=(0,), isCancelled=None):
+        """
+        Decode frames in batches, checking for cancellation between batches.
+        :param levels: Resolution levels to get each frame at.
+        :param isCancelled: Optional function returning True to stop decoding.
+        :return: List of decoded levels for each file as returned by decodeFrameFile, or None if
+        cancelled or closed.
+        """
+        fileNames = list(fileNames)
+        levels = list(levels)
+        batchSize = 2*self._threads
+        decodedFrames = []
+        for start in range(0, len(fileNames), batchSize):
+            pool = self._getPool()
+            if (pool is None) or ((isCancelled is not None) and isCancelled()):
+                return None
+            try:
+                result = pool.map_async(lambda fileName: self._decodeFrame(fileName, levels),
+                                        fileNames[start:start + batchSize])
+            except ValueError:
+                # closed by another thread since getting pool
+                return None
+            while True:
+                try:
+                    decodedFrames.extend(result.get(DECODE_POLL_INTERVAL))
+                    break
+                except multiprocessing.TimeoutError:
+                    if self._closed:
+                        return None
+        return decodedFrames
+
+    def close(self):
+        """
+        Stop decoding, abandoning frames being decoded. Threads exit once their current batch is
+        finished, without waiting for them.
+        """
+        with self._lock:
+            self._closed = True
+            pool = self._pool
+            self._pool = None
+        if pool is not None:
+            pool.close()
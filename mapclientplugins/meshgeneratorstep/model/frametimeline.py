@@ -0,0 +1,46 @@
+"""
+Mapping between playback time and frame index.
+"""
+
+
+class FrameTimeline(object):
+    """
+    Maps between time and frame index for a stack of frames shown at a fixed rate, starting at
+    time 0.0. Frame i is shown from time i/framesPerSecond up to (i + 1)/framesPerSecond.
+    """
+
+    def __init__(self, frame_count, frames_per_second):
+        self._frame_count = frame_count
+        self._frames_per_second = frames_per_second
+        self._seconds_per_frame = 1.0/frames_per_second
+        self._duration = frame_count*self._seconds_per_frame
+        # multiplier of time giving timekeeper time from 0.0 to 1.0 over all frames
+        self._normalised_scale = (frames_per_second/float(frame_count)) if (frame_count > 0) else 0.0
+
+    def getFrameCount(self):
+        return self._frame_count
+
+    def getFramesPerSecond(self):
+        return self._frames_per_second
+
+    def getDuration(self):
+        return self._duration
+
+    def getFrameIndexForTime(self, time):
+        """
+        :return: Index of frame shown at time, limited to valid frames; 0 if there are no frames.
+        """
+        index = int(time*self._frames_per_second)
+        return max(0, min(index, self._frame_count - 1))
+
+    def getTimeForFrameIndex(self, index):
+        """
+        :return: Time at middle of period frame index is shown for.
+        """
+        return (index + 0.5)*self._seconds_per_frame
+
+    def getNormalisedTime(self, time):
+        """
+        :return: Time scaled to range from 0.0 at start to 1.0 at end of all frames; 0.0 if no frames.
+        """
+        return time*self._normalised_scale
@@ -0,0 +1,301 @@
+"""
+Reading of image stack frames into zinc image fields: parallel reading of frame files, decoding
+by zinc, downsampled resolution levels, creation from pixels decoded by framedecoder, and bounded
+memory streaming of a sliding window of frames.
+All functions using zinc must be called on the thread owning the zinc context.
+"""
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+
+from opencmiss.zinc.field import FieldImage
+from opencmiss.zinc.status import OK as RESULT_OK
+from opencmiss.zinc.streamimage import StreaminformationImage
+
+from mapclientplugins.meshgeneratorstep.model.framedecoder import joinFrameBuffers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SIZE = 32
+DEFAULT_READ_THREADS = 8
+
+IMAGE_FILE_FORMATS = {
+    'bmp': StreaminformationImage.FILE_FORMAT_BMP,
+    'gif': StreaminformationImage.FILE_FORMAT_GIF,
+    'jpeg': StreaminformationImage.FILE_FORMAT_JPG,
+    'png': StreaminformationImage.FILE_FORMAT_PNG,
+    'tiff': StreaminformationImage.FILE_FORMAT_TIFF,
+}
+
+
+def readFrameBytes(fileName):
+    with open(fileName, 'rb') as f:
+        return f.read()
+
+
+def readFramesParallel(fileNames, threads=DEFAULT_READ_THREADS, readFrame=readFrameBytes):
+    """
+    Read frame files concurrently, which is much faster than serial reads on network file systems.
+    :return: List of encoded frame contents in order of fileNames.
+    """
+    threads = max(1, min(threads, len(fileNames)))
+    if threads == 1:
+        return [readFrame(fileName) for fileName in fileNames]
+    pool = ThreadPool(threads)
+    try:
+        return pool.map(readFrame, fileNames)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def createImageFieldFromFrames(fieldmodule, frames, imageType=None):
+    """
+    Decode encoded frames from memory into a volume image field, one frame per slice.
+    :param imageType: Image type as returned by imghdr, or None to let zinc detect it.
+    :return: Image field, or None if zinc could not decode the frames.
+    """
+    imageField = fieldmodule.createFieldImage()
+    imageField.setFilterMode(imageField.FILTER_MODE_LINEAR)
+    streamInformation = imageField.createStreaminformationImage()
+    fileFormat = IMAGE_FILE_FORMATS.get(imageType, StreaminformationImage.FILE_FORMAT_INVALID)
+    if fileFormat != StreaminformationImage.FILE_FORMAT_INVALID:
+        streamInformation.setFileFormat(fileFormat)
+    for frame in frames:
+        streamInformation.createStreamresourceMemoryBuffer(frame)
+    if imageField.read(streamInformation) != RESULT_OK:
+        return None
+    return imageField
+
+
+def createImageFieldAtLevel(imageField, level):
+    """
+    Get image field downsampled by 2 to the power of level in width and height, as in a mipmap
+    pyramid, with the same texture coordinate sizes and number of frames.
+    :param level: 0 for full resolution, 1 for half resolution etc.
+    :return: imageField itself for level 0, otherwise new image field resampled from it.
+    """
+    if level <= 0:
+        return imageField
+    fieldmodule = imageField.getFieldmodule()
+    levelField = fieldmodule.createFieldImageFromSource(imageField)
+    levelField.setFilterMode(levelField.FILTER_MODE_LINEAR)
+    result, textureSizes = imageField.getTextureCoordinateSizes(3)
+    levelField.setTextureCoordinateSizes(textureSizes)
+    levelField.setSizeInPixels([max(1, imageField.getWidthInPixels() >> level),
+                                max(1, imageField.getHeightInPixels() >> level),
+                                imageField.getDepthInPixels()])
+    return levelField
+
+
+PIXEL_FORMATS = {
+    'L': FieldImage.PIXEL_FORMAT_LUMINANCE,
+    'LA': FieldImage.PIXEL_FORMAT_LUMINANCE_ALPHA,
+    'RGB': FieldImage.PIXEL_FORMAT_RGB,
+    'RGBA': FieldImage.PIXEL_FORMAT_RGBA,
+}
+
+
+def createImageFieldFromBuffer(fieldmodule, layout, buffer):
+    """
+    Create image field from decoded pixels. Zinc copies the pixels.
+    :param layout: Dict of sizeInPixels and pixelFormat as returned by framedecoder.decodeFrameFile.
+    :param buffer: Bytes of pixels, 8 bits per component, rows from bottom to top.
+    :return: Image field, or None if zinc rejected the buffer.
+    """
+    imageField = fieldmodule.createFieldImage()
+    imageField.setFilterMode(imageField.FILTER_MODE_LINEAR)
+    imageField.setSizeInPixels(layout['sizeInPixels'])
+    imageField.setPixelFormat(PIXEL_FORMATS[layout['pixelFormat']])
+    imageField.setNumberOfBitsPerComponent(8)
+    if imageField.setBuffer(buffer) != RESULT_OK:
+        return None
+    return imageField
+
+
+class ImageFrameStream(object):
+    """
+    Holds a window of consecutive frames of an image stack in a zinc image field at a resolution
+    level. Consecutive windows overlap by a quarter of the window size, and the window following
+    the current one in playback order is prefetched on a background thread, so playback swaps in
+    a window whose frames are all ready. Frames in the overlap are kept rather than loaded again,
+    and all frames outside the current and next windows are evicted, so memory used is bounded by
+    the window size however long the stack is.
+    With a FrameDecoder, frames are prefetched decoded to pixels at the resolution level, and
+    update() only copies them into zinc. Otherwise encoded frames are prefetched and zinc decodes
+    them in update(). Frames of a window not prefetched, e.g. after seeking, are loaded in update().
+    """
+
+    def __init__(self, fileNames, imageType=None, windowSize=DEFAULT_WINDOW_SIZE, level=0, frameDecoder=None,
+                 readFrame=readFrameBytes):
+        """
+        :param fileNames: Names of image files in frame order.
+        :param imageType: Image type as returned by imghdr, or None to let zinc detect it.
+        :param level: Resolution level, 0 for full resolution, 1 for half resolution etc.
+        :param frameDecoder: FrameDecoder to decode frames with, or None to decode them with zinc.
+        :param readFrame: Function returning encoded contents of frame from its file name, used
+        without a frameDecoder.
+        """
+        self._fileNames = fileNames
+        self._imageType = imageType
+        self._windowSize = max(1, min(windowSize, len(fileNames)))
+        self._overlap = self._windowSize//4
+        self._level = level
+        self._frameDecoder = frameDecoder
+        self._readFrame = readFrame
+        self._windowStart = None
+        # map frame index to decoded (layout, buffer), None if it failed to decode, or encoded contents
+        self._frames = {}
+        self._keepIndexes = set()
+        self._wanted = []
+        # incremented when the window moves, cancelling prefetch of frames for the old window
+        self._generation = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._prefetch)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def getFrameCount(self):
+        return len(self._fileNames)
+
+    def getWindowSize(self):
+        return self._windowSize
+
+    def getWindowStart(self):
+        return self._windowStart
+
+    def close(self):
+        """
+        Stop prefetching and release frames.
+        """
+        with self._condition:
+            self._closed = True
+            self._frames.clear()
+            self._condition.notify()
+
+    def _getNextWindowStart(self):
+        """
+        :return: Start of window following the current window in playback order, wrapping
+        around to the start for looped playback.
+        """
+        frameCount = len(self._fileNames)
+        if self._windowStart + self._windowSize >= frameCount:
+            return 0
+        return min(self._windowStart + self._windowSize - self._overlap, frameCount - self._windowSize)
+
+    def needsUpdate(self, frameIndex):
+        """
+        :return: True if frameIndex is outside the current window, or in the overlap at its end
+        which starts the next window.
+        """
+        if self._windowStart is None:
+            return True
+        windowEnd = self._windowStart + self._windowSize
+        if windowEnd == len(self._fileNames):
+            return not (self._windowStart <= frameIndex < windowEnd)
+        return not (self._windowStart <= frameIndex < (windowEnd - self._overlap))
+
+    def update(self, fieldmodule, frameIndex):
+        """
+        Move the window to contain frameIndex, creating a new image field for it from prefetched
+        frames where possible, and request prefetch of the next window.
+        :return: Image field containing the window of frames, or None if frameIndex is in the
+        current window or the window could not be loaded. Window texture coordinate
+        w = (stack texture coordinate*frameCount - windowStart)/windowSize.
+        """
+        frameCount = len(self._fileNames)
+        frameIndex = max(0, min(frameIndex, frameCount - 1))
+        if not self.needsUpdate(frameIndex):
+            return None
+        windowStart = None
+        if self._windowStart is not None:
+            windowStart = self._getNextWindowStart()
+            if not (windowStart <= frameIndex < windowStart + self._windowSize):
+                windowStart = None
+        if windowStart is None:
+            # seeking: keep the overlap before the frame so stepping back does not need a new window
+            windowStart = max(0, min(frameIndex - self._overlap, frameCount - self._windowSize))
+        windowIndexes = list(range(windowStart, windowStart + self._windowSize))
+        with self._condition:
+            self._generation += 1
+            self._windowStart = windowStart
+            missingIndexes = [index for index in windowIndexes if index not in self._frames]
+        if missingIndexes:
+            loadedFrames = self._loadFrames(missingIndexes, lambda: self._closed)
+            if loadedFrames is None:
+                return None
+        with self._condition:
+            if missingIndexes:
+                self._frames.update(loadedFrames)
+            frames = [self._frames.get(index) for index in windowIndexes]
+            nextWindowStart = self._getNextWindowStart()
+            nextIndexes = list(range(nextWindowStart, nextWindowStart + self._windowSize))
+            self._keepIndexes = set(windowIndexes) | set(nextIndexes)
+            for index in list(self._frames.keys()):
+                if index not in self._keepIndexes:
+                    del self._frames[index]
+            self._wanted = [index for index in nextIndexes if index not in self._frames]
+            self._condition.notify()
+        if self._frameDecoder is not None:
+            layout, buffer = joinFrameBuffers(frames)
+            if buffer is None:
+                return None
+            return createImageFieldFromBuffer(fieldmodule, layout, buffer)
+        if None in frames:
+            return None
+        imageField = createImageFieldFromFrames(fieldmodule, frames, self._imageType)
+        if imageField is None:
+            return None
+        return createImageFieldAtLevel(imageField, self._level)
+
+    def _loadFrames(self, indexes, isCancelled):
+        """
+        Decode frames at the resolution level with the frame decoder, otherwise read encoded frames.
+        Does not use zinc.
+        :return: Dict mapping frame index to frame, or None if cancelled. Encoded frames which could
+        not be read are omitted.
+        """
+        fileNames = [self._fileNames[index] for index in indexes]
+        if self._frameDecoder is not None:
+            decodedFrames = self._frameDecoder.decodeFrames(fileNames, [self._level], isCancelled)
+            if decodedFrames is None:
+                return None
+            return dict((index, None if (decodedLevels is None) else decodedLevels[0])
+                        for index, decodedLevels in zip(indexes, decodedFrames))
+        frames = {}
+        for index, frame in zip(indexes, readFramesParallel(fileNames, readFrame=self._readFrameSafely)):
+            if frame is not None:
+                frames[index] = frame
+        return frames
+
+    def _readFrameSafely(self, fileName):
+        try:
+            return self._readFrame(fileName)
+        except (IOError, OSError) as e:
+            logger.warning('Failed to read image %s: %s', fileName, e)
+            return None
+
+    def _prefetch(self):
+        """
+        Runs on prefetch thread, loading wanted frames until closed.
+        """
+        while True:
+            with self._condition:
+                while not (self._closed or self._wanted):
+                    self._condition.wait()
+                if self._closed:
+                    return
+                indexes = self._wanted
+                self._wanted = []
+                generation = self._generation
+            frames = self._loadFrames(indexes, lambda: self._closed or (generation != self._generation))
+            if frames is None:
+                continue
+            with self._condition:
+                if self._closed:
+                    return
+                # discard frames the window moved away from while loading
+                for index, frame in frames.items():
+                    if index in self._keepIndexes:
+                        self._frames[index] = frame
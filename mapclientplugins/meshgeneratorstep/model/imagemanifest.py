@@ -0,0 +1,134 @@
+"""
+Cached scan of image stack directories, recording the type and size of each image file so
+only new or changed files are opened when the step is executed again.
+"""
+import imghdr
+import json
+import logging
+import os
+from multiprocessing.pool import ThreadPool
+
+from mapclientplugins.meshgeneratorstep.model.outputformat import writeBufferToFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_THREADS = 8
+
+
+def probeImageFile(fileName):
+    """
+    Read image header to get type and dimensions.
+    :return: Dict with type, width and height, where type is None if not an image and width and
+    height are -1 if unknown.
+    """
+    import get_image_size
+
+    imageType = None
+    width = height = -1
+    try:
+        imageType = imghdr.what(fileName)
+        if imageType:
+            width, height = get_image_size.get_image_size(fileName)
+    except Exception:
+        pass
+    return {'type': imageType, 'width': width, 'height': height}
+
+
+class ImageManifest(object):
+    """
+    Manifest of image files at a location, optionally cached in a JSON file. Entries are
+    reused while the file's modification time and size are unchanged; other files are
+    probed concurrently.
+    """
+
+    def __init__(self, fileName=None, threads=DEFAULT_PROBE_THREADS):
+        """
+        :param fileName: Name of JSON file to cache manifest in, or None to not cache.
+        """
+        self._fileName = fileName
+        self._threads = threads
+        self._location = None
+        self._entries = {}
+        self._load()
+
+    def _load(self):
+        if (self._fileName is None) or (not os.path.isfile(self._fileName)):
+            return
+        try:
+            with open(self._fileName, 'r') as f:
+                manifest = json.loads(f.read())
+            self._location = manifest['location']
+            self._entries = manifest['entries']
+        except Exception as e:
+            logger.warning('Ignoring invalid image manifest %s: %s', self._fileName, e)
+            self._location = None
+            self._entries = {}
+
+    def _save(self):
+        if self._fileName is None:
+            return
+        manifest = json.dumps({'location': self._location, 'entries': self._entries}, sort_keys=True)
+        try:
+            writeBufferToFile(manifest.encode('utf-8'), self._fileName)
+        except (IOError, OSError) as e:
+            logger.warning('Failed to write image manifest %s: %s', self._fileName, e)
+
+    def scan(self, location):
+        """
+        Update manifest for image files in location, a directory or single file.
+        :return: List of names of image files at location, in arbitrary order.
+        """
+        if location != self._location:
+            self._location = location
+            self._entries = {}
+        if os.path.isdir(location):
+            fileNames = [os.path.join(location, item) for item in os.listdir(location)]
+        elif os.path.exists(location):
+            fileNames = [location]
+        else:
+            fileNames = []
+        entries = {}
+        probeFileNames = []
+        for fileName in fileNames:
+            try:
+                fileStat = os.stat(fileName)
+            except OSError:
+                continue
+            entry = self._entries.get(fileName)
+            if entry and (entry['mtime'] == fileStat.st_mtime) and (entry['size'] == fileStat.st_size):
+                entries[fileName] = entry
+            else:
+                entries[fileName] = {'mtime': fileStat.st_mtime, 'size': fileStat.st_size}
+                probeFileNames.append(fileName)
+        if probeFileNames:
+            threads = max(1, min(self._threads, len(probeFileNames)))
+            pool = ThreadPool(threads)
+            try:
+                probes = pool.map(probeImageFile, probeFileNames)
+            finally:
+                pool.close()
+                pool.join()
+            for fileName, probe in zip(probeFileNames, probes):
+                entries[fileName].update(probe)
+        changed = bool(probeFileNames) or (len(entries) != len(self._entries))
+        self._entries = entries
+        if changed:
+            self._save()
+        return [fileName for fileName, entry in entries.items() if entry['type']]
+
+    def getImageType(self, fileName):
+        return self._entries[fileName]['type']
+
+    def getFileStat(self, fileName):
+        """
+        :return: mtime, size of file when last scanned.
+        """
+        entry = self._entries[fileName]
+        return entry['mtime'], entry['size']
+
+    def getImageSize(self, fileName):
+        """
+        :return: width, height of image in pixels, -1, -1 if unknown.
+        """
+        entry = self._entries[fileName]
+        return entry['width'], entry['height']
@@ -0,0 +1,124 @@
+"""
+Decoding of image stacks in the background.
+"""
+import logging
+import threading
+
+from PySide import QtCore
+
+from mapclientplugins.meshgeneratorstep.model.framedecoder import joinFrameBuffers
+
+logger = logging.getLogger(__name__)
+
+# every this many frames are decoded first for the preview
+PREVIEW_FRAME_STRIDE = 8
+
+
+class ImageStackLoader(QtCore.QObject):
+    """
+    Decodes image stacks at a resolution level with a FrameDecoder, driven from a worker thread
+    so the GUI stays responsive while they load, delivering the pixels on the thread owning this
+    object to be copied into zinc there. Stacks longer than PREVIEW_FRAME_STRIDE are previewed
+    first: every PREVIEW_FRAME_STRIDE frame is decoded and delivered at a lower preview level, then
+    the remaining frames are decoded and the whole stack is delivered. The preview frames are
+    decoded only once.
+    Only the results of the latest load are delivered; earlier loads are cancelled.
+    """
+
+    _stackDecoded = QtCore.Signal(object, object, object, object)
+
+    def __init__(self, frameDecoder, parent=None):
+        """
+        :param frameDecoder: FrameDecoder to decode frames with.
+        """
+        super(ImageStackLoader, self).__init__(parent)
+        self._frameDecoder = frameDecoder
+        self._loadId = 0
+        self._loading = False
+        self._loadedCallback = None
+        self._stackDecoded.connect(self._stackDecodedReceived)
+
+    def isLoading(self):
+        return self._loading
+
+    def load(self, fileNames, level, loadedCallback, previewLevel=None, decodedCallback=None, readCachedBuffer=None):
+        """
+        Start loading image stack, cancelling any load in progress.
+        :param level: Resolution level, 0 for full resolution, 1 for half resolution etc.
+        :param loadedCallback: Called on this object's thread with (layout, buffer, preview) of
+        decoded pixels, where preview is True for the preview, or (None, None, False) if loading failed.
+        :param previewLevel: Resolution level to preview at, or None for no preview.
+        :param decodedCallback: Optional function called on the worker thread with (layout, buffer)
+        of the whole stack, e.g. to write pixels to a cache. Must not use zinc.
+        :param readCachedBuffer: Optional function called on the worker thread first, returning
+        (layout, buffer) of the whole stack from a cache, or None to decode it. Must not use zinc.
+        """
+        self._loadId += 1
+        self._loading = True
+        self._loadedCallback = loadedCallback
+        thread = threading.Thread(target=self._load, args=(self._loadId, list(fileNames), level, previewLevel,
+                                                           decodedCallback, readCachedBuffer))
+        thread.daemon = True
+        thread.start()
+
+    def cancel(self):
+        """
+        Discard result of any load in progress, and stop decoding its frames.
+        """
+        self._loadId += 1
+        self._loading = False
+        self._loadedCallback = None
+
+    def _load(self, loadId, fileNames, level, previewLevel, decodedCallback, readCachedBuffer):
+        """
+        Runs on worker thread. Results are delivered to _stackDecodedReceived on the owning thread.
+        """
+        isCancelled = lambda: loadId != self._loadId
+        layout = buffer = None
+        try:
+            cached = None if (readCachedBuffer is None) else readCachedBuffer()
+            if cached is not None:
+                self._stackDecoded.emit(loadId, cached[0], cached[1], False)
+                return
+            decodedFrames = [None]*len(fileNames)
+            decoded = [False]*len(fileNames)
+            if (previewLevel is not None) and (len(fileNames) > PREVIEW_FRAME_STRIDE):
+                previewIndexes = list(range(0, len(fileNames), PREVIEW_FRAME_STRIDE))
+                previewFrames = self._frameDecoder.decodeFrames([fileNames[index] for index in previewIndexes],
+                                                                [level, previewLevel], isCancelled)
+                if previewFrames is None:
+                    return
+                for index, decodedLevels in zip(previewIndexes, previewFrames):
+                    decoded[index] = True
+                    if decodedLevels is not None:
+                        decodedFrames[index] = decodedLevels[0]
+                previewLayout, previewBuffer = joinFrameBuffers(
+                    [None if (decodedLevels is None) else decodedLevels[1] for decodedLevels in previewFrames])
+                if previewBuffer is not None:
+                    self._stackDecoded.emit(loadId, previewLayout, previewBuffer, True)
+            remainingIndexes = [index for index in range(len(fileNames)) if not decoded[index]]
+            remainingFrames = self._frameDecoder.decodeFrames([fileNames[index] for index in remainingIndexes],
+                                                              [level], isCancelled)
+            if remainingFrames is None:
+                return
+            for index, decodedLevels in zip(remainingIndexes, remainingFrames):
+                if decodedLevels is not None:
+                    decodedFrames[index] = decodedLevels[0]
+            layout, buffer = joinFrameBuffers(decodedFrames)
+            # release frames before delivering the stack
+            decodedFrames = None
+            if (buffer is not None) and (decodedCallback is not None):
+                decodedCallback(layout, buffer)
+        except Exception as e:
+            logger.warning('Failed to load images: %s', e)
+        self._stackDecoded.emit(loadId, layout, buffer, False)
+
+    def _stackDecodedReceived(self, loadId, layout, buffer, preview):
+        if loadId != self._loadId:
+            return
+        loadedCallback = self._loadedCallback
+        if not preview:
+            self._loading = False
+            self._loadedCallback = None
+        if loadedCallback is not None:
+            loadedCallback(layout, buffer, preview)
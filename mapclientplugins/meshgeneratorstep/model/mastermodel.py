@@ -4,11 +4,25 @@ import json
 from PySide import QtCore
 
 from opencmiss.zinc.context import Context
-from opencmiss.zinc.material import Material
 
+from mapclientplugins.meshgeneratorstep.model.backgroundwriter import BackgroundWriter
+from mapclientplugins.meshgeneratorstep.model.contextsetup import setupContext
 from mapclientplugins.meshgeneratorstep.model.meshgeneratormodel import MeshGeneratorModel
 from mapclientplugins.meshgeneratorstep.model.meshplanemodel import MeshPlaneModel
 from mapclientplugins.meshgeneratorstep.model.fiducialmarkermodel import FiducialMarkerModel
+from mapclientplugins.meshgeneratorstep.model.outputformat import OUTPUT_FORMAT_EX2, getOutputFileExtension, \
+    writeBufferToFile
+from mapclientplugins.meshgeneratorstep.model.playbackengine import PlaybackEngine
+from mapclientplugins.meshgeneratorstep.model.profiler import Profiler
+from mapclientplugins.meshgeneratorstep.model.scaffoldcache import ScaffoldFileCache
+from mapclientplugins.meshgeneratorstep.model.tessellationlod import TessellationLevelOfDetail
+
+SCAFFOLD_CACHE_DIRECTORY_NAME = 'scaffold-cache'
+IMAGE_MANIFEST_FILE_SUFFIX = '-image-manifest.json'
+FRAME_CACHE_DIRECTORY_NAME = 'frame-cache'
+PROFILE_FILE_SUFFIX = '-profile'
+# delay after interaction stops before tessellation is refined
+REFINE_DELAY_MS = 300
 
 
 class MasterModel(object):
@@ -17,17 +31,33 @@ class MasterModel(object):
         self._location = location
         self._identifier = identifier
         self._filenameStem = os.path.join(self._location, self._identifier)
+        self._output_format = OUTPUT_FORMAT_EX2
+        self._highest_dimension_only = False
         self._context = Context("MeshGenerator")
         self._timekeeper = self._context.getTimekeepermodule().getDefaultTimekeeper()
         self._timer = QtCore.QTimer()
+        self._playback_engine = PlaybackEngine()
         self._current_time = 0.0
         self._timeValueUpdate = None
         self._frameIndexUpdate = None
+        self._playbackRateUpdate = None
+        self._sceneChangeCallback = None
+        self._interacting = False
+        self._refineTimer = QtCore.QTimer()
+        self._refineTimer.setSingleShot(True)
+        self._refineTimer.setInterval(REFINE_DELAY_MS)
+        self._writer = BackgroundWriter()
         self._initialise()
         self._region = self._context.createRegion()
         self._generator_model = MeshGeneratorModel(self._region, self._materialmodule)
+        self._generator_model.setScaffoldFileCache(ScaffoldFileCache(os.path.join(self._location, SCAFFOLD_CACHE_DIRECTORY_NAME)))
         self._plane_model = MeshPlaneModel(self._region)
+        self._plane_model.setImageManifestFileName(self._filenameStem + IMAGE_MANIFEST_FILE_SUFFIX)
+        self._plane_model.setFrameCacheDirectory(os.path.join(self._location, FRAME_CACHE_DIRECTORY_NAME))
         self._fiducial_marker_model = FiducialMarkerModel(self._region)
+        self._profiler = Profiler()
+        self._generator_model.setProfiler(self._profiler)
+        self._plane_model.setProfiler(self._profiler)
         self._fiducial_marker_model.registerGetPlaneInfoMethod(self._plane_model.getPlaneInfo)
         self._settings = {
             'frames-per-second': 25,
@@ -43,58 +73,93 @@ class MasterModel(object):
 
     def _initialise(self):
         self._filenameStem = os.path.join(self._location, self._identifier)
-        tess = self._context.getTessellationmodule().getDefaultTessellation()
-        tess.setRefinementFactors(12)
-        # set up standard materials and glyphs so we can use them elsewhere
+        setupContext(self._context)
         self._materialmodule = self._context.getMaterialmodule()
-        self._materialmodule.defineStandardMaterials()
-        solid_blue = self._materialmodule.createMaterial()
-        solid_blue.setName('solid_blue')
-        solid_blue.setManaged(True)
-        solid_blue.setAttributeReal3(Material.ATTRIBUTE_AMBIENT, [ 0.0, 0.2, 0.6 ])
-        solid_blue.setAttributeReal3(Material.ATTRIBUTE_DIFFUSE, [ 0.0, 0.7, 1.0 ])
-        solid_blue.setAttributeReal3(Material.ATTRIBUTE_EMISSION, [ 0.0, 0.0, 0.0 ])
-        solid_blue.setAttributeReal3(Material.ATTRIBUTE_SPECULAR, [ 0.1, 0.1, 0.1 ])
-        solid_blue.setAttributeReal(Material.ATTRIBUTE_SHININESS , 0.2)
-        trans_blue = self._materialmodule.createMaterial()
-        trans_blue.setName('trans_blue')
-        trans_blue.setManaged(True)
-        trans_blue.setAttributeReal3(Material.ATTRIBUTE_AMBIENT, [ 0.0, 0.2, 0.6 ])
-        trans_blue.setAttributeReal3(Material.ATTRIBUTE_DIFFUSE, [ 0.0, 0.7, 1.0 ])
-        trans_blue.setAttributeReal3(Material.ATTRIBUTE_EMISSION, [ 0.0, 0.0, 0.0 ])
-        trans_blue.setAttributeReal3(Material.ATTRIBUTE_SPECULAR, [ 0.1, 0.1, 0.1 ])
-        trans_blue.setAttributeReal(Material.ATTRIBUTE_ALPHA , 0.3)
-        trans_blue.setAttributeReal(Material.ATTRIBUTE_SHININESS , 0.2)
-        glyphmodule = self._context.getGlyphmodule()
-        glyphmodule.defineStandardGlyphs()
+        self._tessellation_lod = TessellationLevelOfDetail(self._context.getTessellationmodule())
 
     def _makeConnections(self):
         self._timer.timeout.connect(self._timeout)
+        self._refineTimer.timeout.connect(self._refineTessellation)
+        self._generator_model.registerSceneChangeCallback(self._sceneChanged)
+
+    def _sceneChanged(self):
+        generator_model = self._generator_model
+        self._tessellation_lod.updateMeshSize(generator_model.getMeshSize(2), generator_model.getMeshSize(1))
+        if self._sceneChangeCallback is not None:
+            self._sceneChangeCallback()
+
+    def setInteracting(self, interacting):
+        """
+        Use coarse tessellation while the user is interacting with the view, refining it
+        shortly after interaction stops unless playing.
+        """
+        self._interacting = interacting
+        if interacting:
+            self._refineTimer.stop()
+            self._tessellation_lod.setInteractive(True)
+        elif not self._timer.isActive():
+            self._refineTimer.start()
+
+    def wheelTurned(self):
+        """
+        Delay refinement after each wheel step, switching to coarse tessellation only if further
+        steps arrive before the refinement delay expires.
+        """
+        if self._refineTimer.isActive():
+            self._tessellation_lod.setInteractive(True)
+        if not self._timer.isActive():
+            self._refineTimer.start()
+
+    def _refineTessellation(self):
+        if not (self._interacting or self._timer.isActive()):
+            self._tessellation_lod.setInteractive(False)
 
     def _timeout(self):
-        self._current_time += 1000/self._settings['frames-per-second']/1000
-        duration = self._plane_model.getFrameCount() / self._settings['frames-per-second']
-        if self._settings['time-loop'] and self._current_time > duration:
-            self._current_time -= duration
-        self._timekeeper.setTime(self._scaleCurrentTimeToTimekeeperTime())
+        self._current_time = self._playback_engine.beginTick()
+        duration = self._plane_model.getFrameTimeline(self._settings['frames-per-second']).getDuration()
+        if self._settings['time-loop'] and self._current_time > duration > 0:
+            self._current_time %= duration
+            self._playback_engine.seek(self._current_time)
+        self._updateTimekeeperTime()
         self._timeValueUpdate(self._current_time)
         if not self._plane_model.isDisabled():
             frame_index = self._plane_model.getFrameIndexForTime(self._current_time, self._settings['frames-per-second']) + 1
             self._frameIndexUpdate(frame_index)
+        # the scene viewer renders from a queued call made during the tick, so end the tick after it
+        QtCore.QTimer.singleShot(0, self._playback_engine.endTick)
+        if self._timer.isActive():
+            interval = self._playback_engine.getTimerInterval()
+            if interval != self._timer.interval():
+                self._timer.setInterval(interval)
+            if self._playbackRateUpdate is not None:
+                self._playbackRateUpdate(self._playback_engine.getAchievedFramesPerSecond(),
+                                         self._playback_engine.getTargetFramesPerSecond(),
+                                         self._playback_engine.getDroppedFrameCount())
+
+    def _updateTimekeeperTime(self):
+        timekeeper_time = self._scaleCurrentTimeToTimekeeperTime()
+        self._plane_model.updateImageWindow(timekeeper_time)
+        self._timekeeper.setTime(timekeeper_time)
 
     def _scaleCurrentTimeToTimekeeperTime(self):
-        scaled_time = 0.0
-        duration = self._plane_model.getFrameCount() / self._settings['frames-per-second']
-        if duration > 0:
-            scaled_time = self._current_time/duration
-
-        return scaled_time
+        return self._plane_model.getFrameTimeline(self._settings['frames-per-second']).getNormalisedTime(self._current_time)
 
     def getIdentifier(self):
         return self._identifier
 
+    def getOutputFormat(self):
+        return self._output_format
+
+    def setOutputFormat(self, output_format, highest_dimension_only=False):
+        """
+        :param output_format: One of the formats in outputformat.OUTPUT_FORMATS.
+        :param highest_dimension_only: If True write only the highest dimension mesh and nodes.
+        """
+        self._output_format = output_format
+        self._highest_dimension_only = highest_dimension_only
+
     def getOutputModelFilename(self):
-        return self._filenameStem + '.ex2'
+        return self._filenameStem + '.' + getOutputFileExtension(self._output_format)
 
     def getGeneratorModel(self):
         return self._generator_model
@@ -114,17 +179,22 @@ class MasterModel(object):
     def setFrameIndex(self, frame_index):
         frame_value = frame_index - 1
         self._current_time = self._plane_model.getTimeForFrameIndex(frame_value, self._settings['frames-per-second'])
-        self._timekeeper.setTime(self._scaleCurrentTimeToTimekeeperTime())
+        self._playback_engine.seek(self._current_time)
+        self._updateTimekeeperTime()
         self._timeValueUpdate(self._current_time)
 
     def setTimeValue(self, time):
         self._current_time = time
-        self._timekeeper.setTime(self._scaleCurrentTimeToTimekeeperTime())
+        self._playback_engine.seek(time)
+        self._updateTimekeeperTime()
         frame_index = self._plane_model.getFrameIndexForTime(time, self._settings['frames-per-second']) + 1
         self._frameIndexUpdate(frame_index)
 
     def setFramesPerSecond(self, value):
         self._settings['frames-per-second'] = value
+        self._playback_engine.setTargetFramesPerSecond(value, self._current_time)
+        if self._timer.isActive():
+            self._timer.setInterval(self._playback_engine.getTimerInterval())
 
     def getFramesPerSecond(self):
         return self._settings['frames-per-second']
@@ -135,11 +205,31 @@ class MasterModel(object):
     def isTimeLoop(self):
         return self._settings['time-loop']
 
+    def isAdaptiveFrameDropping(self):
+        return self._playback_engine.isAdaptive()
+
+    def setAdaptiveFrameDropping(self, state):
+        """
+        Set whether the playback timer slows to the measured cost of showing a frame, dropping frames
+        evenly when rendering cannot keep up with the frame rate.
+        """
+        self._playback_engine.setAdaptive(state)
+
+    def getPlaybackEngine(self):
+        return self._playback_engine
+
     def play(self):
-        self._timer.start(1000/self._settings['frames-per-second'])
+        self._refineTimer.stop()
+        self._tessellation_lod.setInteractive(True)
+        self._playback_engine.setTargetFramesPerSecond(self._settings['frames-per-second'])
+        self._playback_engine.start(self._current_time)
+        self._timer.start(self._playback_engine.getTimerInterval())
 
     def stop(self):
         self._timer.stop()
+        self._playback_engine.stop()
+        if not self._interacting:
+            self._refineTimer.start()
 
     def registerFrameIndexUpdateCallback(self, frameIndexUpdateCallback):
         self._frameIndexUpdate = frameIndexUpdateCallback
@@ -147,12 +237,47 @@ class MasterModel(object):
     def registerTimeValueUpdateCallback(self, timeValueUpdateCallback):
         self._timeValueUpdate = timeValueUpdateCallback
 
-    def registerSceneChangeCallback(self, sceneChangeCallback):
-        self._generator_model.registerSceneChangeCallback(sceneChangeCallback)
+    def registerPlaybackRateUpdateCallback(self, playbackRateUpdateCallback):
+        """
+        :param playbackRateUpdateCallback: Called during playback with achieved frames per second,
+        target frames per second and number of frames dropped.
+        """
+        self._playbackRateUpdate = playbackRateUpdateCallback
 
-    def done(self):
-        self._saveSettings()
-        self._generator_model.writeModel(self.getOutputModelFilename())
+    def registerSceneChangeCallback(self, sceneChangeCallback):
+        self._sceneChangeCallback = sceneChangeCallback
+
+    def getProfiler(self):
+        return self._profiler
+
+    def done(self, written_callback=None):
+        """
+        Serialise settings and model on this thread, then write them on a worker thread, each to
+        a temporary file renamed into place so downstream steps never read partial files.
+        :param written_callback: Called on this thread when writing completes, with None on
+        success or an error message.
+        """
+        generator_model = self._generator_model
+        with self._profiler.stage('done', lambda: {'nodeCount': generator_model.getNodeCount(),
+                                                   'elementCount': generator_model.getElementCount()}):
+            settings_buffer = self._getSettingsBuffer()
+            model_writer = generator_model.getModelWriter(self._output_format, self._highest_dimension_only)
+        if self._profiler.isEnabled():
+            self._profiler.writeJson(self._filenameStem + PROFILE_FILE_SUFFIX + '.json')
+            self._profiler.writeCsv(self._filenameStem + PROFILE_FILE_SUFFIX + '.csv')
+        settings_file_name = self._filenameStem + '-settings.json'
+        model_file_name = self.getOutputModelFilename()
+        self._writer.write([lambda: writeBufferToFile(settings_buffer, settings_file_name),
+                            lambda: model_writer(model_file_name)], written_callback)
+
+    def close(self):
+        """
+        Stop playback and background image loading. Call once done writing, before dropping the model.
+        """
+        self._timer.stop()
+        self._playback_engine.stop()
+        self._refineTimer.stop()
+        self._plane_model.close()
 
     def _getSettings(self):
         settings = self._settings
@@ -180,8 +305,10 @@ class MasterModel(object):
         self._plane_model.setSettings(settings['image_plane_settings'])
         self._fiducial_marker_model.setSettings(settings['fiducial-markers'])
 
-    def _saveSettings(self):
+    def _getSettingsBuffer(self):
+        """
+        :return: Settings serialised as JSON bytes.
+        """
         settings = self._getSettings()
-        with open(self._filenameStem + '-settings.json', 'w') as f:
-            f.write(json.dumps(settings, default=lambda o: o.__dict__, sort_keys=True, indent=4))
+        return json.dumps(settings, default=lambda o: o.__dict__, sort_keys=True, indent=4).encode('utf-8')
 
@@ -4,17 +4,42 @@ Created on 9 Mar, 2018 from mapclientplugins.meshgeneratorstep.
 @author: Richard Christie
 """
 
-import string
-
 from opencmiss.zinc.field import Field
 from opencmiss.zinc.glyph import Glyph
 from opencmiss.zinc.graphics import Graphics
 from opencmiss.zinc.node import Node
-from scaffoldmaker.scaffoldmaker import Scaffoldmaker
+from opencmiss.zinc.scenecoordinatesystem import SCENECOORDINATESYSTEM_LOCAL, \
+    SCENECOORDINATESYSTEM_NORMALISED_WINDOW_FILL
+from opencmiss.zinc.status import OK as RESULT_OK
 
+from mapclientplugins.meshgeneratorstep.model.elementranges import mergeRanges, parseRangesText
 from mapclientplugins.meshgeneratorstep.model.meshalignmentmodel import MeshAlignmentModel
+from mapclientplugins.meshgeneratorstep.model.meshtyperegistry import getMeshTypeRegistry
+from mapclientplugins.meshgeneratorstep.model.outputformat import OUTPUT_FORMAT_EX2, copyFile, serialiseRegion, \
+    writeBufferToFile
+from mapclientplugins.meshgeneratorstep.model.profiler import Profiler
+from mapclientplugins.meshgeneratorstep.model.scaffoldbuilder import generateScaffoldBuffer, readRegionFromBuffer
+from mapclientplugins.meshgeneratorstep.model.scaffoldcache import ScaffoldCache, getScaffoldKey
+from mapclientplugins.meshgeneratorstep.model.tessellationlod import LINES_TESSELLATION_NAME, SURFACES_TESSELLATION_NAME
 
 STRING_FLOAT_FORMAT = '{:.8g}'
+# names of graphics and the display settings controlling them, in drawing order
+GRAPHICS_NAMES = (
+    'displayAxes',
+    'displayLines',
+    'displayNodeNumbers',
+    'displayElementNumbers',
+    'displaySurfaces',
+    'displayNodeDerivatives',
+    'displayXiAxes'
+)
+# modes limiting node and element number labels to those in view or near centre of view
+LABEL_MODE_ALL = 'all'
+LABEL_MODE_VIEW = 'view'
+LABEL_MODE_CENTRE = 'centre'
+LABEL_MODES = (LABEL_MODE_ALL, LABEL_MODE_VIEW, LABEL_MODE_CENTRE)
+# radius of region labelled in centre mode, in normalised window coordinates ranging from -1 to 1
+LABEL_CENTRE_RADIUS = 0.25
 
 
 class MeshGeneratorModel(MeshAlignmentModel):
@@ -27,10 +52,24 @@ class MeshGeneratorModel(MeshAlignmentModel):
         self._region_name = "generated_mesh"
         self._parent_region = region
         self._materialmodule = material_module
+        self._materials = {}
         self._region = None
+        self._graphicsMeshDimension = None
         self._sceneChangeCallback = None
+        self._updateRequestCallback = None
+        self._updatePending = False
         self._deleteElementRanges = []
         self._scale = [ 1.0, 1.0, 1.0 ]
+        # state of base mesh generated for current mesh type and options, and modifications applied to it
+        self._baseMeshKey = None
+        self._baseMeshBuffer = None
+        self._builtBaseMesh = None
+        self._appliedDeleteElementRanges = []
+        self._appliedScale = [ 1.0, 1.0, 1.0 ]
+        self._deletedNodeCount = 0
+        self._scaffoldCache = ScaffoldCache()
+        self._scaffoldFileCache = None
+        self._profiler = Profiler(False)
         self._settings = {
             'meshTypeName' : '',
             'meshTypeOptions' : { },
@@ -45,48 +84,74 @@ class MeshGeneratorModel(MeshAlignmentModel):
             'displaySurfacesExterior' : True,
             'displaySurfacesTranslucent' : True,
             'displaySurfacesWireframe' : False,
-            'displayXiAxes' : False
+            'displayXiAxes' : False,
+            'labelMode' : LABEL_MODE_ALL,
+            'labelStride' : 1
         }
-        self._discoverAllMeshTypes()
+        self._labelSceneviewer = None
+        # mesh types are discovered on first use as importing scaffoldmaker is slow
+        self._meshTypeRegistry = None
+        self._currentMeshType = None
 
     def _discoverAllMeshTypes(self):
-        scaffoldmaker = Scaffoldmaker()
-        self._meshTypes = scaffoldmaker.getMeshTypes()
-        self._currentMeshType = scaffoldmaker.getDefaultMeshType()
-        self._settings['meshTypeName'] = self._currentMeshType.getName()
-        self._settings['meshTypeOptions'] = self._currentMeshType.getDefaultOptions()
+        self._meshTypeRegistry = getMeshTypeRegistry()
+        if self._currentMeshType is None:
+            self._currentMeshType = self._meshTypeRegistry.getDefaultMeshType()
+        if not self._settings['meshTypeName']:
+            self._settings['meshTypeName'] = self._currentMeshType.getName()
+            self._settings['meshTypeOptions'] = self._meshTypeRegistry.getDefaultOptions(self._currentMeshType)
+
+    def _getMeshTypeRegistry(self):
+        if self._meshTypeRegistry is None:
+            self._discoverAllMeshTypes()
+        return self._meshTypeRegistry
+
+    def _getCurrentMeshType(self):
+        """
+        :return: Current mesh type, discovering mesh types and defaulting settings to the
+        default mesh type on first use.
+        """
+        if self._meshTypeRegistry is None:
+            self._discoverAllMeshTypes()
+        return self._currentMeshType
 
     def getAllMeshTypeNames(self):
-        meshTypeNames = []
-        for meshType in self._meshTypes:
-            meshTypeNames.append(meshType.getName())
-        return meshTypeNames
+        return self._getMeshTypeRegistry().getNames()
 
     def getMeshTypeName(self):
+        self._getCurrentMeshType()
         return self._settings['meshTypeName']
 
     def _getMeshTypeByName(self, name):
-        for meshType in self._meshTypes:
-            if meshType.getName() == name:
-                return meshType
-        return None
+        return self._getMeshTypeRegistry().getMeshTypeByName(name)
 
     def setMeshTypeByName(self, name):
         meshType = self._getMeshTypeByName(name)
         if meshType is not None:
-            if meshType != self._currentMeshType:
+            if meshType != self._getCurrentMeshType():
                 self._currentMeshType = meshType
                 self._settings['meshTypeName'] = self._currentMeshType.getName()
-                self._settings['meshTypeOptions'] = self._currentMeshType.getDefaultOptions()
-                self._generateMesh()
+                self._settings['meshTypeOptions'] = self._meshTypeRegistry.getDefaultOptions(meshType)
+                self._requestUpdate()
 
     def getMeshTypeOrderedOptionNames(self):
-        return self._currentMeshType.getOrderedOptionNames()
+        return self._getMeshTypeRegistry().getOrderedOptionNames(self._getCurrentMeshType())
 
     def getMeshTypeOption(self, key):
+        self._getCurrentMeshType()
         return self._settings['meshTypeOptions'][key]
 
+    def resetMeshTypeOptions(self):
+        """
+        Reset all options for the current mesh type to their defaults.
+        """
+        defaultOptions = self._getMeshTypeRegistry().getDefaultOptions(self._getCurrentMeshType())
+        if self._settings['meshTypeOptions'] != defaultOptions:
+            self._settings['meshTypeOptions'] = defaultOptions
+            self._requestUpdate()
+
     def setMeshTypeOption(self, key, value):
+        self._getCurrentMeshType()
         oldValue = self._settings['meshTypeOptions'][key]
         # print('setMeshTypeOption: key ', key, ' value ', str(value))
         newValue = None
@@ -105,10 +170,10 @@ class MeshGeneratorModel(MeshAlignmentModel):
             print('setMeshTypeOption: Invalid value')
             return
         self._settings['meshTypeOptions'][key] = newValue
-        self._currentMeshType.checkOptions(self._settings['meshTypeOptions'])
+        self._getCurrentMeshType().checkOptions(self._settings['meshTypeOptions'])
         # print('final value = ', self._settings['meshTypeOptions'][key])
         if self._settings['meshTypeOptions'][key] != oldValue:
-            self._generateMesh()
+            self._requestUpdate()
 
     def getDeleteElementsRangesText(self):
         return self._settings['deleteElementRanges']
@@ -117,40 +182,7 @@ class MeshGeneratorModel(MeshAlignmentModel):
         """
         :return: True if ranges changed, otherwise False
         """
-        elementRanges = []
-        for elementRangeText in elementRangesTextIn.split(','):
-            try:
-                elementRangeEnds = elementRangeText.split('-')
-                # remove trailing non-numeric characters, workaround for select 's' key ending up there
-                for e in range(len(elementRangeEnds)):
-                    size = len(elementRangeEnds[e])
-                    for i in range(size):
-                        if elementRangeEnds[e][size - i - 1] in string.digits:
-                            break;
-                    if i > 0:
-                        elementRangeEnds[e] = elementRangeEnds[e][:(size - i)]
-                elementRangeStart = int(elementRangeEnds[0])
-                if len(elementRangeEnds) > 1:
-                    elementRangeStop = int(elementRangeEnds[1])
-                else:
-                    elementRangeStop = elementRangeStart
-                if elementRangeStop >= elementRangeStart:
-                    elementRanges.append([elementRangeStart, elementRangeStop])
-                else:
-                    elementRanges.append([elementRangeStop, elementRangeStart])
-            except:
-                pass
-        elementRanges.sort()
-        elementRangesText = ''
-        first = True
-        for elementRange in elementRanges:
-            if first:
-                first = False
-            else:
-                elementRangesText += ','
-            elementRangesText += str(elementRange[0])
-            if elementRange[1] != elementRange[0]:
-                elementRangesText += '-' + str(elementRange[1])
+        elementRanges, elementRangesText = parseRangesText(elementRangesTextIn)
         changed = self._deleteElementRanges != elementRanges
         self._deleteElementRanges = elementRanges
         self._settings['deleteElementRanges'] = elementRangesText
@@ -158,7 +190,7 @@ class MeshGeneratorModel(MeshAlignmentModel):
 
     def setDeleteElementsRangesText(self, elementRangesTextIn):
         if self._parseDeleteElementsRangesText(elementRangesTextIn):
-            self._generateMesh()
+            self._requestUpdate()
 
     def getScaleText(self):
         return self._settings['scale']
@@ -185,18 +217,69 @@ class MeshGeneratorModel(MeshAlignmentModel):
 
     def setScaleText(self, scaleTextIn):
         if self._parseScaleText(scaleTextIn):
-            self._generateMesh()
+            self._requestUpdate()
 
     def registerSceneChangeCallback(self, sceneChangeCallback):
         self._sceneChangeCallback = sceneChangeCallback
 
+    def registerUpdateRequestCallback(self, updateRequestCallback):
+        """
+        Register callback to be notified when a settings change requires the mesh to be updated.
+        While registered, updates are deferred until updateMesh() is called so several changes
+        can be coalesced into one update. Register None to update immediately on each change.
+        """
+        self._updateRequestCallback = updateRequestCallback
+
+    def isUpdatePending(self):
+        return self._updatePending
+
+    def _requestUpdate(self):
+        self._updatePending = True
+        if self._updateRequestCallback is not None:
+            self._updateRequestCallback()
+        else:
+            self.updateMesh()
+
+    def getPendingBaseMeshBuild(self):
+        """
+        Query whether a pending update needs a new base mesh to be generated, so it can be
+        built elsewhere e.g. with generateScaffoldBuffer() on a worker thread.
+        :return: (key, meshType, meshTypeOptions) for base mesh to generate, or None if
+        no generation is needed. Options are a copy safe to use from another thread.
+        """
+        if not self._updatePending:
+            return None
+        key = self._getBaseMeshKey()
+        if ((key == self._baseMeshKey) and (self._baseMeshBuffer is not None)) or \
+                (self._scaffoldCache.get(key) is not None):
+            return None
+        return key, self._getCurrentMeshType(), dict(self._settings['meshTypeOptions'])
+
+    def addBaseMeshBuffer(self, key, buffer):
+        """
+        Supply base mesh built for key elsewhere, to be used by the next update if still current.
+        """
+        self._builtBaseMesh = (key, buffer)
+        self._scaffoldCache.put(key, buffer)
+
+    def updateMesh(self):
+        """
+        Apply any pending settings changes to the mesh.
+        """
+        if self._updatePending:
+            self._updatePending = False
+            self._updateMesh()
+
     def _getVisibility(self, graphicsName):
         return self._settings[graphicsName]
 
     def _setVisibility(self, graphicsName, show):
         self._settings[graphicsName] = show
         graphics = self._region.getScene().findGraphicsByName(graphicsName)
-        graphics.setVisibilityFlag(show)
+        if graphics.isValid():
+            graphics.setVisibilityFlag(show)
+        elif show:
+            self._createGraphicsByName(graphicsName)
 
     def isDisplayAxes(self):
         return self._getVisibility('displayAxes')
@@ -223,11 +306,15 @@ class MeshGeneratorModel(MeshAlignmentModel):
         graphicsName = 'displayNodeDerivatives'
         self._settings[graphicsName] = show
         scene = self._region.getScene()
+        found = False
         graphics = scene.getFirstGraphics()
         while graphics.isValid():
             if graphics.getName() == graphicsName:
                 graphics.setVisibilityFlag(show)
+                found = True
             graphics = scene.getNextGraphics(graphics)
+        if show and not found:
+            self._createGraphicsByName(graphicsName)
 
     def isDisplayNodeNumbers(self):
         return self._getVisibility('displayNodeNumbers')
@@ -247,7 +334,8 @@ class MeshGeneratorModel(MeshAlignmentModel):
     def setDisplaySurfacesExterior(self, isExterior):
         self._settings['displaySurfacesExterior'] = isExterior
         surfaces = self._region.getScene().findGraphicsByName('displaySurfaces')
-        surfaces.setExterior(self.isDisplaySurfacesExterior() if (self.getMeshDimension() == 3) else False)
+        if surfaces.isValid():
+            surfaces.setExterior(self.isDisplaySurfacesExterior() if (self.getMeshDimension() == 3) else False)
 
     def isDisplaySurfacesTranslucent(self):
         return self._settings['displaySurfacesTranslucent']
@@ -255,8 +343,9 @@ class MeshGeneratorModel(MeshAlignmentModel):
     def setDisplaySurfacesTranslucent(self, isTranslucent):
         self._settings['displaySurfacesTranslucent'] = isTranslucent
         surfaces = self._region.getScene().findGraphicsByName('displaySurfaces')
-        surfacesMaterial = self._materialmodule.findMaterialByName('trans_blue' if isTranslucent else 'solid_blue')
-        surfaces.setMaterial(surfacesMaterial)
+        if surfaces.isValid():
+            surfacesMaterial = self._getMaterial('trans_blue' if isTranslucent else 'solid_blue')
+            surfaces.setMaterial(surfacesMaterial)
 
     def isDisplaySurfacesWireframe(self):
         return self._settings['displaySurfacesWireframe']
@@ -264,7 +353,8 @@ class MeshGeneratorModel(MeshAlignmentModel):
     def setDisplaySurfacesWireframe(self, isWireframe):
         self._settings['displaySurfacesWireframe'] = isWireframe
         surfaces = self._region.getScene().findGraphicsByName('displaySurfaces')
-        surfaces.setRenderPolygonMode(Graphics.RENDER_POLYGON_MODE_WIREFRAME if isWireframe else Graphics.RENDER_POLYGON_MODE_SHADED)
+        if surfaces.isValid():
+            surfaces.setRenderPolygonMode(Graphics.RENDER_POLYGON_MODE_WIREFRAME if isWireframe else Graphics.RENDER_POLYGON_MODE_SHADED)
 
     def isDisplayXiAxes(self):
         return self._getVisibility('displayXiAxes')
@@ -272,6 +362,34 @@ class MeshGeneratorModel(MeshAlignmentModel):
     def setDisplayXiAxes(self, show):
         self._setVisibility('displayXiAxes', show)
 
+    def getLabelMode(self):
+        return self._settings['labelMode']
+
+    def setLabelMode(self, labelMode):
+        """
+        :param labelMode: One of LABEL_MODES. Modes other than all need a sceneviewer to be set.
+        """
+        if labelMode in LABEL_MODES:
+            self._settings['labelMode'] = labelMode
+            self._updateLabelSubgroups()
+
+    def getLabelStride(self):
+        return self._settings['labelStride']
+
+    def setLabelStride(self, labelStride):
+        """
+        Only label every labelStride-th node and element, in identifier order.
+        """
+        self._settings['labelStride'] = max(1, int(labelStride))
+        self._updateLabelSubgroups()
+
+    def setLabelSceneviewer(self, sceneviewer):
+        """
+        Set sceneviewer whose view determines which entities are labelled.
+        """
+        self._labelSceneviewer = sceneviewer
+        self._updateLabelSubgroups()
+
     def needPerturbLines(self):
         """
         Return if solid surfaces are drawn with lines, requiring perturb lines to be activated.
@@ -296,7 +414,24 @@ class MeshGeneratorModel(MeshAlignmentModel):
     def getMeshDimension(self):
         return self._getMesh().getDimension()
 
+    def getNodeCount(self):
+        fm = self._region.getFieldmodule()
+        return fm.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES).getSize()
+
+    def getMeshSize(self, dimension):
+        """
+        :return: Number of elements of dimension, including faces and lines.
+        """
+        return self._region.getFieldmodule().findMeshByDimension(dimension).getSize()
+
+    def getElementCount(self):
+        """
+        :return: Number of elements in the highest dimension mesh.
+        """
+        return self._getMesh().getSize()
+
     def getSettings(self):
+        self._getCurrentMeshType()
         return self._settings
 
     def setSettings(self, settings):
@@ -305,130 +440,610 @@ class MeshGeneratorModel(MeshAlignmentModel):
         self._parseDeleteElementsRangesText(self._settings['deleteElementRanges'])
         # merge any new options for this generator
         savedMeshTypeOptions = self._settings['meshTypeOptions']
-        self._settings['meshTypeOptions'] = self._currentMeshType.getDefaultOptions()
+        self._settings['meshTypeOptions'] = self._meshTypeRegistry.getDefaultOptions(self._currentMeshType)
         self._settings['meshTypeOptions'].update(savedMeshTypeOptions)
         self._parseScaleText(self._settings['scale'])
-        self._generateMesh()
+        self._updatePending = False
+        cachedFileName = None
+        if self._scaffoldFileCache is not None:
+            cachedFileName = self._scaffoldFileCache.getFileName(self._getGeneratedMeshKey())
+        if cachedFileName is not None:
+            self._loadMesh(cachedFileName)
+        else:
+            self._generateMesh()
+
+    def _loadMesh(self, fileName):
+        """
+        Load final mesh previously generated with the current settings from file.
+        No base mesh is available so any subsequent change regenerates the mesh.
+        """
+        self._readMesh(lambda region: region.readFile(fileName))
+        self._baseMeshKey = None
+        self._baseMeshBuffer = None
+        self._appliedDeleteElementRanges = [ list(deleteElementRange) for deleteElementRange in self._deleteElementRanges ]
+        self._appliedScale = list(self._scale)
+        self._updateGraphics()
+        if self._sceneChangeCallback is not None:
+            self._sceneChangeCallback()
+
+    def _getBaseMeshKey(self):
+        """
+        :return: Key identifying the base mesh generated for the current mesh type and options.
+        """
+        self._getCurrentMeshType()
+        return getScaffoldKey(self._settings['meshTypeName'], self._settings['meshTypeOptions'])
+
+    def getScaffoldCache(self):
+        """
+        :return: Cache of base meshes previously generated for mesh type and options.
+        """
+        return self._scaffoldCache
+
+    def setScaffoldFileCache(self, scaffoldFileCache):
+        """
+        Set optional on-disk cache of generated meshes consulted when settings are applied
+        and updated when the model is written.
+        :param scaffoldFileCache: ScaffoldFileCache or None to disable.
+        """
+        self._scaffoldFileCache = scaffoldFileCache
+
+    def getProfiler(self):
+        return self._profiler
+
+    def setProfiler(self, profiler):
+        """
+        Set profiler recording generateMesh and createGraphics stages, if enabled.
+        """
+        self._profiler = profiler
+
+    def _getGeneratedMeshKey(self):
+        """
+        :return: Key identifying the final mesh generated from all settings affecting it.
+        """
+        self._getCurrentMeshType()
+        return getScaffoldKey(self._settings['meshTypeName'], {
+            'meshTypeOptions': self._settings['meshTypeOptions'],
+            'deleteElementRanges': self._settings['deleteElementRanges'],
+            'scale': self._settings['scale']})
 
     def _generateMesh(self):
-        if self._region:
+        """
+        Generate base mesh for current mesh type and options, or get it from the scaffold cache,
+        keeping it so later changes to delete element ranges and scale can be applied incrementally.
+        The mesh replaces the previous one in the persistent region, reusing its fields and graphics.
+        """
+        with self._profiler.stage('generateMesh', self._getProfileCounts):
+            self._baseMeshKey = self._getBaseMeshKey()
+            self._baseMeshBuffer = self._scaffoldCache.get(self._baseMeshKey)
+            if (self._baseMeshBuffer is None) and (self._builtBaseMesh is not None) and \
+                    (self._builtBaseMesh[0] == self._baseMeshKey):
+                self._baseMeshBuffer = self._builtBaseMesh[1]
+            self._builtBaseMesh = None
+            if self._baseMeshBuffer is None:
+                self._baseMeshBuffer = generateScaffoldBuffer(self._getCurrentMeshType(), self._settings['meshTypeOptions'])
+                self._scaffoldCache.put(self._baseMeshKey, self._baseMeshBuffer)
+            self._restoreBaseMesh()
+            fm = self._region.getFieldmodule()
+            fm.beginChange()
+            self._deleteElements()
+            fm.defineAllFaces()
+            self._applyScale()
+            fm.endChange()
+            self._updateGraphics()
+        if self._sceneChangeCallback is not None:
+            self._sceneChangeCallback()
+
+    def _updateMesh(self):
+        """
+        Bring mesh up to date with current settings. Only regenerates if mesh type or options
+        have changed since the base mesh was generated, otherwise restores the cached base mesh
+        if delete element ranges or scale changed, and scales its coordinates.
+        """
+        if (self._region is None) or (self._baseMeshBuffer is None) or \
+                (self._baseMeshKey != self._getBaseMeshKey()):
+            self._generateMesh()
+            return
+        if (self._appliedDeleteElementRanges != self._deleteElementRanges) or (self._appliedScale != self._scale):
+            self._restoreBaseMesh()
+            fm = self._region.getFieldmodule()
+            fm.beginChange()
+            self._deleteElements()
+            fm.defineAllFaces()
+            self._applyScale()
+            fm.endChange()
+        self._updateGraphics()
+        if self._sceneChangeCallback is not None:
+            self._sceneChangeCallback()
+
+    def _readMesh(self, readFunction):
+        """
+        Replace all nodes and elements in the generated mesh region with those read by readFunction,
+        creating the region on first use. Existing fields read again are kept and merged with those
+        read so graphics referencing them remain valid; fields and groups of the previous mesh which
+        are not read again are destroyed so they are not written with the model. If the fields read
+        are incompatible with existing fields the region is recreated.
+        :param readFunction: Function reading mesh into the region passed to it, returning zinc result.
+        """
+        if self._region is not None:
+            fm = self._region.getFieldmodule()
+            fm.beginChange()
+            for dimension in range(3, 0, -1):
+                fm.findMeshByDimension(dimension).destroyAllElements()
+            fm.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES).destroyAllNodes()
+            previousFieldNames = self._unmanageMeshFields()
+            result = readFunction(self._region)
+            if result == RESULT_OK:
+                self._manageReadFields(previousFieldNames)
+            fm.endChange()
+            if result == RESULT_OK:
+                return
             self._parent_region.removeChild(self._region)
         self._region = self._parent_region.createChild(self._region_name)
         self._scene = self._region.getScene()
+        self._graphicsMeshDimension = None
+        readFunction(self._region)
+
+    def _unmanageMeshFields(self):
+        """
+        Unmanage finite element fields and groups of the mesh in the region, so they are destroyed
+        unless read again or referenced. Fields owned by graphics are unmanaged already.
+        Call with no nodes or elements in the region.
+        :return: Names of all finite element fields and groups, including those left unmanaged by
+        a previous read which survive because they are referenced.
+        """
         fm = self._region.getFieldmodule()
-        fm.beginChange()
-        # logger = self._context.getLogger()
-        self._currentMeshType.generateMesh(self._region, self._settings['meshTypeOptions'])
-        # loggerMessageCount = logger.getNumberOfMessages()
-        # if loggerMessageCount > 0:
-        #     for i in range(1, loggerMessageCount + 1):
-        #         print(logger.getMessageTypeAtIndex(i), logger.getMessageTextAtIndex(i))
-        #     logger.removeAllMessages()
-        mesh = self._getMesh()
-        # meshDimension = mesh.getDimension()
-        nodes = fm.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        fieldNames = []
+        fielditerator = fm.createFielditerator()
+        field = fielditerator.next()
+        while field.isValid():
+            if field.castFiniteElement().isValid() or field.castGroup().isValid():
+                fieldNames.append(field.getName())
+                field.setManaged(False)
+            field = fielditerator.next()
+        return fieldNames
+
+    def _manageReadFields(self, previousFieldNames):
+        """
+        Manage fields named by _unmanageMeshFields which survived because they are referenced,
+        e.g. by graphics, if they were read again. Fields newly created by reading are managed already.
+        """
+        fm = self._region.getFieldmodule()
+        for fieldName in previousFieldNames:
+            field = fm.findFieldByName(fieldName)
+            if (not field.isValid()) or field.isManaged():
+                continue
+            group = field.castGroup()
+            if group.isValid():
+                if not group.isEmpty():
+                    field.setManaged(True)
+            elif self._isFieldDefined(field):
+                field.setManaged(True)
+
+    def _isFieldDefined(self, field):
+        """
+        :return: True if field is defined at any node or element of the region. Zinc adds the nodes
+        and elements field is defined at to temporary groups, rather than each being visited here.
+        """
+        fm = self._region.getFieldmodule()
+        isDefined = fm.createFieldIsDefined(field)
+        nodeGroup = fm.createFieldNodeGroup(fm.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES))
+        nodesetGroup = nodeGroup.getNodesetGroup()
+        nodesetGroup.addNodesConditional(isDefined)
+        if nodesetGroup.getSize() > 0:
+            return True
+        for dimension in range(3, 0, -1):
+            elementGroup = fm.createFieldElementGroup(fm.findMeshByDimension(dimension))
+            meshGroup = elementGroup.getMeshGroup()
+            meshGroup.addElementsConditional(isDefined)
+            if meshGroup.getSize() > 0:
+                return True
+        return False
+
+    def _restoreBaseMesh(self):
+        """
+        Replace mesh in region with the cached base mesh.
+        """
+        self._readMesh(lambda region: readRegionFromBuffer(region, self._baseMeshBuffer))
+        self._appliedDeleteElementRanges = []
+        self._appliedScale = [ 1.0, 1.0, 1.0 ]
+
+    def _deleteElements(self):
+        """
+        Delete elements in delete element ranges, plus any nodes orphaned by them.
+        Expects no elements to have been deleted since the base mesh was generated or restored.
+        Call between fieldmodule begin/endChange.
+        """
+        self._deletedNodeCount = 0
         if len(self._deleteElementRanges) > 0:
-            deleteElementIdentifiers = []
+            fm = self._region.getFieldmodule()
+            mesh = self._getMesh()
+            nodes = fm.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+            coordinates = fm.findFieldByName('coordinates').castFiniteElement()
+            deleteRanges = mergeRanges(self._deleteElementRanges)
+            rangeCount = len(deleteRanges)
+            rangeIndex = 0
+            deleteGroup = fm.createFieldElementGroup(mesh)
+            deleteMeshGroup = deleteGroup.getMeshGroup()
+            # candidates for orphaned nodes are only those used by deleted elements
+            orphanGroup = fm.createFieldNodeGroup(nodes)
+            orphanNodesetGroup = orphanGroup.getNodesetGroup()
+            # elements are iterated in increasing identifier order so walk ranges in step with them
             elementIter = mesh.createElementiterator()
             element = elementIter.next()
             while element.isValid():
                 identifier = element.getIdentifier()
-                for deleteElementRange in self._deleteElementRanges:
-                    if (identifier >= deleteElementRange[0]) and (identifier <= deleteElementRange[1]):
-                        deleteElementIdentifiers.append(identifier)
+                while (rangeIndex < rangeCount) and (identifier > deleteRanges[rangeIndex][1]):
+                    rangeIndex += 1
+                if rangeIndex == rangeCount:
+                    break
+                if identifier >= deleteRanges[rangeIndex][0]:
+                    deleteMeshGroup.addElement(element)
+                    eft = element.getElementfieldtemplate(coordinates, -1)
+                    if eft.isValid():
+                        for localNodeIndex in range(1, eft.getNumberOfLocalNodes() + 1):
+                            node = element.getNode(eft, localNodeIndex)
+                            if node.isValid():
+                                orphanNodesetGroup.addNode(node)
                 element = elementIter.next()
-            #print('delete elements ', deleteElementIdentifiers)
-            for identifier in deleteElementIdentifiers:
-                element = mesh.findElementByIdentifier(identifier)
-                mesh.destroyElement(element)
             del element
-            # destroy all orphaned nodes
-            #size1 = nodes.getSize()
-            nodes.destroyAllNodes()
-            #size2 = nodes.getSize()
-            #print('deleted', size1 - size2, 'nodes')
-        fm.defineAllFaces()
-        if self._settings['scale'] != '1*1*1':
-            coordinates = fm.findFieldByName('coordinates').castFiniteElement()
-            scale = fm.createFieldConstant(self._scale)
-            newCoordinates = fm.createFieldMultiply(coordinates, scale)
-            fieldassignment = coordinates.createFieldassignment(newCoordinates)
-            fieldassignment.assign()
-            del newCoordinates
-            del scale
-        fm.endChange()
-        self._createGraphics(self._region)
-        if self._sceneChangeCallback is not None:
-            self._sceneChangeCallback()
+            del elementIter
+            #print('delete', deleteMeshGroup.getSize(), 'elements')
+            mesh.destroyElementsConditional(deleteGroup)
+            # zinc does not destroy candidate nodes still in use by remaining elements
+            oldNodeCount = nodes.getSize()
+            nodes.destroyNodesConditional(orphanGroup)
+            self._deletedNodeCount = oldNodeCount - nodes.getSize()
+            #print('deleted', self._deletedNodeCount, 'nodes')
+            del orphanNodesetGroup
+            del orphanGroup
+            del deleteMeshGroup
+            del deleteGroup
+        self._appliedDeleteElementRanges = [ list(deleteElementRange) for deleteElementRange in self._deleteElementRanges ]
 
-    def _createGraphics(self, region):
-        fm = region.getFieldmodule()
-        meshDimension = self.getMeshDimension()
-        coordinates = fm.findFieldByName('coordinates')
-        nodeDerivativeFields = [
+    def getDeletedNodeCount(self):
+        """
+        :return: Number of orphaned nodes removed when elements were last deleted.
+        """
+        return self._deletedNodeCount
+
+    def _applyScale(self):
+        """
+        Scale coordinates of the base mesh to the current scale. Always scaling the unscaled
+        coordinates of the base mesh means repeated scale changes do not accumulate rounding
+        error, and zero scales can be undone.
+        Expects coordinates not to have been scaled since the base mesh was generated or restored.
+        Call between fieldmodule begin/endChange.
+        """
+        if self._scale == [ 1.0, 1.0, 1.0 ]:
+            self._appliedScale = list(self._scale)
+            return
+        fm = self._region.getFieldmodule()
+        coordinates = fm.findFieldByName('coordinates').castFiniteElement()
+        scale = fm.createFieldConstant(self._scale)
+        newCoordinates = fm.createFieldMultiply(coordinates, scale)
+        fieldassignment = coordinates.createFieldassignment(newCoordinates)
+        fieldassignment.assign()
+        del fieldassignment
+        del newCoordinates
+        del scale
+        self._appliedScale = list(self._scale)
+
+    def _getNodeDerivativeArrowWidth(self):
+        """
+        Derivative arrow width is based on shortest non-zero side.
+        """
+        minScale = 1.0
+        first = True
+        for i in range(3):
+            absScale = abs(self._scale[i])
+            if absScale > 0.0:
+                if first or (absScale < minScale):
+                    minScale = absScale
+                    first = False
+        return 0.01*minScale
+
+    def _setXiAxesGlyphSize(self, pointattr, meshDimension, width):
+        if meshDimension == 1:
+            pointattr.setBaseSize([0.0, 2*width, 2*width])
+            pointattr.setScaleFactors([0.25, 0.0, 0.0])
+        elif meshDimension == 2:
+            pointattr.setBaseSize([0.0, 0.0, 2*width])
+            pointattr.setScaleFactors([0.25, 0.25, 0.0])
+        else:
+            pointattr.setBaseSize([0.0, 0.0, 0.0])
+            pointattr.setScaleFactors([0.25, 0.25, 0.25])
+
+    def _getMaterial(self, name):
+        """
+        :return: Material with name, resolved once and cached.
+        """
+        material = self._materials.get(name)
+        if material is None:
+            material = self._materialmodule.findMaterialByName(name)
+            self._materials[name] = material
+        return material
+
+    def _setTessellation(self, graphics, tessellationName):
+        """
+        Use named tessellation for graphics if defined, otherwise keep the default.
+        """
+        tessellation = graphics.getScene().getTessellationmodule().findTessellationByName(tessellationName)
+        if tessellation.isValid():
+            graphics.setTessellation(tessellation)
+
+    def _createNodeDerivativeFields(self, coordinates):
+        fm = coordinates.getFieldmodule()
+        return [
             fm.createFieldNodeValue(coordinates, Node.VALUE_LABEL_D_DS1, 1),
             fm.createFieldNodeValue(coordinates, Node.VALUE_LABEL_D_DS2, 1),
             fm.createFieldNodeValue(coordinates, Node.VALUE_LABEL_D_DS3, 1)
         ]
+
+    def _createElementDerivativesField(self, coordinates, meshDimension):
+        fm = coordinates.getFieldmodule()
         elementDerivativeFields = []
         for d in range(meshDimension):
             elementDerivativeFields.append(fm.createFieldDerivative(coordinates, d + 1))
-        elementDerivativesField = fm.createFieldConcatenate(elementDerivativeFields)
+        return fm.createFieldConcatenate(elementDerivativeFields)
+
+    def _updateGraphics(self):
+        """
+        Create graphics for a new region or if mesh dimension has changed, otherwise keep
+        existing graphics and only rebind their fields and update scale dependent glyph sizes.
+        """
+        meshDimension = self.getMeshDimension()
+        if meshDimension != self._graphicsMeshDimension:
+            self._removeGraphics()
+            self._createGraphics(self._region)
+            self._graphicsMeshDimension = meshDimension
+        else:
+            self._rebindGraphicsFields()
+
+    def _removeGraphics(self):
+        """
+        Remove all mesh graphics, leaving any others e.g. alignment mode indicator.
+        """
+        scene = self._region.getScene()
+        scene.beginChange()
+        graphics = scene.getFirstGraphics()
+        while graphics.isValid():
+            nextGraphics = scene.getNextGraphics(graphics)
+            if graphics.getName() in GRAPHICS_NAMES:
+                scene.removeGraphics(graphics)
+            graphics = nextGraphics
+        scene.endChange()
+
+    def _rebindGraphicsFields(self):
+        """
+        Rebind coordinate, derivative and label fields of existing graphics to the current
+        fields in the region, and update glyph sizes which depend on scale.
+        """
+        fm = self._region.getFieldmodule()
+        coordinates = fm.findFieldByName('coordinates')
         cmiss_number = fm.findFieldByName('cmiss_number')
-        # make graphics
-        scene = region.getScene()
+        meshDimension = self.getMeshDimension()
+        width = self._getNodeDerivativeArrowWidth()
+        nodeDerivativeFields = None
+        nodeDerivativeIndex = 0
+        scene = self._region.getScene()
+        scene.beginChange()
+        graphics = scene.getFirstGraphics()
+        while graphics.isValid():
+            graphicsName = graphics.getName()
+            if graphicsName in GRAPHICS_NAMES and (graphicsName != 'displayAxes'):
+                graphics.setCoordinateField(coordinates)
+            if graphicsName in ('displayNodeNumbers', 'displayElementNumbers'):
+                graphics.getGraphicspointattributes().setLabelField(cmiss_number)
+                self._setLabelSubgroup(graphics)
+            elif graphicsName == 'displayNodeDerivatives':
+                if nodeDerivativeFields is None:
+                    nodeDerivativeFields = self._createNodeDerivativeFields(coordinates)
+                pointattr = graphics.getGraphicspointattributes()
+                pointattr.setOrientationScaleField(nodeDerivativeFields[nodeDerivativeIndex])
+                pointattr.setBaseSize([0.0, width, width])
+                nodeDerivativeIndex += 1
+            elif graphicsName == 'displayXiAxes':
+                pointattr = graphics.getGraphicspointattributes()
+                pointattr.setOrientationScaleField(self._createElementDerivativesField(coordinates, meshDimension))
+                self._setXiAxesGlyphSize(pointattr, meshDimension, width)
+            graphics = scene.getNextGraphics(graphics)
+        scene.endChange()
+
+    def _createGraphics(self, region):
+        """
+        Create graphics for display settings currently switched on.
+        Other graphics are created on demand when first shown.
+        """
+        with self._profiler.stage('createGraphics', self._getProfileCounts):
+            scene = region.getScene()
+            scene.beginChange()
+            for graphicsName in GRAPHICS_NAMES:
+                if self._settings[graphicsName]:
+                    self._createGraphicsByName(graphicsName)
+            self.applyAlignment()
+            scene.endChange()
+
+    def _getProfileCounts(self):
+        return {'nodeCount': self.getNodeCount(), 'elementCount': self.getElementCount()}
+
+    def _createGraphicsByName(self, graphicsName):
+        """
+        Create graphics with name, placed in the standard drawing order relative to existing graphics.
+        """
+        scene = self._region.getScene()
+        coordinates = self._region.getFieldmodule().findFieldByName('coordinates')
+        creators = {
+            'displayAxes': self._createAxesGraphics,
+            'displayLines': self._createLinesGraphics,
+            'displayNodeNumbers': self._createNodeNumbersGraphics,
+            'displayElementNumbers': self._createElementNumbersGraphics,
+            'displaySurfaces': self._createSurfacesGraphics,
+            'displayNodeDerivatives': self._createNodeDerivativesGraphics,
+            'displayXiAxes': self._createXiAxesGraphics
+        }
         scene.beginChange()
+        createdGraphics = creators[graphicsName](scene, coordinates)
+        for laterGraphicsName in GRAPHICS_NAMES[GRAPHICS_NAMES.index(graphicsName) + 1:]:
+            refGraphics = scene.findGraphicsByName(laterGraphicsName)
+            if refGraphics.isValid():
+                for graphics in createdGraphics:
+                    scene.moveGraphicsBefore(graphics, refGraphics)
+                break
+        scene.endChange()
+
+    def _createAxesGraphics(self, scene, coordinates):
         axes = scene.createGraphicsPoints()
         pointattr = axes.getGraphicspointattributes()
         pointattr.setGlyphShapeType(Glyph.SHAPE_TYPE_AXES_XYZ)
         pointattr.setBaseSize([1.0,1.0,1.0])
-        axes.setMaterial(self._materialmodule.findMaterialByName('grey50'))
+        axes.setMaterial(self._getMaterial('grey50'))
         axes.setName('displayAxes')
         axes.setVisibilityFlag(self.isDisplayAxes())
+        return [ axes ]
+
+    def _createLinesGraphics(self, scene, coordinates):
         lines = scene.createGraphicsLines()
         lines.setCoordinateField(coordinates)
+        self._setTessellation(lines, LINES_TESSELLATION_NAME)
         lines.setName('displayLines')
         lines.setVisibilityFlag(self.isDisplayLines())
+        return [ lines ]
+
+    def _createNodeNumbersGraphics(self, scene, coordinates):
+        cmiss_number = scene.getRegion().getFieldmodule().findFieldByName('cmiss_number')
         nodeNumbers = scene.createGraphicsPoints()
         nodeNumbers.setFieldDomainType(Field.DOMAIN_TYPE_NODES)
         nodeNumbers.setCoordinateField(coordinates)
         pointattr = nodeNumbers.getGraphicspointattributes()
         pointattr.setLabelField(cmiss_number)
         pointattr.setGlyphShapeType(Glyph.SHAPE_TYPE_NONE)
-        nodeNumbers.setMaterial(self._materialmodule.findMaterialByName('green'))
+        nodeNumbers.setMaterial(self._getMaterial('green'))
         nodeNumbers.setName('displayNodeNumbers')
         nodeNumbers.setVisibilityFlag(self.isDisplayNodeNumbers())
+        self._setLabelSubgroup(nodeNumbers)
+        return [ nodeNumbers ]
+
+    def _createElementNumbersGraphics(self, scene, coordinates):
+        cmiss_number = scene.getRegion().getFieldmodule().findFieldByName('cmiss_number')
         elementNumbers = scene.createGraphicsPoints()
         elementNumbers.setFieldDomainType(Field.DOMAIN_TYPE_MESH_HIGHEST_DIMENSION)
         elementNumbers.setCoordinateField(coordinates)
         pointattr = elementNumbers.getGraphicspointattributes()
         pointattr.setLabelField(cmiss_number)
         pointattr.setGlyphShapeType(Glyph.SHAPE_TYPE_NONE)
-        elementNumbers.setMaterial(self._materialmodule.findMaterialByName('cyan'))
+        elementNumbers.setMaterial(self._getMaterial('cyan'))
         elementNumbers.setName('displayElementNumbers')
         elementNumbers.setVisibilityFlag(self.isDisplayElementNumbers())
+        self._setLabelSubgroup(elementNumbers)
+        return [ elementNumbers ]
+
+    def _updateLabelSubgroups(self):
+        """
+        Apply label settings to existing node and element number graphics.
+        """
+        if self._region is None:
+            return
+        scene = self._region.getScene()
+        scene.beginChange()
+        for graphicsName in ('displayNodeNumbers', 'displayElementNumbers'):
+            graphics = scene.findGraphicsByName(graphicsName)
+            if graphics.isValid():
+                self._setLabelSubgroup(graphics)
+        scene.endChange()
+
+    def _setLabelSubgroup(self, graphics):
+        """
+        Limit labels drawn by node or element number graphics according to label mode and stride.
+        View conditions are evaluated from the sceneviewer projection, so the labels drawn
+        follow the camera and their number scales with what is visible rather than mesh size.
+        """
+        fm = self._region.getFieldmodule()
+        conditions = []
+        if self._settings['labelStride'] > 1:
+            if graphics.getFieldDomainType() == Field.DOMAIN_TYPE_NODES:
+                conditions.append(self._createNodeStrideGroup(self._settings['labelStride']))
+            else:
+                conditions.append(self._createElementStrideGroup(self._settings['labelStride']))
+        if (self._settings['labelMode'] != LABEL_MODE_ALL) and (self._labelSceneviewer is not None):
+            conditions.append(self._createLabelViewCondition())
+        if len(conditions) == 0:
+            graphics.setSubgroupField(Field())
+        elif len(conditions) == 1:
+            graphics.setSubgroupField(conditions[0])
+        else:
+            graphics.setSubgroupField(fm.createFieldAnd(conditions[0], conditions[1]))
+
+    def _createNodeStrideGroup(self, stride):
+        fm = self._region.getFieldmodule()
+        nodes = fm.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        strideGroup = fm.createFieldNodeGroup(nodes)
+        nodesetGroup = strideGroup.getNodesetGroup()
+        nodeIter = nodes.createNodeiterator()
+        node = nodeIter.next()
+        index = 0
+        while node.isValid():
+            if (index % stride) == 0:
+                nodesetGroup.addNode(node)
+            index += 1
+            node = nodeIter.next()
+        return strideGroup
+
+    def _createElementStrideGroup(self, stride):
+        fm = self._region.getFieldmodule()
+        mesh = self._getMesh()
+        strideGroup = fm.createFieldElementGroup(mesh)
+        meshGroup = strideGroup.getMeshGroup()
+        elementIter = mesh.createElementiterator()
+        element = elementIter.next()
+        index = 0
+        while element.isValid():
+            if (index % stride) == 0:
+                meshGroup.addElement(element)
+            index += 1
+            element = elementIter.next()
+        return strideGroup
+
+    def _createLabelViewCondition(self):
+        """
+        :return: Field which is true where coordinates are between the near and far clipping
+        planes, and in view or near the centre of view depending on label mode.
+        """
+        fm = self._region.getFieldmodule()
+        coordinates = fm.findFieldByName('coordinates')
+        projection = fm.createFieldSceneviewerProjection(self._labelSceneviewer, SCENECOORDINATESYSTEM_LOCAL,
+                                                         SCENECOORDINATESYSTEM_NORMALISED_WINDOW_FILL)
+        windowCoordinates = fm.createFieldProjection(coordinates, projection)
+        one = fm.createFieldConstant([1.0])
+        depth = fm.createFieldComponent(windowCoordinates, 3)
+        condition = fm.createFieldLessThan(fm.createFieldAbs(depth), one)
+        if self._settings['labelMode'] == LABEL_MODE_CENTRE:
+            radius = fm.createFieldConstant([LABEL_CENTRE_RADIUS])
+            distance = fm.createFieldMagnitude(fm.createFieldComponent(windowCoordinates, [1, 2]))
+            condition = fm.createFieldAnd(condition, fm.createFieldLessThan(distance, radius))
+        else:
+            for c in (1, 2):
+                inWindow = fm.createFieldLessThan(fm.createFieldAbs(fm.createFieldComponent(windowCoordinates, c)), one)
+                condition = fm.createFieldAnd(condition, inWindow)
+        return condition
+
+    def _createSurfacesGraphics(self, scene, coordinates):
         surfaces = scene.createGraphicsSurfaces()
         surfaces.setCoordinateField(coordinates)
+        self._setTessellation(surfaces, SURFACES_TESSELLATION_NAME)
         surfaces.setRenderPolygonMode(Graphics.RENDER_POLYGON_MODE_WIREFRAME if self.isDisplaySurfacesWireframe() else Graphics.RENDER_POLYGON_MODE_SHADED)
-        surfaces.setExterior(self.isDisplaySurfacesExterior() if (meshDimension == 3) else False)
-        surfacesMaterial = self._materialmodule.findMaterialByName('trans_blue' if self.isDisplaySurfacesTranslucent() else 'solid_blue')
+        surfaces.setExterior(self.isDisplaySurfacesExterior() if (self.getMeshDimension() == 3) else False)
+        surfacesMaterial = self._getMaterial('trans_blue' if self.isDisplaySurfacesTranslucent() else 'solid_blue')
         surfaces.setMaterial(surfacesMaterial)
         surfaces.setName('displaySurfaces')
         surfaces.setVisibilityFlag(self.isDisplaySurfaces())
+        return [ surfaces ]
 
-        # derivative arrow width is based on shortest non-zero side
-        minScale = 1.0
-        first = True
-        for i in range(coordinates.getNumberOfComponents()):
-            absScale = abs(self._scale[i])
-            if absScale > 0.0:
-                if first or (absScale < minScale):
-                    minScale = absScale
-                    first = False
-        width = 0.01*minScale
-
+    def _createNodeDerivativesGraphics(self, scene, coordinates):
+        nodeDerivativeFields = self._createNodeDerivativeFields(coordinates)
+        width = self._getNodeDerivativeArrowWidth()
         nodeDerivativeMaterialNames = [ 'gold', 'silver', 'green' ]
-        for i in range(meshDimension):
+        graphicsList = []
+        for i in range(self.getMeshDimension()):
             nodeDerivatives = scene.createGraphicsPoints()
             nodeDerivatives.setFieldDomainType(Field.DOMAIN_TYPE_NODES)
             nodeDerivatives.setCoordinateField(coordinates)
@@ -437,31 +1052,55 @@ class MeshGeneratorModel(MeshAlignmentModel):
             pointattr.setOrientationScaleField(nodeDerivativeFields[i])
             pointattr.setBaseSize([0.0, width, width])
             pointattr.setScaleFactors([1.0, 0.0, 0.0])
-            nodeDerivatives.setMaterial(self._materialmodule.findMaterialByName(nodeDerivativeMaterialNames[i]))
+            nodeDerivatives.setMaterial(self._getMaterial(nodeDerivativeMaterialNames[i]))
             nodeDerivatives.setName('displayNodeDerivatives')
             nodeDerivatives.setVisibilityFlag(self.isDisplayNodeDerivatives())
+            graphicsList.append(nodeDerivatives)
+        return graphicsList
 
+    def _createXiAxesGraphics(self, scene, coordinates):
+        meshDimension = self.getMeshDimension()
+        elementDerivativesField = self._createElementDerivativesField(coordinates, meshDimension)
         xiAxes = scene.createGraphicsPoints()
         xiAxes.setFieldDomainType(Field.DOMAIN_TYPE_MESH_HIGHEST_DIMENSION)
         xiAxes.setCoordinateField(coordinates)
         pointattr = xiAxes.getGraphicspointattributes()
         pointattr.setGlyphShapeType(Glyph.SHAPE_TYPE_AXES_123)
         pointattr.setOrientationScaleField(elementDerivativesField)
-        if meshDimension == 1:
-            pointattr.setBaseSize([0.0, 2*width, 2*width])
-            pointattr.setScaleFactors([0.25, 0.0, 0.0])
-        elif meshDimension == 2:
-            pointattr.setBaseSize([0.0, 0.0, 2*width])
-            pointattr.setScaleFactors([0.25, 0.25, 0.0])
-        else:
-            pointattr.setBaseSize([0.0, 0.0, 0.0])
-            pointattr.setScaleFactors([0.25, 0.25, 0.25])
-        xiAxes.setMaterial(self._materialmodule.findMaterialByName('yellow'))
+        self._setXiAxesGlyphSize(pointattr, meshDimension, self._getNodeDerivativeArrowWidth())
+        xiAxes.setMaterial(self._getMaterial('yellow'))
         xiAxes.setName('displayXiAxes')
         xiAxes.setVisibilityFlag(self.isDisplayXiAxes())
+        return [ xiAxes ]
 
-        self.applyAlignment()
-        scene.endChange()
+    def getModelWriter(self, outputFormat=OUTPUT_FORMAT_EX2, highestDimensionOnly=False):
+        """
+        Serialise generated mesh on this thread, for writing to file on any thread.
+        :param outputFormat: One of the formats in outputformat.OUTPUT_FORMATS.
+        :param highestDimensionOnly: If True omit faces and lines, writing only elements of the
+        highest dimension mesh and nodes.
+        :return: Function taking file name, which it replaces atomically with the model.
+        """
+        scaffoldFileCache = None
+        if (outputFormat == OUTPUT_FORMAT_EX2) and not highestDimensionOnly:
+            # scaffold file cache only holds complete uncompressed models
+            scaffoldFileCache = self._scaffoldFileCache
+        if scaffoldFileCache is not None:
+            key = self._getGeneratedMeshKey()
+            cachedFileName = scaffoldFileCache.getFileName(key)
+            if cachedFileName is not None:
+                return lambda file_name: copyFile(cachedFileName, file_name)
+        buffer = serialiseRegion(self._region, highestDimensionOnly)
+
+        def writeModelFile(file_name):
+            writeBufferToFile(buffer, file_name, outputFormat)
+            if scaffoldFileCache is not None:
+                scaffoldFileCache.put(key, file_name)
 
-    def writeModel(self, file_name):
-        self._region.writeFile(file_name)
+        return writeModelFile
+
+    def writeModel(self, file_name, outputFormat=OUTPUT_FORMAT_EX2, highestDimensionOnly=False):
+        """
+        Write generated mesh to file. See getModelWriter.
+        """
+        self.getModelWriter(outputFormat, highestDimensionOnly)(file_name)
@@ -1,14 +1,26 @@
-import imghdr
-import os
 import re
-import get_image_size
 
 from opencmiss.utils.maths import vectorops
 from opencmiss.utils.zinc import createFiniteElementField, createSquare2DFiniteElement, \
-    createMaterialUsingImageField, createVolumeImageField
+    createMaterialUsingImageField
 
 from mapclientplugins.meshgeneratorstep.model.meshalignmentmodel import MeshAlignmentModel
 from mapclientplugins.meshgeneratorstep.model.fixcoordinatesmixin import FixCoordinatesMixin
+from mapclientplugins.meshgeneratorstep.model.framecache import FrameCache, getFrameStackKey
+from mapclientplugins.meshgeneratorstep.model.framedecoder import FrameDecoder, isFrameDecodingAvailable
+from mapclientplugins.meshgeneratorstep.model.frametimeline import FrameTimeline
+from mapclientplugins.meshgeneratorstep.model.imagemanifest import ImageManifest
+from mapclientplugins.meshgeneratorstep.model.profiler import Profiler
+from mapclientplugins.meshgeneratorstep.model.imageframestream import ImageFrameStream, DEFAULT_WINDOW_SIZE, \
+    createImageFieldAtLevel, createImageFieldFromBuffer, createImageFieldFromFrames, readFramesParallel
+from mapclientplugins.meshgeneratorstep.model.imagestackloader import ImageStackLoader
+
+# resolution level chosen to fit image texture in IMAGE_TEXTURE_MEMORY_BUDGET
+RESOLUTION_LEVEL_AUTO = -1
+MAX_RESOLUTION_LEVEL = 4
+# levels below the chosen resolution level the image stack is previewed at while it loads
+PREVIEW_LEVEL_OFFSET = 2
+IMAGE_TEXTURE_MEMORY_BUDGET = 512*1024*1024
 
 
 class MeshPlaneModel(MeshAlignmentModel, FixCoordinatesMixin):
@@ -18,11 +30,24 @@ class MeshPlaneModel(MeshAlignmentModel, FixCoordinatesMixin):
         self._region_name = "plane_mesh"
         self._timekeeper = None
         self._frame_count = 0
+        self._frame_timeline = None
         self._parent_region = region
         self._region = None
+        self._images = []
+        self._image_stream = None
+        self._image_manifest = ImageManifest()
+        self._frame_cache = None
+        self._profiler = Profiler(False)
+        self._image_size = None
+        self._frame_decoder = FrameDecoder()
+        self._image_loader = ImageStackLoader(self._frame_decoder)
         self._settings = {
             'display-image-plane': True,
             'image-plane-fixed': False,
+            'stream-images': False,
+            'stream-window-size': DEFAULT_WINDOW_SIZE,
+            'image-resolution-level': 0,
+            'cache-decoded-frames': False,
             'alignment': {},
         }
 
@@ -36,19 +61,32 @@ class MeshPlaneModel(MeshAlignmentModel, FixCoordinatesMixin):
         up = vectorops.mxvectormult(rot, original_up)
         return normal, up, offset
 
+    def setProfiler(self, profiler):
+        self._profiler = profiler
+
+    def setImageManifestFileName(self, file_name):
+        """
+        Set file to cache image file types and sizes in, so unchanged images are not opened
+        again when setting image info.
+        """
+        self._image_manifest = ImageManifest(file_name)
+
+    def setFrameCacheDirectory(self, directory):
+        """
+        Set directory to cache decoded image stacks in, used if the cache-decoded-frames setting is on.
+        """
+        self._frame_cache = FrameCache(directory)
+
+    def isCacheDecodedFrames(self):
+        return self._settings['cache-decoded-frames']
+
+    def setCacheDecodedFrames(self, state):
+        self._settings['cache-decoded-frames'] = state
+
     def setImageInfo(self, image_info):
         images = []
         if image_info is not None:
-            location = image_info.location()
-            if os.path.isdir(location):
-                for item in sorted(os.listdir(location), key=alphanum_key):
-                    image_candidate = os.path.join(location, item)
-                    if imghdr.what(image_candidate):
-                        images.append(image_candidate)
-            elif os.path.exists(location):
-                if imghdr.what(location):
-                    images.append(location)
-
+            images = sorted(self._image_manifest.scan(image_info.location()), key=alphanum_key)
             self._reset()
             self._load_images(images)
 
@@ -78,47 +116,219 @@ class MeshPlaneModel(MeshAlignmentModel, FixCoordinatesMixin):
         if self._scene is not None:
             self._scene.setVisibilityFlag(state)
 
+    def isStreamImages(self):
+        return self._settings['stream-images']
+
+    def setStreamImages(self, state):
+        """
+        Set whether only a sliding window of frames around the current time is held in the image
+        texture, so memory is bounded for long image stacks.
+        """
+        if state != self._settings['stream-images']:
+            self._settings['stream-images'] = state
+            self._load_images(self._images)
+
+    def getStreamWindowSize(self):
+        return self._settings['stream-window-size']
+
+    def setStreamWindowSize(self, window_size):
+        window_size = max(1, int(window_size))
+        if window_size != self._settings['stream-window-size']:
+            self._settings['stream-window-size'] = window_size
+            if self._image_stream is not None:
+                self._load_images(self._images)
+
+    def getImageResolutionLevel(self):
+        return self._settings['image-resolution-level']
+
+    def setImageResolutionLevel(self, level):
+        """
+        Set resolution of image texture, trading image quality for memory.
+        :param level: RESOLUTION_LEVEL_AUTO, or 0 for full resolution, 1 for half width and height etc.
+        """
+        level = max(RESOLUTION_LEVEL_AUTO, min(int(level), MAX_RESOLUTION_LEVEL))
+        if level == self._settings['image-resolution-level']:
+            return
+        self._settings['image-resolution-level'] = level
+        self._load_images(self._images)
+
+    def isLoadingImages(self):
+        """
+        :return: True if images are being decoded in the background.
+        """
+        return self._image_loader.isLoading()
+
+    def _getResolutionLevel(self, frames):
+        """
+        :param frames: Number of frames held in the image texture.
+        """
+        level = self._settings['image-resolution-level']
+        if level != RESOLUTION_LEVEL_AUTO:
+            return level
+        if self._image_size is None:
+            return 0
+        # RGBA bytes
+        texture_size = self._image_size[0]*self._image_size[1]*frames*4
+        level = 0
+        while (level < MAX_RESOLUTION_LEVEL) and ((texture_size >> (2*level)) > IMAGE_TEXTURE_MEMORY_BUDGET):
+            level += 1
+        return level
+
+    def updateImageWindow(self, time):
+        """
+        Move the streamed window of frames to contain time, if streaming.
+        :param time: Timekeeper time, from 0.0 at start to 1.0 at end of image stack.
+        """
+        if self._image_stream is None:
+            return
+        frame_index = int(time*self._frame_count)
+        image_field = self._image_stream.update(self._region.getFieldmodule(), frame_index)
+        if image_field is not None:
+            self._setImageField(image_field)
+            self._setTextureTimeWindow(self._image_stream.getWindowStart(), self._image_stream.getWindowSize())
+
     def getFrameCount(self):
         return self._frame_count
 
-    def getTimeForFrameIndex(self, index, frames_per_second):
-        duration = self._frame_count / frames_per_second
-        frame_separation = 1 / self._frame_count
-        initial_offset = frame_separation / 2
+    def getFrameTimeline(self, frames_per_second):
+        """
+        :return: FrameTimeline for the current image stack at frames_per_second, rebuilt only
+        when the frame count or frames per second changes.
+        """
+        timeline = self._frame_timeline
+        if (timeline is None) or (timeline.getFrameCount() != self._frame_count) or \
+                (timeline.getFramesPerSecond() != frames_per_second):
+            timeline = self._frame_timeline = FrameTimeline(self._frame_count, frames_per_second)
+        return timeline
 
-        return (index * frame_separation + initial_offset) * duration
+    def getTimeForFrameIndex(self, index, frames_per_second):
+        return self.getFrameTimeline(frames_per_second).getTimeForFrameIndex(index)
 
     def getFrameIndexForTime(self, time, frames_per_second):
-        duration = self._frame_count / frames_per_second
-        frame_separation = 1 / self._frame_count
-        initial_offset = frame_separation / 2
-        return int((time / duration - initial_offset) / frame_separation + 0.5)
+        return self.getFrameTimeline(frames_per_second).getFrameIndexForTime(time)
 
     def getSettings(self):
         self._settings['alignment'].update(self.getAlignSettings())
         return self._settings
 
     def setSettings(self, settings):
+        stream_settings = self._getStreamSettings()
         self._settings.update(settings)
         self.setImagePlaneVisible(settings['display-image-plane'])
         self.setImagePlaneFixed(settings['image-plane-fixed'])
+        if self._getStreamSettings() != stream_settings:
+            self._load_images(self._images)
         if 'alignment' in settings:
             self.setAlignSettings(settings['alignment'])
 
+    def _getStreamSettings(self):
+        """
+        :return: Settings which require images to be reloaded when changed.
+        """
+        return (self._settings['stream-images'], self._settings['stream-window-size'],
+                self._settings['image-resolution-level'])
+
+    def close(self):
+        """
+        Stop prefetching, loading and decoding images. Call when the step is finished with the model.
+        """
+        self._stopLoadingImages()
+        self._frame_decoder.close()
+
+    def _stopLoadingImages(self):
+        if self._image_stream is not None:
+            self._image_stream.close()
+            self._image_stream = None
+        self._image_loader.cancel()
+
     def _load_images(self, images):
-        fieldmodule = self._region.getFieldmodule()
-        self._frame_count = len(images)
-        if self._frame_count > 0:
-            # Assume all images have the same dimensions.
-            width, height = get_image_size.get_image_size(images[0])
-            if width != -1 or height != -1:
-                cache = fieldmodule.createFieldcache()
-                self._modelScaleField.assignReal(cache, [width/1000.0, height/1000.0, 1.0])
-            image_field = createVolumeImageField(fieldmodule, images)
+        self._stopLoadingImages()
+        self._images = images
+        self._image_size = None
+        if self._region is None:
+            return
+        with self._profiler.stage('loadImages', self._getProfileCounts):
+            fieldmodule = self._region.getFieldmodule()
+            self._frame_count = len(images)
+            if self._frame_count > 0:
+                # Assume all images have the same dimensions.
+                width, height = self._image_manifest.getImageSize(images[0])
+                if width != -1 or height != -1:
+                    self._image_size = (width, height)
+                    cache = fieldmodule.createFieldcache()
+                    self._modelScaleField.assignReal(cache, [width/1000.0, height/1000.0, 1.0])
+                image_type = self._image_manifest.getImageType(images[0])
+                window_size = self._settings['stream-window-size']
+                if self._settings['stream-images'] and (self._frame_count > window_size):
+                    frame_decoder = self._frame_decoder if isFrameDecodingAvailable() else None
+                    self._image_stream = ImageFrameStream(images, image_type, window_size,
+                                                          self._getResolutionLevel(window_size), frame_decoder)
+                    self.updateImageWindow(self._timekeeper.getTime())
+                else:
+                    self._loadImageStack(images, image_type, self._getResolutionLevel(self._frame_count))
+
+    def _getProfileCounts(self):
+        return {'frameCount': self._frame_count}
+
+    def _loadImageStack(self, images, image_type, level):
+        """
+        Show image stack at resolution level, from decoded frame cache if enabled, otherwise
+        decoded in the background after showing a preview at a lower level. The full resolution
+        stack is not held for reduced levels. The cache is read and written on the loader's worker
+        thread. Without Pillow, zinc decodes the stack on this thread and it is not cached.
+        """
+        if not isFrameDecodingAvailable():
+            self._decodeImageStack(images, image_type, level)
+            return
+        decoded_callback = read_cached_buffer = None
+        if self._settings['cache-decoded-frames'] and (self._frame_cache is not None):
+            key = getFrameStackKey([[image] + list(self._image_manifest.getFileStat(image)) for image in images], level)
+            frame_cache = self._frame_cache
+            decoded_callback = lambda layout, buffer: frame_cache.writeBuffer(key, layout, buffer)
+            read_cached_buffer = lambda: frame_cache.readBuffer(key)
+        preview_level = min(level + PREVIEW_LEVEL_OFFSET, MAX_RESOLUTION_LEVEL)
+        self._image_loader.load(images, level, self._imageStackLoaded, preview_level, decoded_callback,
+                                read_cached_buffer)
+
+    def _decodeImageStack(self, images, image_type, level):
+        with self._profiler.stage('showImages', self._getProfileCounts):
+            image_field = createImageFieldFromFrames(self._region.getFieldmodule(), readFramesParallel(images),
+                                                     image_type)
+            if image_field is not None:
+                self._showImageStack(createImageFieldAtLevel(image_field, level))
+
+    def _imageStackLoaded(self, layout, buffer, preview):
+        if buffer is None:
+            return
+        with self._profiler.stage('showImagePreview' if preview else 'showImages', self._getProfileCounts):
+            image_field = createImageFieldFromBuffer(self._region.getFieldmodule(), layout, buffer)
+            if image_field is not None:
+                self._showImageStack(image_field)
+
+    def _showImageStack(self, image_field):
+        self._setImageField(image_field)
+        self._setTextureTimeWindow(0, self._frame_count)
+
+    def _setImageField(self, image_field):
+        material = self._scene.findGraphicsByName('plane-surfaces').getMaterial()
+        if material.getTextureField(1).isValid():
+            # reuse texture material so streamed windows do not accumulate materials
+            material.setTextureField(1, image_field)
+        else:
             material = createMaterialUsingImageField(self._region, image_field)
             surface = self._scene.findGraphicsByName('plane-surfaces')
             surface.setMaterial(material)
 
+    def _setTextureTimeWindow(self, window_start, window_size):
+        """
+        Map timekeeper time over the whole image stack to texture coordinate over the window of frames
+        starting at window_start held in the image field.
+        """
+        fieldmodule = self._region.getFieldmodule()
+        cache = fieldmodule.createFieldcache()
+        self._textureTimeScaleField.assignReal(cache, self._frame_count/float(window_size))
+        self._textureTimeOffsetField.assignReal(cache, window_start/float(window_size))
+
     def _reset(self):
         if self._region:
             self._parent_region.removeChild(self._region)
@@ -134,6 +344,8 @@ class MeshPlaneModel(MeshAlignmentModel, FixCoordinatesMixin):
         self._modelScaleField = fieldmodule.createFieldConstant([2, 3, 1])
         self._scaledCoordinateField = fieldmodule.createFieldMultiply(self._modelScaleField, self._modelCoordinateField)
         self._fixed_projection_field = fieldmodule.createFieldConstant([1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1])
+        self._textureTimeScaleField = fieldmodule.createFieldConstant([1.0])
+        self._textureTimeOffsetField = fieldmodule.createFieldConstant([0.0])
         createSquare2DFiniteElement(fieldmodule, self._modelCoordinateField,
                                     [[-0.5, -0.5, 0.0], [0.5, -0.5, 0.0], [-0.5, 0.5, 0.0], [0.5, 0.5, 0.0]])
 
@@ -154,7 +366,9 @@ class MeshPlaneModel(MeshAlignmentModel, FixCoordinatesMixin):
         surfaces.setName('plane-surfaces')
         surfaces.setCoordinateField(self._scaledCoordinateField)
         temp1 = fieldmodule.createFieldComponent(xi, [1, 2])
-        temp2 = fieldmodule.createFieldTimeValue(self._timekeeper)
+        time_value = fieldmodule.createFieldTimeValue(self._timekeeper)
+        temp2 = fieldmodule.createFieldSubtract(fieldmodule.createFieldMultiply(time_value, self._textureTimeScaleField),
+                                                self._textureTimeOffsetField)
         texture_field = fieldmodule.createFieldConcatenate([temp1, temp2])
         surfaces.setTextureCoordinateField(texture_field)
         surfaces.setMaterial(materialmodule.findMaterialByName('silver'))
@@ -0,0 +1,85 @@
+"""
+Registry of scaffold mesh types indexed by name.
+"""
+import copy
+
+_meshTypeRegistry = None
+
+
+def getMeshTypeRegistry():
+    """
+    :return: Registry shared by all models, populated with scaffoldmaker mesh types on first call.
+    """
+    global _meshTypeRegistry
+    if _meshTypeRegistry is None:
+        from scaffoldmaker.scaffoldmaker import Scaffoldmaker
+        scaffoldmaker = Scaffoldmaker()
+        _meshTypeRegistry = MeshTypeRegistry(scaffoldmaker.getMeshTypes(), scaffoldmaker.getDefaultMeshType())
+    return _meshTypeRegistry
+
+
+class MeshTypeRegistry(object):
+    """
+    Mesh types indexed by name in registration order, with their default options and ordered
+    option names memoized. Options and names are returned as copies so callers may modify them.
+    """
+
+    def __init__(self, meshTypes=None, defaultMeshType=None):
+        """
+        :param defaultMeshType: Mesh type used by default, or None for the first registered.
+        """
+        self._meshTypes = {}
+        self._names = []
+        self._defaultOptions = {}
+        self._orderedOptionNames = {}
+        self._defaultMeshType = defaultMeshType
+        for meshType in (meshTypes or []):
+            self.register(meshType)
+
+    def register(self, meshType):
+        """
+        Add mesh type, e.g. from another plugin, replacing any registered with the same name.
+        """
+        name = meshType.getName()
+        if name not in self._meshTypes:
+            self._names.append(name)
+        self._meshTypes[name] = meshType
+        self._defaultOptions.pop(name, None)
+        self._orderedOptionNames.pop(name, None)
+        if self._defaultMeshType is None:
+            self._defaultMeshType = meshType
+
+    def getNames(self):
+        """
+        :return: List of mesh type names in registration order.
+        """
+        return list(self._names)
+
+    def getDefaultMeshType(self):
+        return self._defaultMeshType
+
+    def getMeshTypeByName(self, name):
+        """
+        :return: Mesh type with name, or None if not registered.
+        """
+        return self._meshTypes.get(name)
+
+    def getDefaultOptions(self, meshType):
+        """
+        :return: Copy of default options dict for mesh type.
+        """
+        name = meshType.getName()
+        defaultOptions = self._defaultOptions.get(name)
+        if defaultOptions is None:
+            defaultOptions = self._defaultOptions[name] = meshType.getDefaultOptions()
+        return copy.deepcopy(defaultOptions)
+
+    def getOrderedOptionNames(self, meshType):
+        """
+        :return: Copy of list of option names for mesh type in display order.
+        """
+        name = meshType.getName()
+        orderedOptionNames = self._orderedOptionNames.get(name)
+        if orderedOptionNames is None:
+            orderedOptionNames = self._orderedOptionNames[name] = meshType.getOrderedOptionNames()
+        return list(orderedOptionNames)
@@ -0,0 +1,145 @@
+"""
+Formats for writing generated models: EX2 text, optionally compressed, and optionally limited
+to the highest dimension mesh and nodes.
+"""
+import gzip
+import os
+import shutil
+import stat
+import tempfile
+
+OUTPUT_FORMAT_EX2 = 'ex2'
+OUTPUT_FORMAT_EX2_GZIP = 'ex2.gz'
+OUTPUT_FORMAT_EX2_ZSTD = 'ex2.zst'
+# formats with descriptions, in order offered to the user
+OUTPUT_FORMATS = (
+    (OUTPUT_FORMAT_EX2, 'EX2 text'),
+    (OUTPUT_FORMAT_EX2_GZIP, 'EX2 gzip compressed'),
+    (OUTPUT_FORMAT_EX2_ZSTD, 'EX2 zstd compressed (requires zstandard)'),
+)
+COMPRESS_CHUNK_SIZE = 1024*1024
+
+
+def isOutputFormatAvailable(outputFormat):
+    """
+    :return: True if the libraries needed to write outputFormat are installed.
+    """
+    if outputFormat == OUTPUT_FORMAT_EX2_ZSTD:
+        try:
+            import zstandard
+        except ImportError:
+            return False
+        return True
+    return outputFormat in (OUTPUT_FORMAT_EX2, OUTPUT_FORMAT_EX2_GZIP)
+
+
+def getOutputFileExtension(outputFormat):
+    """
+    :return: File name extension for outputFormat, without leading dot.
+    """
+    return outputFormat
+
+
+def _createCompressedWriter(f, outputFormat):
+    """
+    :param f: Binary file opened for writing, which the caller must close after the writer.
+    :return: Writer compressing to f in outputFormat, to be used as a context manager.
+    """
+    if outputFormat == OUTPUT_FORMAT_EX2_GZIP:
+        # empty name so the temporary file name is not stored in the header
+        return gzip.GzipFile(filename='', mode='wb', fileobj=f)
+    import zstandard
+    return zstandard.ZstdCompressor().stream_writer(f)
+
+
+def serialiseRegion(region, highestDimensionOnly=False):
+    """
+    Serialise region's fields, nodes and elements to EX2 text in a zinc memory buffer.
+    Must be called on the thread using the region; the result can be written on any thread.
+    :param highestDimensionOnly: If True serialise only nodes and elements of the highest
+    dimension mesh, omitting faces and lines which downstream steps can redefine.
+    :return: EX2 bytes.
+    """
+    # zinc imported here so the configure dialog can list formats without loading it
+    from opencmiss.zinc.field import Field
+    from opencmiss.zinc.status import OK as RESULT_OK
+    sir = region.createStreaminformationRegion()
+    srm = sir.createStreamresourceMemory()
+    if highestDimensionOnly:
+        sir.setResourceDomainTypes(srm, Field.DOMAIN_TYPE_NODES | Field.DOMAIN_TYPE_MESH_HIGHEST_DIMENSION)
+    result = region.write(sir)
+    if result != RESULT_OK:
+        raise IOError('Failed to serialise region')
+    result, buffer = srm.getBuffer()
+    if not isinstance(buffer, bytes):
+        buffer = buffer.encode('utf-8')
+    return buffer
+
+
+def _getUmask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# read once as setting the umask to read it races with files created on other threads
+_UMASK = _getUmask()
+
+
+def _replaceFile(sourceFileName, fileName):
+    replace = getattr(os, 'replace', None)
+    if replace is not None:
+        replace(sourceFileName, fileName)
+        return
+    # Python 2: rename only fails to replace an existing file on Windows
+    if (os.name == 'nt') and os.path.exists(fileName):
+        os.remove(fileName)
+    os.rename(sourceFileName, fileName)
+
+
+def _writeFileAtomically(fileName, writeFunction):
+    """
+    Call writeFunction with the name of a temporary file in the same directory as fileName,
+    then rename it to fileName so partial files are never visible, even if writing fails.
+    The file keeps the permissions of the file it replaces, otherwise gets the permissions of a
+    newly created file rather than the owner only permissions of temporary files.
+    """
+    directory, baseName = os.path.split(os.path.abspath(fileName))
+    handle, tempFileName = tempfile.mkstemp(prefix='.' + baseName, suffix='.tmp', dir=directory)
+    os.close(handle)
+    try:
+        writeFunction(tempFileName)
+        try:
+            mode = stat.S_IMODE(os.stat(fileName).st_mode)
+        except OSError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tempFileName, mode)
+        _replaceFile(tempFileName, fileName)
+    except:
+        if os.path.exists(tempFileName):
+            os.remove(tempFileName)
+        raise
+
+
+def writeBufferToFile(buffer, fileName, outputFormat=OUTPUT_FORMAT_EX2):
+    """
+    Write EX2 bytes to file in outputFormat, compressing in chunks. Safe to call on any thread.
+    The file is replaced atomically.
+    """
+    def write(tempFileName):
+        with open(tempFileName, 'wb') as f:
+            if outputFormat == OUTPUT_FORMAT_EX2:
+                f.write(buffer)
+                return
+            with _createCompressedWriter(f, outputFormat) as writer:
+                for start in range(0, len(buffer), COMPRESS_CHUNK_SIZE):
+                    writer.write(buffer[start:start + COMPRESS_CHUNK_SIZE])
+
+    _writeFileAtomically(fileName, write)
+
+
+def copyFile(sourceFileName, fileName):
+    """
+    Copy source file to fileName, which is replaced atomically. Safe to call on any thread.
+    """
+    _writeFileAtomically(fileName, lambda tempFileName: shutil.copyfile(sourceFileName, tempFileName))
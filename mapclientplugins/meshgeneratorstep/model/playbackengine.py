@@ -0,0 +1,152 @@
+"""
+Real time playback driven by a monotonic clock rather than by counting timer ticks.
+"""
+import time
+from collections import deque
+
+try:
+    monotonicTime = time.monotonic
+except AttributeError:
+    # Python 2: not guaranteed monotonic, but playback copes with the rare backwards step
+    monotonicTime = time.time
+
+# seconds over which achieved frames per second is measured
+RATE_WINDOW = 1.0
+# weight of latest tick in smoothed tick cost
+TICK_COST_SMOOTHING = 0.2
+
+
+class PlaybackEngine(object):
+    """
+    Computes playback time from elapsed real time on each timer tick, so playback stays in
+    real time when ticks are late: frames which could not be shown in time are skipped.
+    Records the rate frames are actually shown at and the number skipped, and with adaptive
+    frame dropping suggests a timer interval matching the measured cost of showing a frame so
+    ticks do not back up in the event queue.
+    """
+
+    def __init__(self, clock=monotonicTime):
+        """
+        :param clock: Function returning current time in seconds.
+        """
+        self._clock = clock
+        self._framesPerSecond = 25.0
+        self._adaptive = True
+        self._playing = False
+        self._startClockTime = 0.0
+        self._startTime = 0.0
+        self._lastFrameIndex = None
+        self._tickStartClockTime = None
+        self._tickCost = 0.0
+        self._tickTimes = deque()
+        self._droppedFrameCount = 0
+
+    def isPlaying(self):
+        return self._playing
+
+    def isAdaptive(self):
+        return self._adaptive
+
+    def setAdaptive(self, adaptive):
+        self._adaptive = adaptive
+
+    def getTargetFramesPerSecond(self):
+        return self._framesPerSecond
+
+    def setTargetFramesPerSecond(self, framesPerSecond, currentTime=None):
+        """
+        :param currentTime: Playback time to continue from if playing, otherwise current time.
+        """
+        if self._playing:
+            self._restart(self.getTime() if currentTime is None else currentTime)
+        self._framesPerSecond = float(framesPerSecond)
+
+    def start(self, currentTime):
+        """
+        Start playing from currentTime in seconds.
+        """
+        self._playing = True
+        self._tickTimes.clear()
+        self._tickCost = 0.0
+        self._droppedFrameCount = 0
+        self._restart(currentTime)
+
+    def stop(self):
+        self._playing = False
+
+    def seek(self, currentTime):
+        """
+        Continue playing from currentTime, e.g. on looping or if the user changes the time.
+        """
+        if self._playing:
+            self._restart(currentTime)
+
+    def _restart(self, currentTime):
+        self._startClockTime = self._clock()
+        self._startTime = currentTime
+        self._lastFrameIndex = None
+
+    def getTime(self):
+        """
+        :return: Playback time in seconds for the current clock time.
+        """
+        return self._startTime + max(0.0, self._clock() - self._startClockTime)
+
+    def beginTick(self):
+        """
+        Call at the start of each timer tick.
+        :return: Playback time in seconds to show.
+        """
+        clockTime = self._clock()
+        if self._tickStartClockTime is not None:
+            # previous tick did not end before this one started, so cost at least the time between them
+            self._addTickCost(clockTime - self._tickStartClockTime)
+        self._tickStartClockTime = clockTime
+        self._tickTimes.append(self._tickStartClockTime)
+        while self._tickTimes and (self._tickTimes[0] < (self._tickStartClockTime - RATE_WINDOW)):
+            self._tickTimes.popleft()
+        currentTime = self.getTime()
+        frameIndex = int(currentTime*self._framesPerSecond)
+        if (self._lastFrameIndex is not None) and (frameIndex > (self._lastFrameIndex + 1)):
+            self._droppedFrameCount += frameIndex - self._lastFrameIndex - 1
+        self._lastFrameIndex = frameIndex
+        return currentTime
+
+    def endTick(self):
+        """
+        Call at the end of each timer tick, after the frame is rendered, to measure its cost.
+        """
+        if self._tickStartClockTime is None:
+            return
+        self._addTickCost(self._clock() - self._tickStartClockTime)
+        self._tickStartClockTime = None
+
+    def _addTickCost(self, cost):
+        self._tickCost += TICK_COST_SMOOTHING*(cost - self._tickCost)
+
+    def getTimerInterval(self):
+        """
+        :return: Timer interval in milliseconds: the frame period, or with adaptive frame dropping
+        the measured cost of a tick if longer, so frames are dropped evenly rather than ticks queued.
+        """
+        interval = 1.0/self._framesPerSecond
+        if self._adaptive:
+            interval = max(interval, self._tickCost)
+        return int(round(1000.0*interval))
+
+    def getAchievedFramesPerSecond(self):
+        """
+        :return: Rate ticks were shown at over the last RATE_WINDOW seconds.
+        """
+        if len(self._tickTimes) < 2:
+            return 0.0
+        elapsed = self._tickTimes[-1] - self._tickTimes[0]
+        if elapsed <= 0.0:
+            return 0.0
+        return (len(self._tickTimes) - 1)/elapsed
+
+    def getDroppedFrameCount(self):
+        """
+        :return: Number of frames skipped since playback started.
+        """
+        return self._droppedFrameCount
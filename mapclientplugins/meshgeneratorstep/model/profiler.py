@@ -0,0 +1,113 @@
+"""
+Opt-in timing and memory instrumentation of the stages of scaffold generation, display and output.
+"""
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+# set to enable profiling from startup
+PROFILE_ENVIRONMENT_VARIABLE = 'MESHGENERATOR_PROFILE'
+# highest resolution clock available for timing stages
+clock = getattr(time, 'perf_counter', time.time)
+RECORD_FIELD_NAMES = ('stage', 'startTime', 'seconds', 'nodeCount', 'elementCount', 'frameCount',
+                      'peakMemory', 'peakMemoryIncrease')
+
+
+def getPeakMemory():
+    """
+    :return: Peak resident memory of this process in bytes, or None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes except on macOS
+    return peak if sys.platform == 'darwin' else peak*1024
+
+
+class Profiler(object):
+    """
+    Records wall time, entity counts and peak memory for named stages while enabled.
+    Peak memory is that of the whole process, including zinc and scaffoldmaker, so the
+    increase is only non-zero for stages reaching a new peak.
+    """
+
+    def __init__(self, enabled=None):
+        """
+        :param enabled: Whether to record stages. Default is enabled if environment variable
+        MESHGENERATOR_PROFILE is set.
+        """
+        if enabled is None:
+            enabled = bool(os.environ.get(PROFILE_ENVIRONMENT_VARIABLE))
+        self._enabled = enabled
+        self._records = []
+        self._recordCallback = None
+
+    def isEnabled(self):
+        return self._enabled
+
+    def setEnabled(self, enabled):
+        self._enabled = enabled
+
+    def registerRecordCallback(self, recordCallback):
+        """
+        :param recordCallback: Called with each record dict when a stage completes.
+        """
+        self._recordCallback = recordCallback
+
+    @contextmanager
+    def stage(self, name, getCounts=None):
+        """
+        Context manager recording the stage it encloses, if enabled.
+        :param getCounts: Optional function returning dict of counts e.g. nodeCount, elementCount,
+        called at the end of the stage.
+        """
+        if not self._enabled:
+            yield
+            return
+        startMemory = getPeakMemory()
+        startTime = time.time()
+        startClock = clock()
+        yield
+        record = {
+            'stage': name,
+            'startTime': startTime,
+            'seconds': clock() - startClock
+        }
+        if getCounts is not None:
+            record.update(getCounts())
+        peakMemory = getPeakMemory()
+        if peakMemory is not None:
+            record['peakMemory'] = peakMemory
+            record['peakMemoryIncrease'] = peakMemory - startMemory
+        self._records.append(record)
+        if self._recordCallback is not None:
+            self._recordCallback(record)
+
+    def getRecords(self):
+        """
+        :return: List of record dicts in order of completion.
+        """
+        return list(self._records)
+
+    def clear(self):
+        self._records = []
+
+    def writeJson(self, fileName):
+        with open(fileName, 'w') as f:
+            f.write(json.dumps(self._records, sort_keys=True, indent=4))
+
+    def writeCsv(self, fileName):
+        with open(fileName, 'w') as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_FIELD_NAMES, extrasaction='ignore')
+            writer.writeheader()
+            for record in self._records:
+                writer.writerow(record)
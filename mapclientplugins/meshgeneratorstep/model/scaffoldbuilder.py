@@ -0,0 +1,45 @@
+"""
+Utilities for building scaffolds independently of the region they are displayed in.
+"""
+from opencmiss.zinc.context import Context
+
+
+def writeRegionToBuffer(region):
+    """
+    :return: EX2 format string buffer containing region's fields, nodes and elements.
+    """
+    sir = region.createStreaminformationRegion()
+    srm = sir.createStreamresourceMemory()
+    region.write(sir)
+    result, buffer = srm.getBuffer()
+    return buffer
+
+
+def readRegionFromBuffer(region, buffer):
+    """
+    Read fields, nodes and elements from EX2 format string buffer into region.
+    :return: Zinc result, RESULT_OK on success.
+    """
+    sir = region.createStreaminformationRegion()
+    sir.createStreamresourceMemoryBuffer(buffer)
+    return region.read(sir)
+
+
+def generateScaffoldBuffer(meshType, meshTypeOptions):
+    """
+    Generate scaffold in a region of its own zinc context, sharing no zinc objects with the
+    main context. The zinc Python bindings hold the global interpreter lock throughout every
+    call, so zinc calls from a worker thread and the GUI thread never overlap and this is safe
+    to call from a worker thread. The GUI thread runs between scaffoldmaker's many short zinc
+    calls, but not during the final write of the region, which is one call.
+    :param meshType: Scaffoldmaker mesh type to generate.
+    :param meshTypeOptions: Dict of options for mesh type. Not modified.
+    :return: EX2 format string buffer containing the generated scaffold.
+    """
+    context = Context('MeshGeneratorBuild')
+    region = context.getDefaultRegion()
+    fm = region.getFieldmodule()
+    fm.beginChange()
+    meshType.generateMesh(region, dict(meshTypeOptions))
+    fm.endChange()
+    return writeRegionToBuffer(region)
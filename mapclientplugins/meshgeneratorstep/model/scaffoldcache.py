@@ -0,0 +1,179 @@
+"""
+Least recently used caches of generated scaffolds, held in memory as EX2 format string
+buffers or on disk as EX2 files.
+"""
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from mapclientplugins.meshgeneratorstep.model.outputformat import copyFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_BUDGET = 256*1024*1024
+DEFAULT_DISK_BUDGET = 2*1024*1024*1024
+VERSION_FILE_NAME = 'scaffoldmaker-version.txt'
+
+
+def getScaffoldKey(meshTypeName, meshTypeOptions):
+    """
+    :param meshTypeName: Name of scaffold mesh type.
+    :param meshTypeOptions: Dict of option name to value for the mesh type.
+    :return: Hex digest identifying the mesh type with its options, independent of option order.
+    """
+    normalizedText = json.dumps([meshTypeName, meshTypeOptions], sort_keys=True, default=str)
+    return hashlib.sha1(normalizedText.encode('utf-8')).hexdigest()
+
+
+def getScaffoldmakerVersion():
+    """
+    :return: Installed scaffoldmaker version string, or 'unknown' if it cannot be determined.
+    """
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution('scaffoldmaker').version
+    except Exception:
+        return 'unknown'
+
+
+class ScaffoldCache(object):
+    """
+    Cache of generated scaffold buffers by key, evicting least recently used entries
+    once the total size of buffers exceeds the memory budget.
+    """
+
+    def __init__(self, memoryBudget=DEFAULT_MEMORY_BUDGET):
+        self._memoryBudget = memoryBudget
+        self._memoryUsed = 0
+        self._buffers = OrderedDict()
+
+    def getMemoryBudget(self):
+        return self._memoryBudget
+
+    def setMemoryBudget(self, memoryBudget):
+        self._memoryBudget = memoryBudget
+        self._evict()
+
+    def getMemoryUsed(self):
+        return self._memoryUsed
+
+    def clear(self):
+        self._buffers.clear()
+        self._memoryUsed = 0
+
+    def get(self, key):
+        """
+        :return: Buffer cached for key, or None if not cached. Marks entry as most recently used.
+        """
+        buffer = self._buffers.pop(key, None)
+        if buffer is not None:
+            self._buffers[key] = buffer
+        return buffer
+
+    def put(self, key, buffer):
+        """
+        Cache buffer for key as most recently used, evicting older entries to fit in budget.
+        Buffers larger than the whole budget are not cached.
+        """
+        oldBuffer = self._buffers.pop(key, None)
+        if oldBuffer is not None:
+            self._memoryUsed -= len(oldBuffer)
+        if len(buffer) > self._memoryBudget:
+            return
+        self._buffers[key] = buffer
+        self._memoryUsed += len(buffer)
+        self._evict()
+
+    def _evict(self):
+        while self._memoryUsed > self._memoryBudget:
+            key, buffer = self._buffers.popitem(last=False)
+            self._memoryUsed -= len(buffer)
+
+
+class ScaffoldFileCache(object):
+    """
+    Cache of generated scaffold EX2 files in a directory, shared by all steps using it.
+    All files are discarded if the scaffoldmaker version differs from the one they were
+    generated with. Least recently used files are evicted once their total size exceeds
+    the disk budget.
+    """
+
+    def __init__(self, directory, diskBudget=DEFAULT_DISK_BUDGET):
+        self._directory = directory
+        self._diskBudget = diskBudget
+        self._checkVersion()
+
+    def getDirectory(self):
+        return self._directory
+
+    def _getFileName(self, key):
+        return os.path.join(self._directory, key + '.ex2')
+
+    def _getCachedFileNames(self):
+        return [os.path.join(self._directory, name) for name in os.listdir(self._directory) if name.endswith('.ex2')]
+
+    def _checkVersion(self):
+        """
+        Create cache directory if needed, clearing it if generated by a different scaffoldmaker version.
+        """
+        version = getScaffoldmakerVersion()
+        versionFileName = os.path.join(self._directory, VERSION_FILE_NAME)
+        try:
+            if not os.path.isdir(self._directory):
+                os.makedirs(self._directory)
+            cachedVersion = None
+            if os.path.exists(versionFileName):
+                with open(versionFileName, 'r') as f:
+                    cachedVersion = f.read().strip()
+            if cachedVersion != version:
+                self.clear()
+                with open(versionFileName, 'w') as f:
+                    f.write(version)
+        except (IOError, OSError) as e:
+            logger.warning('Failed to initialise scaffold cache in %s: %s', self._directory, e)
+
+    def clear(self):
+        for fileName in self._getCachedFileNames():
+            os.remove(fileName)
+
+    def getFileName(self, key):
+        """
+        :return: Name of cached file for key, or None if not cached. Marks entry as most recently used.
+        """
+        fileName = self._getFileName(key)
+        if not os.path.isfile(fileName):
+            return None
+        try:
+            os.utime(fileName, None)
+        except OSError:
+            pass
+        return fileName
+
+    def put(self, key, sourceFileName):
+        """
+        Copy source file into cache for key, then evict least recently used files to fit in budget.
+        Copy is made to a temporary file then renamed so partial files are never visible, and the
+        temporary file is removed if copying fails.
+        """
+        try:
+            copyFile(sourceFileName, self._getFileName(key))
+        except (IOError, OSError) as e:
+            logger.warning('Failed to cache scaffold %s: %s', sourceFileName, e)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        totalSize = 0
+        for fileName in self._getCachedFileNames():
+            fileStat = os.stat(fileName)
+            entries.append((fileStat.st_mtime, fileStat.st_size, fileName))
+            totalSize += fileStat.st_size
+        entries.sort()
+        for mtime, size, fileName in entries:
+            if totalSize <= self._diskBudget:
+                break
+            os.remove(fileName)
+            totalSize -= size
@@ -0,0 +1,85 @@
+"""
+Adaptive level of detail for tessellation of generated mesh surfaces and lines.
+"""
+import math
+
+SURFACES_TESSELLATION_NAME = 'surfaces'
+LINES_TESSELLATION_NAME = 'lines'
+MAXIMUM_REFINEMENT_FACTOR = 12
+DEFAULT_TRIANGLE_BUDGET = 2000000
+DEFAULT_LINE_SEGMENT_BUDGET = 1000000
+# interactive refinement is this fraction of the idle refinement
+INTERACTIVE_REFINEMENT_DIVISOR = 4
+
+
+def defineTessellations(tessellationmodule):
+    """
+    Define separate managed tessellations for surfaces and lines so their refinement
+    can be set independently.
+    """
+    for name in (SURFACES_TESSELLATION_NAME, LINES_TESSELLATION_NAME):
+        tessellation = tessellationmodule.findTessellationByName(name)
+        if not tessellation.isValid():
+            tessellation = tessellationmodule.createTessellation()
+            tessellation.setName(name)
+            tessellation.setManaged(True)
+        tessellation.setRefinementFactors(MAXIMUM_REFINEMENT_FACTOR)
+
+
+def _clampRefinementFactor(value):
+    return max(1, min(MAXIMUM_REFINEMENT_FACTOR, int(value)))
+
+
+class TessellationLevelOfDetail(object):
+    """
+    Chooses refinement factors for the surfaces and lines tessellations so the number of
+    triangles and line segments drawn stays within budget for the size of the mesh, using
+    a coarser tessellation while the user is interacting.
+    """
+
+    def __init__(self, tessellationmodule, triangleBudget=DEFAULT_TRIANGLE_BUDGET,
+                 lineSegmentBudget=DEFAULT_LINE_SEGMENT_BUDGET):
+        self._surfacesTessellation = tessellationmodule.findTessellationByName(SURFACES_TESSELLATION_NAME)
+        self._linesTessellation = tessellationmodule.findTessellationByName(LINES_TESSELLATION_NAME)
+        self._triangleBudget = triangleBudget
+        self._lineSegmentBudget = lineSegmentBudget
+        self._surfacesRefinement = MAXIMUM_REFINEMENT_FACTOR
+        self._linesRefinement = MAXIMUM_REFINEMENT_FACTOR
+        self._interactive = False
+
+    def getSurfacesRefinementFactor(self):
+        return self._surfacesRefinement
+
+    def getLinesRefinementFactor(self):
+        return self._linesRefinement
+
+    def isInteractive(self):
+        return self._interactive
+
+    def setInteractive(self, interactive):
+        """
+        Switch to coarse tessellation while interacting, and back to full refinement when idle.
+        """
+        if interactive != self._interactive:
+            self._interactive = interactive
+            self._apply()
+
+    def updateMeshSize(self, faceCount, lineCount):
+        """
+        Recompute refinement from the number of faces and lines drawn.
+        Each face is drawn with about 2*refinement^2 triangles and each line with refinement segments.
+        """
+        if faceCount > 0:
+            self._surfacesRefinement = _clampRefinementFactor(math.sqrt(self._triangleBudget/(2.0*faceCount)))
+        else:
+            self._surfacesRefinement = MAXIMUM_REFINEMENT_FACTOR
+        if lineCount > 0:
+            self._linesRefinement = _clampRefinementFactor(self._lineSegmentBudget/float(lineCount))
+        else:
+            self._linesRefinement = MAXIMUM_REFINEMENT_FACTOR
+        self._apply()
+
+    def _apply(self):
+        divisor = INTERACTIVE_REFINEMENT_DIVISOR if self._interactive else 1
+        self._surfacesTessellation.setRefinementFactors(_clampRefinementFactor(self._surfacesRefinement//divisor))
+        self._linesTessellation.setRefinementFactors(_clampRefinementFactor(self._linesRefinement//divisor))
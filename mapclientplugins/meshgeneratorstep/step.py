@@ -8,8 +8,7 @@ from PySide import QtCore, QtGui
 
 from mapclient.mountpoints.workflowstep import WorkflowStepMountPoint
 from mapclientplugins.meshgeneratorstep.configuredialog import ConfigureDialog
-from mapclientplugins.meshgeneratorstep.model.mastermodel import MasterModel
-from mapclientplugins.meshgeneratorstep.view.meshgeneratorwidget import MeshGeneratorWidget
+from mapclientplugins.meshgeneratorstep.model.outputformat import OUTPUT_FORMAT_EX2
 
 
 class MeshGeneratorStep(WorkflowStepMountPoint):
@@ -38,6 +37,8 @@ class MeshGeneratorStep(WorkflowStepMountPoint):
         self._config = {}
         self._config['identifier'] = ''
         self._config['AutoDone'] = False
+        self._config['OutputFormat'] = OUTPUT_FORMAT_EX2
+        self._config['HighestDimensionOnly'] = False
         self._model = None
         self._view = None
 
@@ -46,7 +47,12 @@ class MeshGeneratorStep(WorkflowStepMountPoint):
         Kick off the execution of the step, in this case an interactive dialog.
         User invokes the _doneExecution() method when finished, via pushbutton.
         """
+        # zinc, scaffoldmaker and the widget are only imported when the step is first run
+        from mapclientplugins.meshgeneratorstep.model.mastermodel import MasterModel
+        from mapclientplugins.meshgeneratorstep.view.meshgeneratorwidget import MeshGeneratorWidget
+
         self._model = MasterModel(self._location, self._config['identifier'])
+        self._model.setOutputFormat(self._config['OutputFormat'], self._config['HighestDimensionOnly'])
         self._view = MeshGeneratorWidget(self._model)
         self._view.setImageInfo(self._images_info)
         # self._view.setWindowFlags(QtCore.Qt.Widget)
@@ -0,0 +1,153 @@
+"""
+Parameter sweeps generating a scaffold for each of a grid or list of mesh type option sets.
+Option sets are validated with the mesh type's checkOptions, equivalent configurations are
+generated once, and scaffolds are generated in parallel worker processes. A line of JSON is
+appended to the manifest as each scaffold completes, recording its options, node and element
+counts and timings.
+
+Usage:
+    python -m mapclientplugins.meshgeneratorstep.sweep [-o OUTPUT_DIR] [-j PROCESSES] SPEC_FILE
+
+The spec file is JSON of the form:
+    {
+        "name": "ventricles",
+        "meshTypeName": "3D Heart Ventricles 1",
+        "baseSettings": "path/to/IDENTIFIER-settings.json",
+        "grid": {"Number of elements around": [8, 12], "LV wall thickness": [0.1, 0.15]},
+        "optionSets": [{"Number of elements up": 4}]
+    }
+where name, baseSettings and either one of grid or optionSets are optional.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+from mapclientplugins.meshgeneratorstep.batch import createGeneratorModel, generateScaffold, \
+    readGeneratorSettings, runJobs
+from mapclientplugins.meshgeneratorstep.model.scaffoldcache import getScaffoldKey
+
+MANIFEST_FILE_NAME = 'manifest.jsonl'
+
+
+def expandOptionGrid(optionGrid):
+    """
+    :param optionGrid: Dict of option name to list of values.
+    :return: List of option dicts for every combination of values.
+    """
+    names = sorted(optionGrid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*[optionGrid[name] for name in names])]
+
+
+def prepareSweep(meshTypeName, optionSets, baseSettings=None):
+    """
+    Validate option sets for mesh type and remove equivalent configurations.
+    Options not in a set take their default values. Options in each set are applied in the
+    mesh type's option order, each followed by checkOptions, exactly as in the interactive step.
+    :param baseSettings: Optional generator settings supplying scale, delete element ranges etc.
+    :return: List of (requestedOptions, generatorSettings) for each distinct configuration.
+    """
+    model = createGeneratorModel()
+    # options are only validated here; defer any mesh generation indefinitely
+    model.registerUpdateRequestCallback(lambda: None)
+    if meshTypeName not in model.getAllMeshTypeNames():
+        raise ValueError('Unknown mesh type ' + repr(meshTypeName))
+    model.setMeshTypeByName(meshTypeName)
+    orderedOptionNames = model.getMeshTypeOrderedOptionNames()
+    sweep = []
+    keys = set()
+    for optionSet in optionSets:
+        unknownNames = [name for name in optionSet if name not in orderedOptionNames]
+        if unknownNames:
+            raise ValueError('Unknown options for ' + meshTypeName + ': ' + ', '.join(unknownNames))
+        model.resetMeshTypeOptions()
+        for name in orderedOptionNames:
+            if name in optionSet:
+                model.setMeshTypeOption(name, optionSet[name])
+        meshTypeOptions = dict(model.getSettings()['meshTypeOptions'])
+        key = getScaffoldKey(meshTypeName, meshTypeOptions)
+        if key in keys:
+            continue
+        keys.add(key)
+        generatorSettings = dict(baseSettings) if baseSettings else {}
+        generatorSettings['meshTypeName'] = meshTypeName
+        generatorSettings['meshTypeOptions'] = meshTypeOptions
+        sweep.append((optionSet, generatorSettings))
+    return sweep
+
+
+def _generateSweepJob(job):
+    """
+    Process pool worker generating one scaffold of a sweep.
+    :param job: (index, requestedOptions, generatorSettings, outputFileName)
+    :return: Manifest entry dict.
+    """
+    index, requestedOptions, generatorSettings, outputFileName = job
+    entry = {
+        'index': index,
+        'file': os.path.basename(outputFileName),
+        'meshTypeName': generatorSettings['meshTypeName'],
+        'requestedOptions': requestedOptions,
+        'meshTypeOptions': generatorSettings['meshTypeOptions']
+    }
+    startTime = time.time()
+    try:
+        model = generateScaffold(generatorSettings, outputFileName)
+        entry['nodeCount'] = model.getNodeCount()
+        entry['elementCount'] = model.getElementCount()
+        entry['error'] = None
+    except Exception as e:
+        entry['error'] = str(e)
+    entry['seconds'] = time.time() - startTime
+    return entry
+
+
+def runSweep(name, sweep, outputDirectory, processes=None):
+    """
+    Generate all configurations of sweep in parallel, streaming an entry per scaffold
+    to the manifest in the output directory as each completes.
+    :param sweep: List of (requestedOptions, generatorSettings) from prepareSweep().
+    :return: Number of scaffolds which failed to generate.
+    """
+    if not os.path.isdir(outputDirectory):
+        os.makedirs(outputDirectory)
+    jobs = [(index, requestedOptions, generatorSettings,
+             os.path.join(outputDirectory, '{0}-{1:04d}.ex2'.format(name, index)))
+            for index, (requestedOptions, generatorSettings) in enumerate(sweep)]
+    failureCount = 0
+    with open(os.path.join(outputDirectory, MANIFEST_FILE_NAME), 'w') as manifest:
+        for entry in runJobs(_generateSweepJob, jobs, processes):
+            manifest.write(json.dumps(entry, sort_keys=True) + '\n')
+            manifest.flush()
+            if entry['error'] is not None:
+                failureCount += 1
+                print('Failed to generate {0}: {1}'.format(entry['file'], entry['error']))
+            else:
+                print('Wrote {0}: {1} nodes, {2} elements in {3:.2f}s'.format(
+                    entry['file'], entry['nodeCount'], entry['elementCount'], entry['seconds']))
+    return failureCount
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate scaffolds for a sweep of mesh type options.')
+    parser.add_argument('spec_file', help='JSON sweep specification')
+    parser.add_argument('-o', '--output-dir', default='.', help='directory to write models and manifest to')
+    parser.add_argument('-j', '--processes', type=int, help='number of worker processes, default number of CPUs')
+    args = parser.parse_args(argv)
+    with open(args.spec_file, 'r') as f:
+        spec = json.loads(f.read())
+    optionSets = spec.get('optionSets', [])
+    if 'grid' in spec:
+        optionSets = optionSets + expandOptionGrid(spec['grid'])
+    if not optionSets:
+        optionSets = [{}]
+    baseSettings = readGeneratorSettings(spec['baseSettings']) if 'baseSettings' in spec else None
+    sweep = prepareSweep(spec['meshTypeName'], optionSets, baseSettings)
+    print('Generating {0} distinct configurations of {1} requested'.format(len(sweep), len(optionSets)))
+    return 1 if runSweep(spec.get('name', 'sweep'), sweep, args.output_dir, args.processes) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -30,6 +30,15 @@ class Ui_ConfigureDialog(object):
         self.autoDoneCheckBox = QtGui.QCheckBox(self.configGroupBox)
         self.autoDoneCheckBox.setObjectName("autoDoneCheckBox")
         self.formLayout.setWidget(1, QtGui.QFormLayout.LabelRole, self.autoDoneCheckBox)
+        self.outputFormatLabel = QtGui.QLabel(self.configGroupBox)
+        self.outputFormatLabel.setObjectName("outputFormatLabel")
+        self.formLayout.setWidget(2, QtGui.QFormLayout.LabelRole, self.outputFormatLabel)
+        self.outputFormatComboBox = QtGui.QComboBox(self.configGroupBox)
+        self.outputFormatComboBox.setObjectName("outputFormatComboBox")
+        self.formLayout.setWidget(2, QtGui.QFormLayout.FieldRole, self.outputFormatComboBox)
+        self.highestDimensionCheckBox = QtGui.QCheckBox(self.configGroupBox)
+        self.highestDimensionCheckBox.setObjectName("highestDimensionCheckBox")
+        self.formLayout.setWidget(3, QtGui.QFormLayout.SpanningRole, self.highestDimensionCheckBox)
         self.gridLayout.addWidget(self.configGroupBox, 0, 0, 1, 1)
         self.buttonBox = QtGui.QDialogButtonBox(ConfigureDialog)
         self.buttonBox.setOrientation(QtCore.Qt.Horizontal)
@@ -46,4 +55,6 @@ class Ui_ConfigureDialog(object):
         ConfigureDialog.setWindowTitle(QtGui.QApplication.translate("ConfigureDialog", "Configure Step", None, QtGui.QApplication.UnicodeUTF8))
         self.label0.setText(QtGui.QApplication.translate("ConfigureDialog", "Identifier:  ", None, QtGui.QApplication.UnicodeUTF8))
         self.autoDoneCheckBox.setText(QtGui.QApplication.translate("ConfigureDialog", "Auto done", None, QtGui.QApplication.UnicodeUTF8))
+        self.outputFormatLabel.setText(QtGui.QApplication.translate("ConfigureDialog", "Output format:  ", None, QtGui.QApplication.UnicodeUTF8))
+        self.highestDimensionCheckBox.setText(QtGui.QApplication.translate("ConfigureDialog", "Write highest dimension elements only", None, QtGui.QApplication.UnicodeUTF8))
 
@@ -9,6 +9,10 @@ from PySide import QtGui, QtCore
 from functools import partial
 
 from mapclientplugins.meshgeneratorstep.model.fiducialmarkermodel import FIDUCIAL_MARKER_LABELS
+from mapclientplugins.meshgeneratorstep.model.meshgeneratormodel import LABEL_MODES
+from mapclientplugins.meshgeneratorstep.model.meshplanemodel import MAX_RESOLUTION_LEVEL, RESOLUTION_LEVEL_AUTO
+from mapclientplugins.meshgeneratorstep.view.meshupdatescheduler import MeshUpdateScheduler
+from mapclientplugins.meshgeneratorstep.view.profileroverlay import ProfilerOverlay
 from mapclientplugins.meshgeneratorstep.view.ui_meshgeneratorwidget import Ui_MeshGeneratorWidget
 from opencmiss.utils.maths import vectorops
 
@@ -22,7 +26,14 @@ class MeshGeneratorWidget(QtGui.QWidget):
         self._model = model
         self._model.registerTimeValueUpdateCallback(self._updateTimeValue)
         self._model.registerFrameIndexUpdateCallback(self._updateFrameIndex)
+        self._model.registerPlaybackRateUpdateCallback(self._updatePlaybackRate)
         self._generator_model = model.getGeneratorModel()
+        self._mesh_update_scheduler = MeshUpdateScheduler(self._generator_model, parent=self)
+        self._generation_progressBar = QtGui.QProgressBar(self._ui.frame)
+        self._generation_progressBar.setRange(0, 0)
+        self._generation_progressBar.setFormat('Generating')
+        self._generation_progressBar.setVisible(False)
+        self._ui.horizontalLayout_2.insertWidget(0, self._generation_progressBar)
         self._plane_model = model.getPlaneModel()
         self._fiducial_marker_model = model.getFiducialMarkerModel()
         self._ui.sceneviewer_widget.setContext(model.getContext())
@@ -30,8 +41,13 @@ class MeshGeneratorWidget(QtGui.QWidget):
         self._model.registerSceneChangeCallback(self._sceneChanged)
         self._doneCallback = None
         self._populateFiducialMarkersComboBox()
+        self._ui.labelMode_comboBox.addItems(['All', 'In view', 'Near centre'])
+        # items in order of resolution level from RESOLUTION_LEVEL_AUTO
+        self._ui.imageResolution_comboBox.addItems(
+            ['Auto', 'Full'] + ['1/{0}'.format(1 << level) for level in range(1, MAX_RESOLUTION_LEVEL + 1)])
         self._marker_mode_active = False
         self._have_images = False
+        self._profiler_overlay = None
         # self._populateAnnotationTree()
         meshTypeNames = self._generator_model.getAllMeshTypeNames()
         for meshTypeName in meshTypeNames:
@@ -46,6 +62,7 @@ class MeshGeneratorWidget(QtGui.QWidget):
         sceneviewer = self._ui.sceneviewer_widget.getSceneviewer()
         if sceneviewer is not None:
             self._model.loadSettings()
+            self._generator_model.setLabelSceneviewer(sceneviewer)
             self._refreshOptions()
             scene = self._model.getScene()
             self._ui.sceneviewer_widget.setScene(scene)
@@ -75,6 +92,9 @@ class MeshGeneratorWidget(QtGui.QWidget):
 
     def _makeConnections(self):
         self._ui.sceneviewer_widget.graphicsInitialized.connect(self._graphicsInitialized)
+        self._ui.sceneviewer_widget.installEventFilter(self)
+        self._mesh_update_scheduler.buildStarted.connect(self._generation_progressBar.show)
+        self._mesh_update_scheduler.buildFinished.connect(self._generation_progressBar.hide)
         self._ui.done_button.clicked.connect(self._doneButtonClicked)
         self._ui.viewAll_button.clicked.connect(self._viewAll)
         self._ui.meshType_comboBox.currentIndexChanged.connect(self._meshTypeChanged)
@@ -87,6 +107,8 @@ class MeshGeneratorWidget(QtGui.QWidget):
         self._ui.displayLines_checkBox.clicked.connect(self._displayLinesClicked)
         self._ui.displayNodeDerivatives_checkBox.clicked.connect(self._displayNodeDerivativesClicked)
         self._ui.displayNodeNumbers_checkBox.clicked.connect(self._displayNodeNumbersClicked)
+        self._ui.labelMode_comboBox.currentIndexChanged.connect(self._labelModeChanged)
+        self._ui.labelStride_spinBox.valueChanged.connect(self._labelStrideValueChanged)
         self._ui.displaySurfaces_checkBox.clicked.connect(self._displaySurfacesClicked)
         self._ui.displaySurfacesExterior_checkBox.clicked.connect(self._displaySurfacesExteriorClicked)
         self._ui.displaySurfacesTranslucent_checkBox.clicked.connect(self._displaySurfacesTranslucentClicked)
@@ -95,6 +117,7 @@ class MeshGeneratorWidget(QtGui.QWidget):
         self._ui.activeModel_comboBox.currentIndexChanged.connect(self._activeModelChanged)
         self._ui.toImage_pushButton.clicked.connect(self._imageButtonClicked)
         self._ui.displayImagePlane_checkBox.clicked.connect(self._displayImagePlaneClicked)
+        self._ui.imageResolution_comboBox.currentIndexChanged.connect(self._imageResolutionChanged)
         self._ui.fixImagePlane_checkBox.clicked.connect(self._fixImagePlaneClicked)
         self._ui.timeValue_doubleSpinBox.valueChanged.connect(self._timeValueChanged)
         self._ui.timePlayStop_pushButton.clicked.connect(self._timePlayStopClicked)
@@ -102,6 +125,7 @@ class MeshGeneratorWidget(QtGui.QWidget):
         self._ui.framesPerSecond_spinBox.valueChanged.connect(self._framesPerSecondValueChanged)
         self._ui.timeLoop_checkBox.clicked.connect(self._timeLoopClicked)
         self._ui.displayFiducialMarkers_checkBox.clicked.connect(self._displayFiducialMarkersClicked)
+        self._ui.displayProfile_checkBox.clicked.connect(self._displayProfileClicked)
         self._ui.fiducialMarker_comboBox.currentIndexChanged.connect(self._fiducialMarkerChanged)
         # self._ui.treeWidgetAnnotation.itemSelectionChanged.connect(self._annotationSelectionChanged)
         # self._ui.treeWidgetAnnotation.itemChanged.connect(self._annotationItemChanged)
@@ -109,6 +133,24 @@ class MeshGeneratorWidget(QtGui.QWidget):
     def _fiducialMarkerChanged(self):
         self._fiducial_marker_model.setActiveMarker(self._ui.fiducialMarker_comboBox.currentText())
 
+    def _displayProfileClicked(self):
+        """
+        Show overlay of profiled stage timings, enabling profiling while shown.
+        """
+        show = self._ui.displayProfile_checkBox.isChecked()
+        profiler = self._model.getProfiler()
+        if show:
+            profiler.setEnabled(True)
+            if self._profiler_overlay is None:
+                self._profiler_overlay = ProfilerOverlay(self._model.getScene())
+                for record in profiler.getRecords():
+                    self._profiler_overlay.addRecord(record)
+                profiler.registerRecordCallback(self._profiler_overlay.addRecord)
+        elif self._profiler_overlay is not None:
+            profiler.setEnabled(False)
+        if self._profiler_overlay is not None:
+            self._profiler_overlay.setVisible(show)
+
     def _displayFiducialMarkersClicked(self):
         self._fiducial_marker_model.setDisplayFiducialMarkers(self._ui.displayFiducialMarkers_checkBox.isChecked())
 
@@ -162,6 +204,7 @@ class MeshGeneratorWidget(QtGui.QWidget):
             self._ui.fiducialMarkers_groupBox.setVisible(False)
             self._ui.video_groupBox.setVisible(False)
             self._ui.displayImagePlane_checkBox.setVisible(False)
+            self._ui.imageResolution_frame.setVisible(False)
             self._ui.displayFiducialMarkers_checkBox.setVisible(False)
 
     def setImageInfo(self, image_info):
@@ -171,7 +214,22 @@ class MeshGeneratorWidget(QtGui.QWidget):
 
     def _doneButtonClicked(self):
         self._ui.dockWidget.setFloating(False)
-        self._model.done()
+        self._mesh_update_scheduler.flush()
+        if not self._mesh_update_scheduler.isClosed():
+            # no build results or progress are delivered to the widget after this
+            self._mesh_update_scheduler.buildStarted.disconnect(self._generation_progressBar.show)
+            self._mesh_update_scheduler.buildFinished.disconnect(self._generation_progressBar.hide)
+            self._mesh_update_scheduler.close()
+        # model is written in the background; workflow continues once it is complete
+        self._ui.done_button.setEnabled(False)
+        self._model.done(self._modelWritten)
+
+    def _modelWritten(self, error):
+        if error is not None:
+            # keep model so the user can retry
+            self._ui.done_button.setEnabled(True)
+            return
+        self._model.close()
         self._model = None
         self._doneCallback()
 
@@ -201,6 +259,10 @@ class MeshGeneratorWidget(QtGui.QWidget):
         self._ui.frameIndex_spinBox.setValue(value)
         self._ui.frameIndex_spinBox.blockSignals(False)
 
+    def _updatePlaybackRate(self, achieved_fps, target_fps, dropped_frame_count):
+        self._ui.playbackRate_label.setText('Playback: {0:.1f} / {1:g} fps, {2} frames dropped'.format(
+            achieved_fps, target_fps, dropped_frame_count))
+
     def _timeValueChanged(self, value):
         self._model.setTimeValue(value)
 
@@ -234,6 +296,9 @@ class MeshGeneratorWidget(QtGui.QWidget):
     def _displayImagePlaneClicked(self):
         self._plane_model.setImagePlaneVisible(self._ui.displayImagePlane_checkBox.isChecked())
 
+    def _imageResolutionChanged(self, index):
+        self._plane_model.setImageResolutionLevel(RESOLUTION_LEVEL_AUTO + index)
+
     def _activeModelChanged(self, index):
         if index == 0:
             self._ui.sceneviewer_widget.setModel(self._plane_model)
@@ -294,13 +359,25 @@ class MeshGeneratorWidget(QtGui.QWidget):
         self._ui.displayLines_checkBox.setChecked(self._generator_model.isDisplayLines())
         self._ui.displayNodeDerivatives_checkBox.setChecked(self._generator_model.isDisplayNodeDerivatives())
         self._ui.displayNodeNumbers_checkBox.setChecked(self._generator_model.isDisplayNodeNumbers())
+        self._ui.labelMode_comboBox.blockSignals(True)
+        self._ui.labelMode_comboBox.setCurrentIndex(LABEL_MODES.index(self._generator_model.getLabelMode()))
+        self._ui.labelMode_comboBox.blockSignals(False)
+        self._ui.labelStride_spinBox.blockSignals(True)
+        self._ui.labelStride_spinBox.setValue(self._generator_model.getLabelStride())
+        self._ui.labelStride_spinBox.blockSignals(False)
         self._ui.displaySurfaces_checkBox.setChecked(self._generator_model.isDisplaySurfaces())
         self._ui.displaySurfacesExterior_checkBox.setChecked(self._generator_model.isDisplaySurfacesExterior())
         self._ui.displaySurfacesTranslucent_checkBox.setChecked(self._generator_model.isDisplaySurfacesTranslucent())
         self._ui.displaySurfacesWireframe_checkBox.setChecked(self._generator_model.isDisplaySurfacesWireframe())
         self._ui.displayXiAxes_checkBox.setChecked(self._generator_model.isDisplayXiAxes())
         self._ui.displayImagePlane_checkBox.setChecked(self._plane_model.isDisplayImagePlane())
+        self._ui.imageResolution_comboBox.blockSignals(True)
+        self._ui.imageResolution_comboBox.setCurrentIndex(self._plane_model.getImageResolutionLevel() - RESOLUTION_LEVEL_AUTO)
+        self._ui.imageResolution_comboBox.blockSignals(False)
         self._ui.displayFiducialMarkers_checkBox.setChecked(self._fiducial_marker_model.isDisplayFiducialMarkers())
+        self._ui.displayProfile_checkBox.setChecked(self._model.getProfiler().isEnabled())
+        if self._ui.displayProfile_checkBox.isChecked():
+            self._displayProfileClicked()
         self._ui.fixImagePlane_checkBox.setChecked(self._plane_model.isImagePlaneFixed())
         self._ui.framesPerSecond_spinBox.setValue(self._model.getFramesPerSecond())
         self._ui.timeLoop_checkBox.setChecked(self._model.isTimeLoop())
@@ -338,6 +415,12 @@ class MeshGeneratorWidget(QtGui.QWidget):
     def _displayNodeNumbersClicked(self):
         self._generator_model.setDisplayNodeNumbers(self._ui.displayNodeNumbers_checkBox.isChecked())
 
+    def _labelModeChanged(self, index):
+        self._generator_model.setLabelMode(LABEL_MODES[index])
+
+    def _labelStrideValueChanged(self, value):
+        self._generator_model.setLabelStride(value)
+
     def _displaySurfacesClicked(self):
         self._generator_model.setDisplaySurfaces(self._ui.displaySurfaces_checkBox.isChecked())
         self._autoPerturbLines()
@@ -366,6 +449,20 @@ class MeshGeneratorWidget(QtGui.QWidget):
         if self._ui.sceneviewer_widget.getSceneviewer() is not None:
             self._ui.sceneviewer_widget.viewAll()
 
+    def eventFilter(self, obj, event):
+        """
+        Report interaction with the sceneviewer so the model can draw coarser while it continues.
+        """
+        if obj is self._ui.sceneviewer_widget and self._model is not None:
+            eventType = event.type()
+            if eventType == QtCore.QEvent.MouseButtonPress:
+                self._model.setInteracting(True)
+            elif eventType == QtCore.QEvent.MouseButtonRelease:
+                self._model.setInteracting(False)
+            elif eventType == QtCore.QEvent.Wheel:
+                self._model.wheelTurned()
+        return super(MeshGeneratorWidget, self).eventFilter(obj, event)
+
     def keyPressEvent(self, event):
         if event.modifiers() & QtCore.Qt.CTRL and QtGui.QApplication.mouseButtons() == QtCore.Qt.NoButton:
             self._marker_mode_active = True
@@ -0,0 +1,178 @@
+"""
+Debounced scheduling of generated mesh updates.
+"""
+import threading
+
+from PySide import QtCore
+
+from mapclientplugins.meshgeneratorstep.model.scaffoldbuilder import generateScaffoldBuffer
+
+DEFAULT_UPDATE_DELAY_MS = 250
+
+
+class MeshUpdateScheduler(QtCore.QObject):
+    """
+    Coalesces requests to update the generated mesh behind a short single shot timer,
+    so a burst of option edits results in one update, with at most one update in progress.
+    In asynchronous mode new base meshes are generated on a worker thread in their own
+    zinc context while the old mesh remains displayed, and swapped in when complete; see
+    scaffoldbuilder.generateScaffoldBuffer for why this is safe.
+    Builds made stale by newer requests are not displayed, but are kept in the scaffold cache.
+    Scaffoldmaker cannot interrupt generation, so a build in progress always runs to completion;
+    close() stops the scheduler notifying anything of it.
+    """
+
+    buildStarted = QtCore.Signal()
+    buildFinished = QtCore.Signal()
+    _baseMeshBuilt = QtCore.Signal()
+
+    def __init__(self, generator_model, delay=DEFAULT_UPDATE_DELAY_MS, asynchronous=True, parent=None):
+        super(MeshUpdateScheduler, self).__init__(parent)
+        self._generator_model = generator_model
+        self._asynchronous = asynchronous
+        self._updating = False
+        self._building = False
+        self._closed = False
+        self._buildThread = None
+        # guards result of build and closed state shared with worker thread
+        self._buildLock = threading.Lock()
+        self._buildResult = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self._update)
+        self._baseMeshBuilt.connect(self._baseMeshBuiltReceived)
+        self._generator_model.registerUpdateRequestCallback(self.requestUpdate)
+
+    def isAsynchronous(self):
+        return self._asynchronous
+
+    def setAsynchronous(self, asynchronous):
+        self._asynchronous = asynchronous
+
+    def isBuilding(self):
+        return self._building
+
+    def isClosed(self):
+        return self._closed
+
+    def requestUpdate(self):
+        """
+        Schedule an update, restarting the delay if one is already scheduled.
+        Once closed, updates are performed immediately on this thread.
+        """
+        if self._closed:
+            self._generator_model.updateMesh()
+            return
+        self._timer.start()
+
+    def flush(self):
+        """
+        Perform any pending update immediately on this thread, e.g. before writing the model.
+        Waits for any build in progress, whose result is used if still current.
+        """
+        self._timer.stop()
+        self._waitForBuild()
+        self._generator_model.updateMesh()
+
+    def close(self):
+        """
+        Stop scheduling and disconnect internal signals, e.g. before the owning widget is destroyed.
+        A build in progress completes on its worker thread but is not delivered to this object.
+        Callers should disconnect their own slots from buildStarted and buildFinished.
+        """
+        self._timer.stop()
+        with self._buildLock:
+            self._closed = True
+            self._buildResult = None
+        self._building = False
+        self._timer.timeout.disconnect(self._update)
+        self._baseMeshBuilt.disconnect(self._baseMeshBuiltReceived)
+
+    def _waitForBuild(self):
+        """
+        Wait for any build in progress to finish and supply its result to the generator model,
+        without waiting for its notification to be delivered by the event loop.
+        """
+        if self._buildThread is not None:
+            self._buildThread.join()
+            self._buildThread = None
+        buildResult = self._popBuildResult()
+        if buildResult is not None:
+            self._applyBuildResult(buildResult)
+
+    def _update(self, asynchronous=True):
+        if self._building:
+            # latest settings are applied when the build in progress finishes
+            return
+        if self._updating:
+            # events processed during an update must not start another; retry afterwards
+            self._timer.start()
+            return
+        build = self._generator_model.getPendingBaseMeshBuild() if (self._asynchronous and asynchronous) else None
+        if build is not None:
+            self._startBuild(*build)
+            return
+        self._updating = True
+        try:
+            self._generator_model.updateMesh()
+        finally:
+            self._updating = False
+
+    def _startBuild(self, key, meshType, meshTypeOptions):
+        self._building = True
+        self.buildStarted.emit()
+        self._buildThread = threading.Thread(target=self._build, args=(key, meshType, meshTypeOptions))
+        self._buildThread.daemon = True
+        self._buildThread.start()
+
+    def _build(self, key, meshType, meshTypeOptions):
+        """
+        Runs on worker thread. Result is delivered to _baseMeshBuiltReceived on the GUI thread,
+        unless closed.
+        """
+        buffer = None
+        try:
+            buffer = generateScaffoldBuffer(meshType, meshTypeOptions)
+        except Exception as e:
+            print('MeshUpdateScheduler: Failed to generate', meshType.getName(), ':', e)
+        with self._buildLock:
+            if self._closed:
+                return
+            self._buildResult = (key, buffer)
+            self._baseMeshBuilt.emit()
+
+    def _popBuildResult(self):
+        """
+        :return: (key, buffer) of finished build, or None if none or already taken.
+        """
+        with self._buildLock:
+            buildResult = self._buildResult
+            self._buildResult = None
+        return buildResult
+
+    def _applyBuildResult(self, buildResult):
+        """
+        Supply base mesh from finished build to the generator model.
+        :return: True on success, False if generation failed.
+        """
+        self._building = False
+        self.buildFinished.emit()
+        key, buffer = buildResult
+        if buffer is None:
+            return False
+        self._generator_model.addBaseMeshBuffer(key, buffer)
+        return True
+
+    def _baseMeshBuiltReceived(self):
+        buildResult = self._popBuildResult()
+        if buildResult is None:
+            # already taken by flush()
+            return
+        self._buildThread = None
+        if not self._applyBuildResult(buildResult):
+            # report failure from generating on the GUI thread rather than retrying in the background
+            self._update(asynchronous=False)
+            return
+        # applies the result if still current, otherwise starts a build for newer settings
+        self._update()
@@ -0,0 +1,65 @@
+"""
+Overlay of the latest profiled stages drawn in window coordinates over the scene.
+"""
+from opencmiss.zinc.scenecoordinatesystem import SCENECOORDINATESYSTEM_WINDOW_PIXEL_BOTTOM_LEFT
+
+OVERLAY_LINE_COUNT = 6
+OVERLAY_LINE_SPACING = 15
+# leave room for the align mode indicator in the bottom left corner
+OVERLAY_BASE_OFFSET = 25
+
+
+def formatProfileRecord(record):
+    text = '{0}: {1:.3f}s'.format(record['stage'], record['seconds'])
+    if 'nodeCount' in record:
+        text += ', {0} nodes, {1} elements'.format(record['nodeCount'], record['elementCount'])
+    if 'frameCount' in record:
+        text += ', {0} frames'.format(record['frameCount'])
+    if 'peakMemory' in record:
+        text += ', peak {0:.0f} MB'.format(record['peakMemory']/(1024.0*1024.0))
+    return text
+
+
+class ProfilerOverlay(object):
+    """
+    Shows the most recent profiler records as lines of text in the bottom left of the window,
+    newest at the bottom.
+    """
+
+    def __init__(self, scene):
+        self._scene = scene
+        self._lines = []
+        self._visible = False
+
+    def addRecord(self, record):
+        self._lines.append(formatProfileRecord(record))
+        del self._lines[:-OVERLAY_LINE_COUNT]
+        self._update()
+
+    def setVisible(self, visible):
+        self._visible = visible
+        self._scene.beginChange()
+        for index in range(OVERLAY_LINE_COUNT):
+            graphics = self._scene.findGraphicsByName('profile-overlay-{0}'.format(index))
+            if graphics.isValid():
+                graphics.setVisibilityFlag(visible)
+        self._scene.endChange()
+
+    def _update(self):
+        scene = self._scene
+        scene.beginChange()
+        materialmodule = scene.getMaterialmodule()
+        for index, text in enumerate(reversed(self._lines)):
+            name = 'profile-overlay-{0}'.format(index)
+            graphics = scene.findGraphicsByName(name)
+            if not graphics.isValid():
+                graphics = scene.createGraphicsPoints()
+                graphics.setName(name)
+                graphics.setScenecoordinatesystem(SCENECOORDINATESYSTEM_WINDOW_PIXEL_BOTTOM_LEFT)
+                graphics.setMaterial(materialmodule.findMaterialByName('white'))
+                pointAttr = graphics.getGraphicspointattributes()
+                pointAttr.setBaseSize(1)
+                pointAttr.setGlyphOffset([3, OVERLAY_BASE_OFFSET + OVERLAY_LINE_SPACING*index, 0])
+                graphics.setVisibilityFlag(self._visible)
+            graphics.getGraphicspointattributes().setLabelText(1, text)
+        scene.endChange()
@@ -161,6 +161,28 @@ class Ui_MeshGeneratorWidget(object):
         self.displayNodeNumbers_checkBox = QtGui.QCheckBox(self.displayOptions_groupBox)
         self.displayNodeNumbers_checkBox.setObjectName("displayNodeNumbers_checkBox")
         self.verticalLayout_7.addWidget(self.displayNodeNumbers_checkBox)
+        self.labelMode_frame = QtGui.QFrame(self.displayOptions_groupBox)
+        self.labelMode_frame.setFrameShape(QtGui.QFrame.StyledPanel)
+        self.labelMode_frame.setFrameShadow(QtGui.QFrame.Raised)
+        self.labelMode_frame.setObjectName("labelMode_frame")
+        self.horizontalLayout_5 = QtGui.QHBoxLayout(self.labelMode_frame)
+        self.horizontalLayout_5.setContentsMargins(0, 0, 0, 0)
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.labelMode_label = QtGui.QLabel(self.labelMode_frame)
+        self.labelMode_label.setObjectName("labelMode_label")
+        self.horizontalLayout_5.addWidget(self.labelMode_label)
+        self.labelMode_comboBox = QtGui.QComboBox(self.labelMode_frame)
+        self.labelMode_comboBox.setObjectName("labelMode_comboBox")
+        self.horizontalLayout_5.addWidget(self.labelMode_comboBox)
+        self.labelStride_label = QtGui.QLabel(self.labelMode_frame)
+        self.labelStride_label.setObjectName("labelStride_label")
+        self.horizontalLayout_5.addWidget(self.labelStride_label)
+        self.labelStride_spinBox = QtGui.QSpinBox(self.labelMode_frame)
+        self.labelStride_spinBox.setMinimum(1)
+        self.labelStride_spinBox.setMaximum(1000)
+        self.labelStride_spinBox.setObjectName("labelStride_spinBox")
+        self.horizontalLayout_5.addWidget(self.labelStride_spinBox)
+        self.verticalLayout_7.addWidget(self.labelMode_frame)
         self.displayNodeDerivatives_checkBox = QtGui.QCheckBox(self.displayOptions_groupBox)
         self.displayNodeDerivatives_checkBox.setObjectName("displayNodeDerivatives_checkBox")
         self.verticalLayout_7.addWidget(self.displayNodeDerivatives_checkBox)
@@ -170,9 +192,26 @@ class Ui_MeshGeneratorWidget(object):
         self.displayImagePlane_checkBox = QtGui.QCheckBox(self.displayOptions_groupBox)
         self.displayImagePlane_checkBox.setObjectName("displayImagePlane_checkBox")
         self.verticalLayout_7.addWidget(self.displayImagePlane_checkBox)
+        self.imageResolution_frame = QtGui.QFrame(self.displayOptions_groupBox)
+        self.imageResolution_frame.setFrameShape(QtGui.QFrame.StyledPanel)
+        self.imageResolution_frame.setFrameShadow(QtGui.QFrame.Raised)
+        self.imageResolution_frame.setObjectName("imageResolution_frame")
+        self.horizontalLayout_6 = QtGui.QHBoxLayout(self.imageResolution_frame)
+        self.horizontalLayout_6.setContentsMargins(0, 0, 0, 0)
+        self.horizontalLayout_6.setObjectName("horizontalLayout_6")
+        self.imageResolution_label = QtGui.QLabel(self.imageResolution_frame)
+        self.imageResolution_label.setObjectName("imageResolution_label")
+        self.horizontalLayout_6.addWidget(self.imageResolution_label)
+        self.imageResolution_comboBox = QtGui.QComboBox(self.imageResolution_frame)
+        self.imageResolution_comboBox.setObjectName("imageResolution_comboBox")
+        self.horizontalLayout_6.addWidget(self.imageResolution_comboBox)
+        self.verticalLayout_7.addWidget(self.imageResolution_frame)
         self.displayFiducialMarkers_checkBox = QtGui.QCheckBox(self.displayOptions_groupBox)
         self.displayFiducialMarkers_checkBox.setObjectName("displayFiducialMarkers_checkBox")
         self.verticalLayout_7.addWidget(self.displayFiducialMarkers_checkBox)
+        self.displayProfile_checkBox = QtGui.QCheckBox(self.displayOptions_groupBox)
+        self.displayProfile_checkBox.setObjectName("displayProfile_checkBox")
+        self.verticalLayout_7.addWidget(self.displayProfile_checkBox)
         self.verticalLayout_3.addWidget(self.displayOptions_groupBox)
         self.time_groupBox = QtGui.QGroupBox(self.scrollAreaWidgetContents_2)
         self.time_groupBox.setObjectName("time_groupBox")
@@ -191,6 +230,10 @@ class Ui_MeshGeneratorWidget(object):
         self.timeLoop_checkBox = QtGui.QCheckBox(self.time_groupBox)
         self.timeLoop_checkBox.setObjectName("timeLoop_checkBox")
         self.gridLayout_4.addWidget(self.timeLoop_checkBox, 1, 2, 1, 1)
+        self.playbackRate_label = QtGui.QLabel(self.time_groupBox)
+        self.playbackRate_label.setText("")
+        self.playbackRate_label.setObjectName("playbackRate_label")
+        self.gridLayout_4.addWidget(self.playbackRate_label, 2, 0, 1, 3)
         self.verticalLayout_3.addWidget(self.time_groupBox)
         self.video_groupBox = QtGui.QGroupBox(self.scrollAreaWidgetContents_2)
         self.video_groupBox.setObjectName("video_groupBox")
@@ -320,10 +363,14 @@ class Ui_MeshGeneratorWidget(object):
         self.displaySurfacesWireframe_checkBox.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Wireframe", None, QtGui.QApplication.UnicodeUTF8))
         self.displayElementNumbers_checkBox.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Element numbers", None, QtGui.QApplication.UnicodeUTF8))
         self.displayNodeNumbers_checkBox.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Node numbers", None, QtGui.QApplication.UnicodeUTF8))
+        self.labelMode_label.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Labels:", None, QtGui.QApplication.UnicodeUTF8))
+        self.labelStride_label.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Every:", None, QtGui.QApplication.UnicodeUTF8))
         self.displayNodeDerivatives_checkBox.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Node derivatives", None, QtGui.QApplication.UnicodeUTF8))
         self.displayXiAxes_checkBox.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Xi axes", None, QtGui.QApplication.UnicodeUTF8))
         self.displayImagePlane_checkBox.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Image plane", None, QtGui.QApplication.UnicodeUTF8))
+        self.imageResolution_label.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Image resolution:", None, QtGui.QApplication.UnicodeUTF8))
         self.displayFiducialMarkers_checkBox.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Fiducial markers", None, QtGui.QApplication.UnicodeUTF8))
+        self.displayProfile_checkBox.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Profiling overlay", None, QtGui.QApplication.UnicodeUTF8))
         self.time_groupBox.setTitle(QtGui.QApplication.translate("MeshGeneratorWidget", "Time:", None, QtGui.QApplication.UnicodeUTF8))
         self.timePlayStop_pushButton.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Play", None, QtGui.QApplication.UnicodeUTF8))
         self.timeValue_label.setText(QtGui.QApplication.translate("MeshGeneratorWidget", "Time value:", None, QtGui.QApplication.UnicodeUTF8))
@@ -0,0 +1,67 @@
+"""
+Stand-ins for packages the plugin depends on, so its pure Python modules can be imported and
+tested without PySide, the MAP Client or zinc installed.
+"""
+import importlib.abc
+import importlib.util
+import sys
+import types
+
+# packages imported when the plugin package is loaded
+GUI_PACKAGE_NAMES = ('PySide', 'mapclient')
+
+
+class _StubMeta(type):
+
+    def __getattr__(cls, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return stubClass(name)
+
+
+def stubClass(name):
+    """
+    :return: Class which can be subclassed, instantiated with any arguments, and whose class and
+    instance attributes are all further stub classes.
+    """
+    return _StubMeta(name, (object,), {
+        '__init__': lambda self, *args, **kwargs: None,
+        '__getattr__': lambda self, attr: stubClass(attr)
+    })
+
+
+class StubModule(types.ModuleType):
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return stubClass(name)
+
+
+class _StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """
+    Imports any module in the stubbed packages as a StubModule. Placed after the standard
+    finders, so installed packages are used in preference.
+    """
+
+    def __init__(self, packageNames):
+        self._packageNames = set(packageNames)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname.split('.')[0] not in self._packageNames:
+            return None
+        return importlib.util.spec_from_loader(fullname, self, is_package=True)
+
+    def create_module(self, spec):
+        return StubModule(spec.name)
+
+    def exec_module(self, module):
+        pass
+
+
+def installStubPackages(packageNames=GUI_PACKAGE_NAMES):
+    """
+    Stub any of packageNames, and all modules in them, which are not installed.
+    :param packageNames: Names of top level packages.
+    """
+    sys.meta_path.append(_StubFinder(packageNames))
@@ -0,0 +1,31 @@
+from mapclientplugins.meshgeneratorstep.benchmark import compareResults
+
+
+def _result(meshTypeName, elementScale, **seconds):
+    return {'meshTypeName': meshTypeName, 'elementScale': elementScale, 'seconds': seconds}
+
+
+def test_reports_stage_slower_than_tolerance():
+    baseline = [_result('3D Box 1', 1, generateMesh=1.0, writeModel=1.0)]
+    results = [_result('3D Box 1', 1, generateMesh=1.5, writeModel=1.1)]
+    assert compareResults(results, baseline, tolerance=0.2) == [('3D Box 1', 1, 'generateMesh', 1.0, 1.5)]
+
+
+def test_ignores_differences_below_minimum_seconds():
+    baseline = [_result('3D Box 1', 1, generateMesh=0.01)]
+    results = [_result('3D Box 1', 1, generateMesh=0.03)]
+    assert compareResults(results, baseline) == []
+
+
+def test_compares_matching_mesh_type_and_element_scale_only():
+    baseline = [_result('3D Box 1', 1, generateMesh=1.0)]
+    results = [_result('3D Box 1', 2, generateMesh=4.0), _result('2D Plate 1', 1, generateMesh=4.0)]
+    assert compareResults(results, baseline) == []
+
+
+def test_skips_failed_results_and_missing_stages():
+    baseline = [_result('3D Box 1', 1, generateMesh=1.0),
+                {'meshTypeName': '2D Plate 1', 'elementScale': 1, 'error': 'failed'}]
+    results = [{'meshTypeName': '3D Box 1', 'elementScale': 1, 'error': 'failed'},
+               _result('2D Plate 1', 1, generateMesh=4.0)]
+    assert compareResults(results, baseline) == []
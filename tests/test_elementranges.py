@@ -0,0 +1,32 @@
+from mapclientplugins.meshgeneratorstep.model.elementranges import mergeRanges, parseRangesText
+
+
+def test_merge_overlapping_adjacent_and_contained_ranges():
+    assert mergeRanges([[5, 8], [1, 3], [2, 4], [10, 12], [9, 9], [11, 11], [20, 21]]) == [[1, 12], [20, 21]]
+
+
+def test_merge_keeps_separate_ranges():
+    assert mergeRanges([[7, 9], [1, 2], [4, 5]]) == [[1, 2], [4, 5], [7, 9]]
+    assert mergeRanges([]) == []
+
+
+def test_merge_does_not_modify_ranges():
+    ranges = [[1, 3], [2, 5]]
+    assert mergeRanges(ranges) == [[1, 5]]
+    assert ranges == [[1, 3], [2, 5]]
+
+
+def test_parse_sorts_and_orders_reversed_ranges():
+    assert parseRangesText('10-12, 5 ,3-1') == ([[1, 3], [5, 5], [10, 12]], '1-3,5,10-12')
+    # overlapping ranges are kept as entered, merged only when deleting
+    assert parseRangesText('2-6,4-8') == ([[2, 6], [4, 8]], '2-6,4-8')
+
+
+def test_parse_empty_and_invalid_text():
+    assert parseRangesText('') == ([], '')
+    assert parseRangesText(' , ,') == ([], '')
+    assert parseRangesText('a,-3,x-4,7') == ([[7, 7]], '7')
+
+
+def test_parse_strips_trailing_non_digits():
+    assert parseRangesText('4s,6-9s') == ([[4, 4], [6, 9]], '4,6-9')
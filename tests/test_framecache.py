@@ -0,0 +1,56 @@
+import json
+import os
+
+from mapclientplugins.meshgeneratorstep.model.framecache import FrameCache, getFrameStackKey
+
+LAYOUT = {'sizeInPixels': [2, 2, 3], 'pixelFormat': 'RGB'}
+BUFFER = bytes(bytearray(range(36)))
+
+
+def test_frame_stack_key_changes_with_files_and_level():
+    entries = [['a.png', 1.0, 100], ['b.png', 1.0, 100]]
+    key = getFrameStackKey(entries)
+    assert key == getFrameStackKey([list(entry) for entry in entries])
+    assert key != getFrameStackKey([['a.png', 1.0, 100], ['b.png', 2.0, 100]])
+    assert key != getFrameStackKey(entries, 1)
+
+
+def test_write_read_round_trip(tmp_path):
+    directory = str(tmp_path / 'cache')
+    cache = FrameCache(directory)
+    assert cache.readBuffer('key') is None
+    cache.writeBuffer('key', LAYOUT, BUFFER)
+    # zero bytes are kept
+    assert cache.readBuffer('key') == (LAYOUT, BUFFER)
+    assert sorted(os.listdir(directory)) == ['key.json', 'key.raw']
+
+
+def test_mismatched_entry_not_read(tmp_path):
+    directory = str(tmp_path / 'cache')
+    cache = FrameCache(directory)
+    # truncated pixels
+    cache.writeBuffer('truncated', LAYOUT, BUFFER[:10])
+    assert cache.readBuffer('truncated') is None
+    # pixel format of earlier versions
+    cache.writeBuffer('old', dict(LAYOUT, pixelFormat=3), BUFFER)
+    assert cache.readBuffer('old') is None
+    with open(os.path.join(directory, 'invalid.json'), 'w') as f:
+        f.write('{not json')
+    with open(os.path.join(directory, 'invalid.raw'), 'wb') as f:
+        f.write(BUFFER)
+    assert cache.readBuffer('invalid') is None
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    directory = str(tmp_path / 'cache')
+    cache = FrameCache(directory, diskBudget=2*len(BUFFER))
+    cache.writeBuffer('a', LAYOUT, BUFFER)
+    cache.writeBuffer('b', LAYOUT, BUFFER)
+    os.utime(os.path.join(directory, 'a.raw'), (1.0, 1.0))
+    os.utime(os.path.join(directory, 'b.raw'), (2.0, 2.0))
+    # reading a makes b least recently used
+    assert cache.readBuffer('a') is not None
+    cache.writeBuffer('c', LAYOUT, BUFFER)
+    assert sorted(os.listdir(directory)) == ['a.json', 'a.raw', 'c.json', 'c.raw']
+    with open(os.path.join(directory, 'c.json'), 'r') as f:
+        assert json.loads(f.read()) == LAYOUT
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from mapclientplugins.meshgeneratorstep.model.framedecoder import FrameDecoder, decodeFrameFile, joinFrameBuffers
+
+
+def _fakeDecodeFrame(fileName, levels):
+    return [({'sizeInPixels': [1, 1, 1], 'pixelFormat': 'L'}, fileName.encode('ascii')) for level in levels]
+
+
+def test_join_frame_buffers_substitutes_black_for_failed_frames():
+    frameLayout = {'sizeInPixels': [2, 1, 1], 'pixelFormat': 'L'}
+    layout, buffer = joinFrameBuffers([None, (frameLayout, b'ab'), (frameLayout, b'cd')])
+    assert layout == {'sizeInPixels': [2, 1, 3], 'pixelFormat': 'L'}
+    assert buffer == b'\0\0abcd'
+    # frame layout is not modified
+    assert frameLayout['sizeInPixels'] == [2, 1, 1]
+
+
+def test_join_frame_buffers_none_decoded():
+    assert joinFrameBuffers([None, None]) == (None, None)
+    assert joinFrameBuffers([]) == (None, None)
+
+
+def test_decode_frames_in_order():
+    decoder = FrameDecoder(threads=3, decodeFrame=_fakeDecodeFrame)
+    fileNames = ['{0:02d}'.format(index) for index in range(20)]
+    decodedFrames = decoder.decodeFrames(fileNames, [0, 2])
+    decoder.close()
+    assert [[buffer for layout, buffer in decodedLevels] for decodedLevels in decodedFrames] == \
+        [[fileName.encode('ascii')]*2 for fileName in fileNames]
+
+
+def test_decode_frames_cancelled_between_batches():
+    decoded = []
+
+    def decodeFrame(fileName, levels):
+        decoded.append(fileName)
+        return _fakeDecodeFrame(fileName, levels)
+
+    decoder = FrameDecoder(threads=2, decodeFrame=decodeFrame)
+    assert decoder.decodeFrames(['a', 'b', 'c', 'd', 'e', 'f'], isCancelled=lambda: len(decoded) >= 4) is None
+    decoder.close()
+    assert len(decoded) == 4
+
+
+def test_close_abandons_decoding():
+    started = threading.Event()
+    release = threading.Event()
+
+    def decodeFrame(fileName, levels):
+        started.set()
+        release.wait(5.0)
+        return _fakeDecodeFrame(fileName, levels)
+
+    decoder = FrameDecoder(threads=1, decodeFrame=decodeFrame)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(decoder.decodeFrames(['a', 'b'])))
+    thread.start()
+    assert started.wait(5.0)
+    decoder.close()
+    thread.join(5.0)
+    release.set()
+    assert results == [None]
+    assert decoder.decodeFrames(['a']) is None
+
+
+def test_decode_frame_file_levels_rows_bottom_to_top(tmpdir):
+    Image = pytest.importorskip('PIL.Image')
+    fileName = str(tmpdir.join('frame.png'))
+    image = Image.new('RGB', (8, 4), (0, 0, 255))
+    image.paste((255, 0, 0), (0, 0, 8, 2))
+    image.save(fileName)
+    decodedLevels = decodeFrameFile(fileName, [0, 1])
+    (layout0, buffer0), (layout1, buffer1) = decodedLevels
+    assert layout0 == {'sizeInPixels': [8, 4, 1], 'pixelFormat': 'RGB'}
+    assert layout1 == {'sizeInPixels': [4, 2, 1], 'pixelFormat': 'RGB'}
+    # top row of the file is last
+    assert buffer0[:3] == b'\0\0\xff'
+    assert buffer0[-3:] == b'\xff\0\0'
+    assert len(buffer1) == 4*2*3
+
+
+def test_decode_frame_file_failure(tmpdir):
+    pytest.importorskip('PIL.Image')
+    fileName = str(tmpdir.join('frame.png'))
+    tmpdir.join('frame.png').write('not an image')
+    assert decodeFrameFile(fileName) is None
@@ -0,0 +1,36 @@
+import pytest
+
+from mapclientplugins.meshgeneratorstep.model.frametimeline import FrameTimeline
+
+
+def test_frame_index_clamped_to_frames():
+    timeline = FrameTimeline(10, 5)
+    assert timeline.getDuration() == pytest.approx(2.0)
+    assert timeline.getFrameIndexForTime(-1.0) == 0
+    assert timeline.getFrameIndexForTime(0.0) == 0
+    assert timeline.getFrameIndexForTime(0.39) == 1
+    assert timeline.getFrameIndexForTime(1.99) == 9
+    assert timeline.getFrameIndexForTime(2.0) == 9
+    assert timeline.getFrameIndexForTime(100.0) == 9
+
+
+def test_time_for_frame_index_is_middle_of_frame():
+    timeline = FrameTimeline(10, 5)
+    for index in range(10):
+        time = timeline.getTimeForFrameIndex(index)
+        assert time == pytest.approx((index + 0.5)/5.0)
+        assert timeline.getFrameIndexForTime(time) == index
+
+
+def test_normalised_time():
+    timeline = FrameTimeline(10, 5)
+    assert timeline.getNormalisedTime(0.0) == 0.0
+    assert timeline.getNormalisedTime(1.0) == pytest.approx(0.5)
+    assert timeline.getNormalisedTime(2.0) == pytest.approx(1.0)
+
+
+def test_no_frames():
+    timeline = FrameTimeline(0, 25)
+    assert timeline.getDuration() == 0.0
+    assert timeline.getFrameIndexForTime(1.0) == 0
+    assert timeline.getNormalisedTime(1.0) == 0.0
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+import pytest
+
+from test_startup import REPOSITORY_DIR
+
+COMMAND_MODULE_NAMES = ('batch', 'sweep', 'benchmark')
+
+
+@pytest.mark.parametrize('commandModuleName', COMMAND_MODULE_NAMES)
+def test_command_help_runs_without_stubs(commandModuleName):
+    """
+    Command line tools must run without the MAP Client or PySide, so no stubs are installed.
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'mapclientplugins.meshgeneratorstep.' + commandModuleName, '--help'],
+        cwd=REPOSITORY_DIR, stderr=subprocess.STDOUT)
+    assert output.decode('utf-8').startswith('usage:')
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('opencmiss.zinc')
+
+from opencmiss.zinc.context import Context
+
+from mapclientplugins.meshgeneratorstep.model.framedecoder import FrameDecoder
+from mapclientplugins.meshgeneratorstep.model.imageframestream import ImageFrameStream
+
+
+class CountingDecoder(object):
+    """
+    Decodes frame named by its index to 2x2 luminance pixels of that index, counting decodes.
+    """
+
+    def __init__(self):
+        self.decodeCounts = {}
+        self._lock = threading.Lock()
+
+    def decodeFrame(self, fileName, levels):
+        with self._lock:
+            self.decodeCounts[fileName] = self.decodeCounts.get(fileName, 0) + 1
+        return [({'sizeInPixels': [2 >> level, 2 >> level, 1], 'pixelFormat': 'L'},
+                 bytearray([int(fileName)])*(4 >> (2*level))) for level in levels]
+
+    def waitForDecoded(self, fileNames, count=1, timeout=5.0):
+        endTime = time.time() + timeout
+        while time.time() < endTime:
+            with self._lock:
+                if all(self.decodeCounts.get(fileName, 0) >= count for fileName in fileNames):
+                    return True
+            time.sleep(0.01)
+        return False
+
+
+@pytest.fixture
+def fieldmodule():
+    context = Context('test')
+    yield context.getDefaultRegion().getFieldmodule()
+
+
+def _createStream(frameCount, windowSize, level=0):
+    decoder = CountingDecoder()
+    frameDecoder = FrameDecoder(threads=2, decodeFrame=decoder.decodeFrame)
+    fileNames = [str(index) for index in range(frameCount)]
+    return ImageFrameStream(fileNames, windowSize=windowSize, level=level, frameDecoder=frameDecoder), decoder, \
+        frameDecoder
+
+
+def test_playback_advances_by_window_less_overlap_decoding_each_frame_once(fieldmodule):
+    stream, decoder, frameDecoder = _createStream(40, 8)
+    windowStarts = []
+    for frameIndex in range(40):
+        if stream.needsUpdate(frameIndex):
+            if frameIndex > 0:
+                # next window is prefetched
+                assert decoder.waitForDecoded([str(index) for index in range(frameIndex, min(frameIndex + 8, 40))])
+            imageField = stream.update(fieldmodule, frameIndex)
+            assert imageField is not None
+            assert imageField.getSizeInPixels(3)[1] == [2, 2, 8]
+            windowStarts.append(stream.getWindowStart())
+        else:
+            assert stream.update(fieldmodule, frameIndex) is None
+    # only the first window is decoded again, prefetched for looped playback
+    assert decoder.waitForDecoded([str(index) for index in range(8)], count=2)
+    stream.close()
+    frameDecoder.close()
+    assert windowStarts == [0, 6, 12, 18, 24, 30, 32]
+    assert [decoder.decodeCounts[str(index)] for index in range(40)] == [2]*8 + [1]*32
+
+
+def test_seek_keeps_overlap_before_frame(fieldmodule):
+    stream, decoder, frameDecoder = _createStream(100, 16)
+    assert stream.update(fieldmodule, 50) is not None
+    assert stream.getWindowStart() == 46
+    assert not stream.needsUpdate(46)
+    assert not stream.needsUpdate(57)
+    assert stream.needsUpdate(58)
+    assert stream.needsUpdate(45)
+    assert stream.update(fieldmodule, 99) is not None
+    assert stream.getWindowStart() == 84
+    stream.close()
+    frameDecoder.close()
+
+
+def test_loop_prefetches_start_of_stack(fieldmodule):
+    stream, decoder, frameDecoder = _createStream(20, 8)
+    assert stream.update(fieldmodule, 19) is not None
+    assert stream.getWindowStart() == 12
+    assert decoder.waitForDecoded([str(index) for index in range(8)])
+    assert stream.update(fieldmodule, 0) is not None
+    assert stream.getWindowStart() == 0
+    stream.close()
+    frameDecoder.close()
+    assert set(decoder.decodeCounts.values()) == {1}
+
+
+def test_decode_at_level(fieldmodule):
+    stream, decoder, frameDecoder = _createStream(10, 4, level=1)
+    imageField = stream.update(fieldmodule, 0)
+    stream.close()
+    frameDecoder.close()
+    assert imageField.getSizeInPixels(3)[1] == [1, 1, 4]
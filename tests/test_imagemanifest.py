@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+from mapclientplugins.meshgeneratorstep.model import imagemanifest
+from mapclientplugins.meshgeneratorstep.model.imagemanifest import ImageManifest
+
+
+@pytest.fixture
+def probedFileNames(monkeypatch):
+    """
+    Replace probing image files, which needs get_image_size, with a fake recording the files probed.
+    Files ending .png are images of width their size in bytes.
+    """
+    fileNames = []
+
+    def probeImageFile(fileName):
+        fileNames.append(os.path.basename(fileName))
+        if fileName.endswith('.png'):
+            return {'type': 'png', 'width': os.path.getsize(fileName), 'height': 10}
+        return {'type': None, 'width': -1, 'height': -1}
+
+    monkeypatch.setattr(imagemanifest, 'probeImageFile', probeImageFile)
+    return fileNames
+
+
+def _writeFile(directory, name, content):
+    fileName = str(directory / name)
+    with open(fileName, 'w') as f:
+        f.write(content)
+    return fileName
+
+
+def _getBaseNames(fileNames):
+    return sorted(os.path.basename(fileName) for fileName in fileNames)
+
+
+def test_scan_probes_only_changed_files(tmp_path, probedFileNames):
+    images = tmp_path / 'images'
+    images.mkdir()
+    _writeFile(images, 'a.png', 'a')
+    changedFileName = _writeFile(images, 'b.png', 'b')
+    _writeFile(images, 'notes.txt', 'not an image')
+    manifest = ImageManifest(str(tmp_path / 'manifest.json'))
+    assert _getBaseNames(manifest.scan(str(images))) == ['a.png', 'b.png']
+    assert sorted(probedFileNames) == ['a.png', 'b.png', 'notes.txt']
+    del probedFileNames[:]
+    assert _getBaseNames(manifest.scan(str(images))) == ['a.png', 'b.png']
+    assert probedFileNames == []
+    _writeFile(images, 'b.png', 'bigger')
+    assert _getBaseNames(manifest.scan(str(images))) == ['a.png', 'b.png']
+    assert probedFileNames == ['b.png']
+    assert manifest.getImageSize(changedFileName) == (6, 10)
+
+
+def test_scan_removes_stale_entries(tmp_path, probedFileNames):
+    images = tmp_path / 'images'
+    images.mkdir()
+    _writeFile(images, 'a.png', 'a')
+    removedFileName = _writeFile(images, 'b.png', 'b')
+    manifestFileName = str(tmp_path / 'manifest.json')
+    manifest = ImageManifest(manifestFileName)
+    manifest.scan(str(images))
+    os.remove(removedFileName)
+    assert _getBaseNames(manifest.scan(str(images))) == ['a.png']
+    with pytest.raises(KeyError):
+        manifest.getImageType(removedFileName)
+    with open(manifestFileName, 'r') as f:
+        assert _getBaseNames(json.loads(f.read())['entries'].keys()) == ['a.png']
+
+
+def test_saved_manifest_reused(tmp_path, probedFileNames):
+    images = tmp_path / 'images'
+    images.mkdir()
+    fileName = _writeFile(images, 'a.png', 'abc')
+    manifestFileName = str(tmp_path / 'manifest.json')
+    ImageManifest(manifestFileName).scan(str(images))
+    del probedFileNames[:]
+    manifest = ImageManifest(manifestFileName)
+    assert _getBaseNames(manifest.scan(str(images))) == ['a.png']
+    assert probedFileNames == []
+    assert manifest.getImageType(fileName) == 'png'
+    assert manifest.getImageSize(fileName) == (3, 10)
+    assert [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')] == []
+
+
+def test_invalid_manifest_ignored(tmp_path, probedFileNames):
+    images = tmp_path / 'images'
+    images.mkdir()
+    _writeFile(images, 'a.png', 'a')
+    manifestFileName = _writeFile(tmp_path, 'manifest.json', '{not json')
+    manifest = ImageManifest(manifestFileName)
+    assert _getBaseNames(manifest.scan(str(images))) == ['a.png']
+    assert probedFileNames == ['a.png']
+    with open(manifestFileName, 'r') as f:
+        assert json.loads(f.read())['location'] == str(images)
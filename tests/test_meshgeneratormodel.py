@@ -0,0 +1,156 @@
+import pytest
+
+pytest.importorskip('opencmiss.zinc')
+pytest.importorskip('opencmiss.utils.maths')
+
+from opencmiss.zinc.context import Context
+from opencmiss.zinc.element import Element, Elementbasis
+from opencmiss.zinc.field import Field
+
+from mapclientplugins.meshgeneratorstep.model import meshtyperegistry
+from mapclientplugins.meshgeneratorstep.model.meshgeneratormodel import GRAPHICS_NAMES, MeshGeneratorModel
+from mapclientplugins.meshgeneratorstep.model.meshtyperegistry import MeshTypeRegistry
+
+
+class FakeMeshType(object):
+    """
+    Mesh type generating one linear element of dimension 1 or 2, with optional fibres field.
+    """
+
+    def __init__(self, name, dimension, coordinatesComponents=3):
+        self._name = name
+        self._dimension = dimension
+        self._coordinatesComponents = coordinatesComponents
+
+    def getName(self):
+        return self._name
+
+    def getDefaultOptions(self):
+        return {'Fibres': True}
+
+    def getOrderedOptionNames(self):
+        return ['Fibres']
+
+    def checkOptions(self, options):
+        pass
+
+    def generateMesh(self, region, options):
+        fm = region.getFieldmodule()
+        fieldNames = ['coordinates'] + (['fibres'] if options['Fibres'] else [])
+        fields = []
+        for fieldName in fieldNames:
+            field = fm.createFieldFiniteElement(self._coordinatesComponents if (fieldName == 'coordinates') else 1)
+            field.setName(fieldName)
+            field.setManaged(True)
+            if fieldName == 'coordinates':
+                field.setTypeCoordinate(True)
+            fields.append(field)
+        nodes = fm.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        nodetemplate = nodes.createNodetemplate()
+        for field in fields:
+            nodetemplate.defineField(field)
+        fieldcache = fm.createFieldcache()
+        nodeCount = 2**self._dimension
+        for nodeIdentifier in range(1, nodeCount + 1):
+            node = nodes.createNode(nodeIdentifier, nodetemplate)
+            fieldcache.setNode(node)
+            x = [float((nodeIdentifier - 1) % 2), float((nodeIdentifier - 1)//2), 0.0]
+            fields[0].assignReal(fieldcache, x[:self._coordinatesComponents])
+            for field in fields[1:]:
+                field.assignReal(fieldcache, 0.5)
+        mesh = fm.findMeshByDimension(self._dimension)
+        elementtemplate = mesh.createElementtemplate()
+        elementtemplate.setElementShapeType(Element.SHAPE_TYPE_LINE if (self._dimension == 1) else
+                                            Element.SHAPE_TYPE_SQUARE)
+        eft = mesh.createElementfieldtemplate(
+            fm.createElementbasis(self._dimension, Elementbasis.FUNCTION_TYPE_LINEAR_LAGRANGE))
+        for field in fields:
+            elementtemplate.defineField(field, -1, eft)
+        element = mesh.createElement(1, elementtemplate)
+        element.setNodesByIdentifier(eft, list(range(1, nodeCount + 1)))
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(meshtyperegistry, '_meshTypeRegistry', MeshTypeRegistry([
+        FakeMeshType('square', 2), FakeMeshType('line', 1), FakeMeshType('flat line', 1, coordinatesComponents=2)]))
+    context = Context('test')
+    context.getGlyphmodule().defineStandardGlyphs()
+    materialmodule = context.getMaterialmodule()
+    materialmodule.defineStandardMaterials()
+    parentRegion = context.getDefaultRegion()
+    model = MeshGeneratorModel(parentRegion, materialmodule)
+    model.setSettings({'meshTypeName': model.getSettings()['meshTypeName']})
+    yield model, parentRegion
+
+
+def _getRegion(parentRegion):
+    region = parentRegion.findChildByName('generated_mesh')
+    assert region.isValid()
+    return region
+
+
+def _getManagedFieldNames(region):
+    fieldNames = []
+    fielditerator = region.getFieldmodule().createFielditerator()
+    field = fielditerator.next()
+    while field.isValid():
+        if field.isManaged():
+            fieldNames.append(field.getName())
+        field = fielditerator.next()
+    return sorted(fieldNames)
+
+
+def _checkGraphics(model, region):
+    """
+    Check mesh graphics are those displayed, using the region's current coordinates field.
+    """
+    coordinates = region.getFieldmodule().findFieldByName('coordinates')
+    scene = region.getScene()
+    graphicsNames = []
+    graphics = scene.getFirstGraphics()
+    while graphics.isValid():
+        if graphics.getName() in GRAPHICS_NAMES:
+            graphicsNames.append(graphics.getName())
+            if graphics.getName() != 'displayAxes':
+                assert graphics.getCoordinateField() == coordinates
+        graphics = scene.getNextGraphics(graphics)
+    settings = model.getSettings()
+    assert graphicsNames == [graphicsName for graphicsName in GRAPHICS_NAMES if settings[graphicsName]]
+
+
+def test_regenerate_different_mesh_type_replaces_fields(model):
+    model, parentRegion = model
+    region = _getRegion(parentRegion)
+    assert model.getMeshDimension() == 2
+    assert _getManagedFieldNames(region) == ['cmiss_number', 'coordinates', 'fibres', 'xi']
+    _checkGraphics(model, region)
+    # held so it survives unmanaged, as if referenced by other graphics
+    fibres = region.getFieldmodule().findFieldByName('fibres')
+    model.setMeshTypeOption('Fibres', False)
+    assert _getManagedFieldNames(region) == ['cmiss_number', 'coordinates', 'xi']
+    assert fibres.isValid() and not fibres.isManaged()
+    _checkGraphics(model, region)
+    model.setMeshTypeByName('line')
+    assert _getRegion(parentRegion) == region
+    assert model.getMeshDimension() == 1
+    assert model.getElementCount() == 1
+    assert _getManagedFieldNames(region) == ['cmiss_number', 'coordinates', 'fibres', 'xi']
+    # field read again is managed again
+    assert fibres.isManaged()
+    _checkGraphics(model, region)
+
+
+def test_regenerate_incompatible_fields_recreates_region(model):
+    model, parentRegion = model
+    region = _getRegion(parentRegion)
+    model.setMeshTypeByName('flat line')
+    newRegion = _getRegion(parentRegion)
+    assert newRegion != region
+    assert not region.getParent().isValid()
+    assert model.getMeshDimension() == 1
+    assert model.getNodeCount() == 2
+    assert region.getFieldmodule().findFieldByName('coordinates').getNumberOfComponents() == 3
+    assert newRegion.getFieldmodule().findFieldByName('coordinates').getNumberOfComponents() == 2
+    assert _getManagedFieldNames(newRegion) == ['cmiss_number', 'coordinates', 'fibres', 'xi']
+    _checkGraphics(model, newRegion)
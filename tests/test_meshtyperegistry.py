@@ -0,0 +1,65 @@
+from mapclientplugins.meshgeneratorstep.model.meshtyperegistry import MeshTypeRegistry
+
+
+def createMeshType(name):
+    """
+    :return: Fake scaffoldmaker mesh type class counting calls for default options.
+    """
+
+    class FakeMeshType(object):
+
+        defaultOptionsCallCount = 0
+
+        @staticmethod
+        def getName():
+            return name
+
+        @classmethod
+        def getDefaultOptions(cls):
+            cls.defaultOptionsCallCount += 1
+            return {'Number of elements 1': 1, 'Refine': False, 'Scale': [1.0, 1.0, 1.0]}
+
+        @staticmethod
+        def getOrderedOptionNames():
+            return ['Number of elements 1', 'Refine', 'Scale']
+
+    return FakeMeshType
+
+
+def test_names_in_registration_order_and_first_is_default():
+    box = createMeshType('3D Box 1')
+    plate = createMeshType('2D Plate 1')
+    registry = MeshTypeRegistry([box, plate])
+    assert registry.getNames() == ['3D Box 1', '2D Plate 1']
+    assert registry.getDefaultMeshType() is box
+    assert registry.getMeshTypeByName('2D Plate 1') is plate
+    assert registry.getMeshTypeByName('missing') is None
+
+
+def test_default_options_are_memoized_deep_copies():
+    box = createMeshType('3D Box 1')
+    registry = MeshTypeRegistry([box])
+    options = registry.getDefaultOptions(box)
+    options['Refine'] = True
+    options['Scale'][0] = 2.0
+    assert registry.getDefaultOptions(box) == {'Number of elements 1': 1, 'Refine': False, 'Scale': [1.0, 1.0, 1.0]}
+    assert box.defaultOptionsCallCount == 1
+
+
+def test_ordered_option_names_are_copies():
+    box = createMeshType('3D Box 1')
+    registry = MeshTypeRegistry([box])
+    registry.getOrderedOptionNames(box).append('extra')
+    assert registry.getOrderedOptionNames(box) == ['Number of elements 1', 'Refine', 'Scale']
+
+
+def test_register_replaces_mesh_type_and_its_options():
+    box = createMeshType('3D Box 1')
+    registry = MeshTypeRegistry([box])
+    registry.getDefaultOptions(box)
+    replacement = createMeshType('3D Box 1')
+    registry.register(replacement)
+    assert registry.getNames() == ['3D Box 1']
+    assert registry.getMeshTypeByName('3D Box 1') is replacement
+    registry.getDefaultOptions(replacement)
+    assert replacement.defaultOptionsCallCount == 1
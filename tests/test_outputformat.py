@@ -0,0 +1,73 @@
+import gzip
+import os
+import stat
+
+import pytest
+
+from mapclientplugins.meshgeneratorstep.model import outputformat
+from mapclientplugins.meshgeneratorstep.model.outputformat import OUTPUT_FORMAT_EX2, OUTPUT_FORMAT_EX2_GZIP, \
+    writeBufferToFile
+
+BUFFER = b'EX Version: 2\nRegion: /\n' + b'0123456789'*100
+
+
+def test_write_ex2(tmp_path):
+    fileName = str(tmp_path / 'model.ex2')
+    writeBufferToFile(BUFFER, fileName, OUTPUT_FORMAT_EX2)
+    with open(fileName, 'rb') as f:
+        assert f.read() == BUFFER
+
+
+def test_write_gzip_round_trip(tmp_path, monkeypatch):
+    # compress in several chunks
+    monkeypatch.setattr(outputformat, 'COMPRESS_CHUNK_SIZE', 100)
+    fileName = str(tmp_path / 'model.ex2.gz')
+    writeBufferToFile(BUFFER, fileName, OUTPUT_FORMAT_EX2_GZIP)
+    with gzip.open(fileName, 'rb') as f:
+        assert f.read() == BUFFER
+
+
+def _getTemporaryFileNames(directory):
+    return [path.name for path in directory.iterdir() if path.name.endswith('.tmp')]
+
+
+def test_write_replaces_existing_file(tmp_path):
+    fileName = str(tmp_path / 'model.ex2')
+    writeBufferToFile(b'old', fileName)
+    writeBufferToFile(BUFFER, fileName)
+    with open(fileName, 'rb') as f:
+        assert f.read() == BUFFER
+    assert _getTemporaryFileNames(tmp_path) == []
+
+
+def test_failed_write_keeps_existing_file(tmp_path):
+    fileName = str(tmp_path / 'model.ex2')
+    writeBufferToFile(b'old', fileName)
+    # text cannot be written to a binary file
+    with pytest.raises(TypeError):
+        writeBufferToFile(u'new', fileName)
+    with open(fileName, 'rb') as f:
+        assert f.read() == b'old'
+    assert _getTemporaryFileNames(tmp_path) == []
+
+
+def _getMode(fileName):
+    return stat.S_IMODE(os.stat(fileName).st_mode)
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='permissions are not POSIX modes')
+def test_new_file_gets_default_permissions(tmp_path):
+    fileName = str(tmp_path / 'model.ex2')
+    writeBufferToFile(BUFFER, fileName)
+    umask = os.umask(0)
+    os.umask(umask)
+    assert _getMode(fileName) == 0o666 & ~umask
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='permissions are not POSIX modes')
+def test_replaced_file_keeps_permissions(tmp_path):
+    fileName = str(tmp_path / 'model.ex2')
+    writeBufferToFile(b'old', fileName)
+    os.chmod(fileName, 0o664)
+    writeBufferToFile(BUFFER, fileName)
+    assert _getMode(fileName) == 0o664
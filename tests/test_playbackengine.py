@@ -0,0 +1,80 @@
+import pytest
+
+from mapclientplugins.meshgeneratorstep.model.playbackengine import PlaybackEngine
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.time = 100.0
+
+    def __call__(self):
+        return self.time
+
+
+def _createEngine(framesPerSecond=10):
+    clock = FakeClock()
+    engine = PlaybackEngine(clock)
+    engine.setTargetFramesPerSecond(framesPerSecond)
+    return engine, clock
+
+
+def test_time_follows_clock_from_start_time():
+    engine, clock = _createEngine()
+    engine.start(2.0)
+    clock.time += 0.5
+    assert engine.beginTick() == pytest.approx(2.5)
+
+
+def test_seek_continues_from_new_time():
+    engine, clock = _createEngine()
+    engine.start(0.0)
+    clock.time += 1.0
+    engine.seek(0.25)
+    clock.time += 0.5
+    assert engine.getTime() == pytest.approx(0.75)
+
+
+def test_counts_frames_skipped_by_late_ticks():
+    # frame period and tick times exactly representable
+    engine, clock = _createEngine(framesPerSecond=8)
+    engine.start(0.0)
+    engine.beginTick()
+    clock.time += 0.125
+    engine.beginTick()
+    assert engine.getDroppedFrameCount() == 0
+    # next tick is 3 frames late
+    clock.time += 0.5
+    engine.beginTick()
+    assert engine.getDroppedFrameCount() == 3
+
+
+def test_achieved_frames_per_second():
+    engine, clock = _createEngine()
+    engine.start(0.0)
+    for tick in range(5):
+        engine.beginTick()
+        clock.time += 0.2
+    assert engine.getAchievedFramesPerSecond() == pytest.approx(5.0)
+
+
+def test_adaptive_timer_interval_follows_tick_cost():
+    engine, clock = _createEngine(framesPerSecond=25)
+    engine.start(0.0)
+    assert engine.getTimerInterval() == 40
+    for tick in range(50):
+        engine.beginTick()
+        clock.time += 0.1
+        engine.endTick()
+    assert engine.getTimerInterval() == 100
+    engine.setAdaptive(False)
+    assert engine.getTimerInterval() == 40
+
+
+def test_tick_not_ended_costs_time_to_next_tick():
+    engine, clock = _createEngine(framesPerSecond=25)
+    engine.start(0.0)
+    for tick in range(50):
+        engine.beginTick()
+        clock.time += 0.1
+    assert engine.getTimerInterval() == 100
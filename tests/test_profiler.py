@@ -0,0 +1,58 @@
+import csv
+import json
+
+from mapclientplugins.meshgeneratorstep.model.profiler import Profiler, RECORD_FIELD_NAMES
+
+
+def _createProfiler():
+    profiler = Profiler(True)
+    with profiler.stage('generateMesh', lambda: {'nodeCount': 8, 'elementCount': 1}):
+        pass
+    with profiler.stage('createGraphics'):
+        pass
+    return profiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(False)
+    with profiler.stage('generateMesh'):
+        pass
+    assert profiler.getRecords() == []
+
+
+def test_records_stages_with_counts():
+    records = _createProfiler().getRecords()
+    assert [record['stage'] for record in records] == ['generateMesh', 'createGraphics']
+    assert records[0]['nodeCount'] == 8
+    assert records[0]['elementCount'] == 1
+    assert all(record['seconds'] >= 0.0 for record in records)
+
+
+def test_record_callback():
+    profiler = Profiler(True)
+    stages = []
+    profiler.registerRecordCallback(lambda record: stages.append(record['stage']))
+    with profiler.stage('done'):
+        pass
+    assert stages == ['done']
+
+
+def test_write_json(tmp_path):
+    profiler = _createProfiler()
+    fileName = str(tmp_path / 'profile.json')
+    profiler.writeJson(fileName)
+    with open(fileName, 'r') as f:
+        assert json.loads(f.read()) == profiler.getRecords()
+
+
+def test_write_csv(tmp_path):
+    profiler = _createProfiler()
+    fileName = str(tmp_path / 'profile.csv')
+    profiler.writeCsv(fileName)
+    with open(fileName, 'r') as f:
+        reader = csv.DictReader(f)
+        assert tuple(reader.fieldnames) == RECORD_FIELD_NAMES
+        rows = list(reader)
+    assert [row['stage'] for row in rows] == ['generateMesh', 'createGraphics']
+    assert rows[0]['nodeCount'] == '8'
+    assert rows[1]['nodeCount'] == ''
@@ -0,0 +1,88 @@
+import os
+
+from mapclientplugins.meshgeneratorstep.model.scaffoldcache import ScaffoldCache, ScaffoldFileCache, getScaffoldKey
+
+
+def test_scaffold_key_independent_of_option_order():
+    options1 = {'Number of elements 1': 2, 'Refine': False}
+    options2 = {'Refine': False, 'Number of elements 1': 2}
+    assert getScaffoldKey('3D Box 1', options1) == getScaffoldKey('3D Box 1', options2)
+
+
+def test_scaffold_key_differs_by_mesh_type_and_options():
+    options = {'Number of elements 1': 2}
+    key = getScaffoldKey('3D Box 1', options)
+    assert key != getScaffoldKey('2D Plate 1', options)
+    assert key != getScaffoldKey('3D Box 1', {'Number of elements 1': 3})
+
+
+def test_evicts_least_recently_used_over_budget():
+    cache = ScaffoldCache(memoryBudget=10)
+    cache.put('a', 'aaaa')
+    cache.put('b', 'bbbb')
+    # using a makes b least recently used
+    assert cache.get('a') == 'aaaa'
+    cache.put('c', 'cccc')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'aaaa'
+    assert cache.get('c') == 'cccc'
+    assert cache.getMemoryUsed() == 8
+
+
+def test_replacing_entry_updates_memory_used():
+    cache = ScaffoldCache(memoryBudget=10)
+    cache.put('a', 'aaaa')
+    cache.put('a', 'aa')
+    assert cache.getMemoryUsed() == 2
+    assert cache.get('a') == 'aa'
+
+
+def test_buffer_larger_than_budget_not_cached():
+    cache = ScaffoldCache(memoryBudget=3)
+    cache.put('a', 'aaaa')
+    assert cache.get('a') is None
+    assert cache.getMemoryUsed() == 0
+
+
+def test_reducing_budget_evicts():
+    cache = ScaffoldCache(memoryBudget=10)
+    cache.put('a', 'aaaa')
+    cache.put('b', 'bbbb')
+    cache.setMemoryBudget(5)
+    assert cache.get('a') is None
+    assert cache.get('b') == 'bbbb'
+
+
+def _writeFile(fileName, text):
+    with open(fileName, 'w') as f:
+        f.write(text)
+
+
+def test_file_cache_put_and_get(tmp_path):
+    cache = ScaffoldFileCache(str(tmp_path / 'cache'))
+    sourceFileName = str(tmp_path / 'model.ex2')
+    _writeFile(sourceFileName, 'model')
+    cache.put('key', sourceFileName)
+    cachedFileName = cache.getFileName('key')
+    with open(cachedFileName, 'r') as f:
+        assert f.read() == 'model'
+    assert cache.getFileName('other') is None
+
+
+def test_file_cache_evicts_least_recently_used(tmp_path):
+    cache = ScaffoldFileCache(str(tmp_path / 'cache'), diskBudget=10)
+    for key in ('a', 'b'):
+        _writeFile(str(tmp_path / (key + '.ex2')), key*6)
+    cache.put('a', str(tmp_path / 'a.ex2'))
+    os.utime(cache.getFileName('a'), (1000, 1000))
+    cache.put('b', str(tmp_path / 'b.ex2'))
+    assert cache.getFileName('a') is None
+    assert cache.getFileName('b') is not None
+
+
+def test_file_cache_failed_put_leaves_no_temporary_file(tmp_path):
+    cacheDirectory = tmp_path / 'cache'
+    cache = ScaffoldFileCache(str(cacheDirectory))
+    cache.put('key', str(tmp_path / 'missing.ex2'))
+    assert cache.getFileName('key') is None
+    assert [name for name in os.listdir(str(cacheDirectory)) if name.endswith('.tmp')] == []
@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIR = os.path.dirname(TESTS_DIR)
+# seconds allowed to import the plugin step, excluding interpreter startup
+IMPORT_TIME_BUDGET = 1.0
+HEAVY_MODULE_NAMES = ('opencmiss.zinc', 'scaffoldmaker')
+# stubbed if not installed, so importing them by mistake is detected rather than failing
+STUB_PACKAGE_NAMES = ('PySide', 'mapclient', 'opencmiss', 'scaffoldmaker')
+
+IMPORT_SCRIPT = '''
+import json
+import sys
+import time
+sys.path[:0] = {paths!r}
+import stubs
+stubs.installStubPackages({stubPackageNames!r})
+clock = getattr(time, 'perf_counter', time.time)
+startTime = clock()
+import mapclientplugins.meshgeneratorstep.step
+seconds = clock() - startTime
+print(json.dumps({{
+    'seconds': seconds,
+    'importedHeavyModules': [name for name in {heavyModuleNames!r}
+                             if any((module == name) or module.startswith(name + '.') for module in sys.modules)]
+}}))
+'''
+
+
+def _importStepInSubprocess():
+    """
+    Import the step module in a fresh interpreter, so modules imported by other tests do not count.
+    :return: Dict with import seconds and names of heavy modules imported.
+    """
+    script = IMPORT_SCRIPT.format(paths=[REPOSITORY_DIR, TESTS_DIR], stubPackageNames=STUB_PACKAGE_NAMES,
+                                  heavyModuleNames=HEAVY_MODULE_NAMES)
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=REPOSITORY_DIR)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def test_step_import_does_not_load_zinc_or_scaffoldmaker():
+    result = _importStepInSubprocess()
+    assert result['importedHeavyModules'] == []
+
+
+def test_step_import_time_within_budget():
+    result = _importStepInSubprocess()
+    assert result['seconds'] < IMPORT_TIME_BUDGET
@@ -0,0 +1,145 @@
+import json
+import os
+
+import pytest
+
+from mapclientplugins.meshgeneratorstep import sweep
+from mapclientplugins.meshgeneratorstep.model import meshtyperegistry
+from mapclientplugins.meshgeneratorstep.model.meshtyperegistry import MeshTypeRegistry
+from mapclientplugins.meshgeneratorstep.sweep import MANIFEST_FILE_NAME, expandOptionGrid, prepareSweep, runSweep
+
+
+class FakeMeshType(object):
+    """
+    Mesh type with options validated as scaffoldmaker mesh types do, generating nothing.
+    """
+
+    @staticmethod
+    def getName():
+        return 'Fake Box 1'
+
+    @staticmethod
+    def getDefaultOptions():
+        return {'Number of elements': 2, 'Refine': False, 'Refine number of elements': 1}
+
+    @staticmethod
+    def getOrderedOptionNames():
+        return ['Number of elements', 'Refine', 'Refine number of elements']
+
+    @staticmethod
+    def checkOptions(options):
+        if options['Number of elements'] < 1:
+            options['Number of elements'] = 1
+        if not options['Refine']:
+            options['Refine number of elements'] = 1
+
+
+@pytest.fixture
+def fakeMeshTypes(monkeypatch):
+    pytest.importorskip('opencmiss.zinc')
+    pytest.importorskip('opencmiss.utils.maths')
+    monkeypatch.setattr(meshtyperegistry, '_meshTypeRegistry', MeshTypeRegistry([FakeMeshType()]))
+
+
+def test_expand_option_grid_cartesian_product():
+    optionSets = expandOptionGrid({'b': [1, 2, 3], 'a': [True, False]})
+    assert len(optionSets) == 6
+    assert optionSets[:3] == [{'a': True, 'b': 1}, {'a': True, 'b': 2}, {'a': True, 'b': 3}]
+    assert {(optionSet['a'], optionSet['b']) for optionSet in optionSets} == \
+        {(a, b) for a in (True, False) for b in (1, 2, 3)}
+
+
+def test_expand_empty_option_grid():
+    # no options gives the single default option set
+    assert expandOptionGrid({}) == [{}]
+    # an option with no values gives none
+    assert expandOptionGrid({'a': [1, 2], 'b': []}) == []
+
+
+def test_prepare_sweep_removes_equivalent_configurations(fakeMeshTypes):
+    baseSettings = {'scale': '2*2*2', 'meshTypeName': 'other'}
+    preparedSweep = prepareSweep('Fake Box 1', [
+        {'Number of elements': 3},
+        {'Number of elements': 3, 'Refine number of elements': 4},
+        {'Number of elements': '0'},
+        {'Number of elements': 1},
+        {'Refine': True, 'Refine number of elements': 4}
+    ], baseSettings)
+    assert [requestedOptions for requestedOptions, generatorSettings in preparedSweep] == [
+        {'Number of elements': 3},
+        {'Number of elements': '0'},
+        {'Refine': True, 'Refine number of elements': 4}
+    ]
+    assert [generatorSettings['meshTypeOptions'] for requestedOptions, generatorSettings in preparedSweep] == [
+        {'Number of elements': 3, 'Refine': False, 'Refine number of elements': 1},
+        {'Number of elements': 1, 'Refine': False, 'Refine number of elements': 1},
+        {'Number of elements': 2, 'Refine': True, 'Refine number of elements': 4}
+    ]
+    for requestedOptions, generatorSettings in preparedSweep:
+        assert generatorSettings['meshTypeName'] == 'Fake Box 1'
+        assert generatorSettings['scale'] == '2*2*2'
+    assert baseSettings == {'scale': '2*2*2', 'meshTypeName': 'other'}
+
+
+def test_prepare_sweep_rejects_unknown_mesh_type_and_options(fakeMeshTypes):
+    with pytest.raises(ValueError, match='Unknown mesh type'):
+        prepareSweep('3D Box 1', [{}])
+    with pytest.raises(ValueError, match='Number of elements 1, Colour'):
+        prepareSweep('Fake Box 1', [{'Number of elements': 2}, {'Number of elements 1': 2, 'Colour': 'red'}])
+
+
+class FakeModel(object):
+
+    def __init__(self, nodeCount, elementCount):
+        self._nodeCount = nodeCount
+        self._elementCount = elementCount
+
+    def getNodeCount(self):
+        return self._nodeCount
+
+    def getElementCount(self):
+        return self._elementCount
+
+
+def test_run_sweep_writes_manifest_entry_per_scaffold(tmp_path, monkeypatch):
+    outputFileNames = []
+
+    def generateScaffold(generatorSettings, outputFileName):
+        outputFileNames.append(outputFileName)
+        elementCount = generatorSettings['meshTypeOptions']['Number of elements']
+        if elementCount == 0:
+            raise ValueError('No elements')
+        return FakeModel(elementCount + 1, elementCount)
+
+    monkeypatch.setattr(sweep, 'generateScaffold', generateScaffold)
+    preparedSweep = [
+        ({'Number of elements': elementCount},
+         {'meshTypeName': 'Fake Box 1', 'meshTypeOptions': {'Number of elements': elementCount, 'Refine': False}})
+        for elementCount in (4, 0)]
+    outputDirectory = str(tmp_path / 'output')
+    assert runSweep('box', preparedSweep, outputDirectory, processes=1) == 1
+    assert outputFileNames == [os.path.join(outputDirectory, fileName) for fileName in ('box-0000.ex2', 'box-0001.ex2')]
+    with open(os.path.join(outputDirectory, MANIFEST_FILE_NAME), 'r') as f:
+        entries = [json.loads(line) for line in f.read().splitlines()]
+    for entry in entries:
+        assert entry.pop('seconds') >= 0.0
+    assert entries == [
+        {
+            'index': 0,
+            'file': 'box-0000.ex2',
+            'meshTypeName': 'Fake Box 1',
+            'requestedOptions': {'Number of elements': 4},
+            'meshTypeOptions': {'Number of elements': 4, 'Refine': False},
+            'nodeCount': 5,
+            'elementCount': 4,
+            'error': None
+        },
+        {
+            'index': 1,
+            'file': 'box-0001.ex2',
+            'meshTypeName': 'Fake Box 1',
+            'requestedOptions': {'Number of elements': 0},
+            'meshTypeOptions': {'Number of elements': 0, 'Refine': False},
+            'error': 'No elements'
+        }
+    ]